@@ -0,0 +1,171 @@
+"""
+Benchmark assignment-detail parsing on a saved Canvas page.
+
+Compares the old multi-pass extractor on html.parser (before) with the
+single-pass extract_assignment_detail on each available tree builder (after),
+and checks that every variant returns the same dict.
+
+    python bench_extract_detail.py [fixtures/assignment_detail.html] [--runs 200]
+"""
+
+import argparse
+import re
+import time
+from urllib.parse import urljoin
+
+from canvas_scrape_to_json2 import (
+    CANVAS_BASE_URL,
+    extract_assignment_detail,
+    make_soup,
+    normalize_space,
+    try_get_text,
+)
+
+DEFAULT_FIXTURE = "fixtures/assignment_detail.html"
+
+
+def extract_assignment_detail_multipass(soup):
+    """The previous extractor (several full-tree walks), kept as the baseline."""
+    desc_el = soup.select_one(".user_content")
+    instructions_text = try_get_text(desc_el)
+    instructions_html = str(desc_el) if desc_el else None
+
+    due_at_iso = None
+    due_at_text = None
+    for t in soup.select("time[datetime]"):
+        text = normalize_space(t.get_text(" ", strip=True))
+        dt_attr = t.get("datetime")
+        nearby = normalize_space((t.parent.get_text(" ", strip=True) if t.parent else text).lower())
+        if "due" in nearby or "due" in text.lower():
+            due_at_iso = dt_attr
+            due_at_text = text
+            break
+    if due_at_text is None:
+        for block in soup.select(".assignment_dates, .assignment-details, .details, .assignment__dates"):
+            block_text = normalize_space(block.get_text(" ", strip=True))
+            if "due" in block_text.lower():
+                due_at_text = block_text
+                break
+
+    page_text = normalize_space(soup.get_text(" ", strip=True))
+    available_from_text = None
+    until_text = None
+    if "available" in page_text.lower():
+        idx = page_text.lower().find("available")
+        available_from_text = page_text[max(0, idx - 60): idx + 160]
+    if "until" in page_text.lower():
+        idx = page_text.lower().find("until")
+        until_text = page_text[max(0, idx - 60): idx + 160]
+
+    points_possible = None
+    for s in soup.find_all(string=re.compile(r"\bpts\b|\bPoints?\b", re.IGNORECASE))[:40]:
+        m = re.search(r"(\d+(?:\.\d+)?)\s*(?:pts|points?)\b", normalize_space(str(s)), re.IGNORECASE)
+        if m:
+            points_possible = float(m.group(1))
+            if points_possible.is_integer():
+                points_possible = int(points_possible)
+            break
+
+    submission_types = []
+    label_candidates = soup.find_all(
+        string=re.compile(r"Submission Type|File Upload|Text Entry|Website URL|External Tool|Online", re.IGNORECASE)
+    )
+    for s in label_candidates[:80]:
+        t = normalize_space(str(s)).lower()
+        if "file upload" in t:
+            submission_types.append("online_upload")
+        if "text entry" in t:
+            submission_types.append("online_text_entry")
+        if "website url" in t:
+            submission_types.append("online_url")
+        if "external tool" in t:
+            submission_types.append("external_tool")
+
+    attachments = []
+    for a in soup.select('a[href]'):
+        text = a.get_text(strip=True)
+        href = a.get("href", "")
+        if not text or not href:
+            continue
+        if re.search(r"\.(pdf|docx?|pptx?|xlsx?|zip|png|jpe?g|txt)$", text, re.IGNORECASE):
+            attachments.append({"filename": text, "url": urljoin(CANVAS_BASE_URL, href)})
+
+    external_tool_url = None
+    for a in soup.select('a[href*="external_tools"], a[href*="lti"], a[href*="launch"]'):
+        if a.get("href"):
+            external_tool_url = urljoin(CANVAS_BASE_URL, a.get("href"))
+            break
+
+    return {
+        "due_at_iso": due_at_iso,
+        "due_at_text": due_at_text,
+        "available_from_text": available_from_text,
+        "until_text": until_text,
+        "points_possible": points_possible,
+        "instructions_text": instructions_text,
+        "instructions_html": instructions_html,
+        "submission_types": sorted(set(submission_types)),
+        "external_tool_url": external_tool_url,
+        "attachments": attachments,
+    }
+
+
+def available_parsers():
+    parsers = ["html.parser"]
+    for name, module in (("lxml", "lxml"), ("html5lib", "html5lib")):
+        try:
+            __import__(module)
+            parsers.append(name)
+        except ImportError:
+            pass
+    return parsers
+
+
+def bench(html, parser, extractor, runs):
+    """Mean milliseconds per page for parse + extract, and parse alone."""
+    parse_total = 0.0
+    total = 0.0
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        soup = make_soup(html, parser)
+        parsed = time.perf_counter()
+        result = extractor(soup)
+        finished = time.perf_counter()
+        parse_total += parsed - started
+        total += finished - started
+    return total / runs * 1000, parse_total / runs * 1000, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("fixture", nargs="?", default=DEFAULT_FIXTURE)
+    ap.add_argument("--runs", type=int, default=200)
+    args = ap.parse_args()
+
+    with open(args.fixture, encoding="utf-8") as f:
+        html = f.read()
+
+    variants = [("before: multi-pass", "html.parser", extract_assignment_detail_multipass)]
+    variants += [(f"after: single-pass", parser, extract_assignment_detail) for parser in available_parsers()]
+
+    print(f"{args.fixture}: {len(html) / 1024:.1f} KiB, {args.runs} runs\n")
+    print(f"{'variant':<22}{'parser':<14}{'total ms/page':>15}{'parse ms':>11}{'extract ms':>12}")
+    baseline_ms = None
+    baseline = None
+    for label, parser, extractor in variants:
+        total_ms, parse_ms, result = bench(html, parser, extractor, args.runs)
+        baseline_ms = baseline_ms or total_ms
+        print(f"{label:<22}{parser:<14}{total_ms:>15.2f}{parse_ms:>11.2f}{total_ms - parse_ms:>12.2f}"
+              f"   {baseline_ms / total_ms:.1f}x")
+        if baseline is None:
+            baseline = result
+        elif parser == "html.parser" and result != baseline:
+            raise SystemExit(f"❌ {label} ({parser}) returned a different dict than the baseline")
+        elif result != baseline:
+            differing = sorted(k for k in result if result[k] != baseline[k])
+            print(f"   ⚠️  {parser} tree differs from html.parser in: {', '.join(differing)}")
+
+
+if __name__ == "__main__":
+    main()
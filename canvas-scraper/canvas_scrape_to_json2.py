@@ -1,12 +1,19 @@
+import argparse
 import json
 import os
 import re
 import time
+import queue
 import random
+import shutil
+import tempfile
+import textwrap
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString, Tag
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
@@ -26,6 +33,9 @@ PROFILE_DIR = os.path.abspath("./chrome_profile_canvas")
 
 OUT_FILE = "canvas_snapshot.json"
 
+# Append-only progress log; compacted into OUT_FILE at the end of a run
+CHECKPOINT_FILE = "canvas_snapshot.jsonl"
+
 # First run: keep False so you can complete SSO/MFA and then press Enter.
 # After you confirm it works, set True to skip the pause.
 SKIP_LOGIN_PAUSE = False
@@ -36,6 +46,26 @@ MAX_ASSIGNMENTS_PER_COURSE = None  # e.g. 30, or None for all
 
 DETAIL_PAGE_TIMEOUT_SEC = 60
 
+# Pacing: every page load takes a token from a bucket refilled at
+# REQUESTS_PER_SECOND, holding at most REQUEST_BURST tokens.
+REQUESTS_PER_SECOND = 0.5
+REQUEST_BURST = 3
+
+# Browsers fetching assignment detail pages in parallel (1 = serial)
+DETAIL_WORKERS = 3
+
+# BeautifulSoup tree builder: "lxml" (fast, C) when installed, else "html.parser".
+# Override with CANVAS_HTML_PARSER=html.parser|lxml|html5lib.
+def _default_html_parser():
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+HTML_PARSER = os.getenv("CANVAS_HTML_PARSER") or _default_html_parser()
+
 
 # ==========================
 # Helpers
@@ -44,23 +74,43 @@ def now_iso():
     return datetime.now(timezone.utc).isoformat()
 
 
-def human_sleep(min_sec: float, max_sec: float):
-    """Sleep for a random duration to mimic human browsing."""
-    duration = random.uniform(min_sec, max_sec)
-    time.sleep(duration)
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/second, up to `burst` saved up."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
 
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
 
-def long_break():
-    """Occasional long pause to avoid constant pacing."""
-    duration = random.uniform(15, 30)
-    print(f"😴 Taking a longer break ({duration:.1f}s)")
-    time.sleep(duration)
 
+rate_limiter = TokenBucket(REQUESTS_PER_SECOND, REQUEST_BURST)
 
-def start_driver():
+
+def load_page(driver, url: str):
+    """driver.get() within the global request budget."""
+    rate_limiter.acquire()
+    driver.get(url)
+
+
+def start_driver(profile_dir: str = PROFILE_DIR):
     opts = Options()
     opts.binary_location = "/Applications/Google Chrome 3.app/Contents/MacOS/Google Chrome"
-    opts.add_argument(f"--user-data-dir={PROFILE_DIR}")
+    opts.add_argument(f"--user-data-dir={profile_dir}")
     opts.add_argument("--start-maximized")
 
     service = Service(ChromeDriverManager().install())
@@ -69,7 +119,7 @@ def start_driver():
 
 
 def ensure_logged_in(driver):
-    driver.get(urljoin(CANVAS_BASE_URL, "/"))
+    load_page(driver, urljoin(CANVAS_BASE_URL, "/"))
     WebDriverWait(driver, 60).until(EC.presence_of_element_located((By.CSS_SELECTOR, "body")))
 
     if not SKIP_LOGIN_PAUSE:
@@ -78,9 +128,13 @@ def ensure_logged_in(driver):
         input("Press Enter to continue once you are logged in...")
 
 
+def make_soup(html: str, parser: str = None) -> BeautifulSoup:
+    return BeautifulSoup(html, parser or HTML_PARSER)
+
+
 def get_soup(driver, timeout=60) -> BeautifulSoup:
     WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, "body")))
-    return BeautifulSoup(driver.page_source, "html.parser")
+    return make_soup(driver.page_source)
 
 
 def normalize_space(s: str) -> str:
@@ -114,7 +168,7 @@ def parse_course_links_from_courses_page(soup: BeautifulSoup):
 
 
 def get_courses(driver):
-    driver.get(urljoin(CANVAS_BASE_URL, "/courses"))
+    load_page(driver, urljoin(CANVAS_BASE_URL, "/courses"))
     soup = get_soup(driver, timeout=60)
     return parse_course_links_from_courses_page(soup)
 
@@ -123,7 +177,7 @@ def get_assignments_list_for_course(driver, course_id: int):
     """
     Scrape /courses/<id>/assignments to collect assignment IDs + URLs + titles.
     """
-    driver.get(urljoin(CANVAS_BASE_URL, f"/courses/{course_id}/assignments"))
+    load_page(driver, urljoin(CANVAS_BASE_URL, f"/courses/{course_id}/assignments"))
     soup = get_soup(driver, timeout=60)
 
     assignments = []
@@ -149,6 +203,25 @@ def get_assignments_list_for_course(driver, course_id: int):
     return list(dedup.values())
 
 
+# Patterns used by extract_assignment_detail, compiled once
+POINTS_STRING_RE = re.compile(r"\bpts\b|\bPoints?\b", re.IGNORECASE)
+POINTS_VALUE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:pts|points?)\b", re.IGNORECASE)
+SUBMISSION_STRING_RE = re.compile(
+    r"Submission Type|File Upload|Text Entry|Website URL|External Tool|Online", re.IGNORECASE
+)
+ATTACHMENT_NAME_RE = re.compile(r"\.(pdf|docx?|pptx?|xlsx?|zip|png|jpe?g|txt)$", re.IGNORECASE)
+EXTERNAL_TOOL_HREF_MARKERS = ("external_tools", "lti", "launch")
+META_BLOCK_CLASSES = {"assignment_dates", "assignment-details", "details", "assignment__dates"}
+SUBMISSION_LABELS = (
+    ("file upload", "online_upload"),
+    ("text entry", "online_text_entry"),
+    ("website url", "online_url"),
+    ("external tool", "external_tool"),
+)
+MAX_POINTS_CANDIDATES = 40
+MAX_SUBMISSION_CANDIDATES = 80
+
+
 def extract_assignment_detail(soup: BeautifulSoup):
     """
     Best-effort extraction from an assignment detail page.
@@ -156,10 +229,48 @@ def extract_assignment_detail(soup: BeautifulSoup):
       - store raw text versions
       - store raw HTML for instructions
       - try multiple heuristics for deadlines/points/submission types
+
+    Everything the heuristics need is collected in one walk over the tree.
     """
+    desc_el = None
+    time_tags = []
+    meta_blocks = []
+    links = []
+    external_tool_url = None
+    page_parts = []
+    points_strings = []
+    submission_strings = []
+    text_types = soup.interesting_string_types
+
+    for node in soup.descendants:
+        if isinstance(node, Tag):
+            attrs = node.attrs
+            classes = attrs.get("class") or ()
+            if desc_el is None and "user_content" in classes:
+                desc_el = node
+            if classes and META_BLOCK_CLASSES.intersection(classes):
+                meta_blocks.append(node)
+            if node.name == "time" and "datetime" in attrs:
+                time_tags.append(node)
+            elif node.name == "a" and "href" in attrs:
+                links.append(node)
+                href = attrs["href"]
+                if external_tool_url is None and href and any(m in href for m in EXTERNAL_TOOL_HREF_MARKERS):
+                    external_tool_url = urljoin(CANVAS_BASE_URL, href)
+            continue
+
+        if not isinstance(node, NavigableString):
+            continue
+        if type(node) in text_types:
+            stripped = node.strip()
+            if stripped:
+                page_parts.append(stripped)
+        if len(points_strings) < MAX_POINTS_CANDIDATES and POINTS_STRING_RE.search(node):
+            points_strings.append(node)
+        if len(submission_strings) < MAX_SUBMISSION_CANDIDATES and SUBMISSION_STRING_RE.search(node):
+            submission_strings.append(node)
 
     # --- Instructions / description ---
-    desc_el = soup.select_one(".user_content")
     instructions_text = try_get_text(desc_el)
     instructions_html = str(desc_el) if desc_el else None
 
@@ -168,19 +279,16 @@ def extract_assignment_detail(soup: BeautifulSoup):
     due_at_text = None
 
     # Try <time datetime="..."> elements with nearby "due"
-    time_candidates = soup.select("time[datetime]")
-    for t in time_candidates:
+    for t in time_tags:
         text = normalize_space(t.get_text(" ", strip=True))
-        dt_attr = t.get("datetime")
         nearby = normalize_space((t.parent.get_text(" ", strip=True) if t.parent else text).lower())
         if "due" in nearby or "due" in text.lower():
-            due_at_iso = dt_attr
+            due_at_iso = t.get("datetime")
             due_at_text = text
             break
 
     # Fallback: look for any block that mentions due
     if due_at_text is None:
-        meta_blocks = soup.select(".assignment_dates, .assignment-details, .details, .assignment__dates")
         for block in meta_blocks:
             block_text = normalize_space(block.get_text(" ", strip=True))
             if "due" in block_text.lower():
@@ -188,69 +296,45 @@ def extract_assignment_detail(soup: BeautifulSoup):
                 break
 
     # --- Availability text (best-effort snippets) ---
-    page_text = normalize_space(soup.get_text(" ", strip=True))
+    page_text = normalize_space(" ".join(page_parts))
+    page_text_lower = page_text.lower()
     available_from_text = None
     until_text = None
 
-    if "available" in page_text.lower():
-        idx = page_text.lower().find("available")
+    idx = page_text_lower.find("available")
+    if idx != -1:
         available_from_text = page_text[max(0, idx - 60): idx + 160]
 
-    if "until" in page_text.lower():
-        idx = page_text.lower().find("until")
+    idx = page_text_lower.find("until")
+    if idx != -1:
         until_text = page_text[max(0, idx - 60): idx + 160]
 
     # --- Points possible (best effort) ---
     points_possible = None
-    pts_candidates = soup.find_all(string=re.compile(r"\bpts\b|\bPoints?\b", re.IGNORECASE))
-    for s in pts_candidates[:40]:
-        t = normalize_space(str(s))
-        m = re.search(r"(\d+(?:\.\d+)?)\s*(?:pts|points?)\b", t, re.IGNORECASE)
+    for s in points_strings:
+        m = POINTS_VALUE_RE.search(normalize_space(str(s)))
         if m:
-            try:
-                points_possible = float(m.group(1))
-                if points_possible.is_integer():
-                    points_possible = int(points_possible)
-            except Exception:
-                points_possible = None
-            if points_possible is not None:
-                break
+            points_possible = float(m.group(1))
+            if points_possible.is_integer():
+                points_possible = int(points_possible)
+            break
 
     # --- Submission types (best effort) ---
-    submission_types = []
-    label_candidates = soup.find_all(
-        string=re.compile(r"Submission Type|File Upload|Text Entry|Website URL|External Tool|Online", re.IGNORECASE)
-    )
-    for s in label_candidates[:80]:
+    submission_types = set()
+    for s in submission_strings:
         t = normalize_space(str(s)).lower()
-        if "file upload" in t:
-            submission_types.append("online_upload")
-        if "text entry" in t:
-            submission_types.append("online_text_entry")
-        if "website url" in t:
-            submission_types.append("online_url")
-        if "external tool" in t:
-            submission_types.append("external_tool")
-    submission_types = sorted(set(submission_types))
+        for label, submission_type in SUBMISSION_LABELS:
+            if label in t:
+                submission_types.add(submission_type)
 
     # --- Attachments (best effort) ---
     attachments = []
-    for a in soup.select('a[href]'):
+    for a in links:
         text = a.get_text(strip=True)
         href = a.get("href", "")
-        if not text or not href:
-            continue
-        if re.search(r"\.(pdf|docx?|pptx?|xlsx?|zip|png|jpe?g|txt)$", text, re.IGNORECASE):
+        if text and href and ATTACHMENT_NAME_RE.search(text):
             attachments.append({"filename": text, "url": urljoin(CANVAS_BASE_URL, href)})
 
-    # --- External tool URL (best effort) ---
-    external_tool_url = None
-    for a in soup.select('a[href*="external_tools"], a[href*="lti"], a[href*="launch"]'):
-        href = a.get("href")
-        if href:
-            external_tool_url = urljoin(CANVAS_BASE_URL, href)
-            break
-
     return {
         "due_at_iso": due_at_iso,
         "due_at_text": due_at_text,
@@ -259,21 +343,212 @@ def extract_assignment_detail(soup: BeautifulSoup):
         "points_possible": points_possible,
         "instructions_text": instructions_text,
         "instructions_html": instructions_html,
-        "submission_types": submission_types,
+        "submission_types": sorted(submission_types),
         "external_tool_url": external_tool_url,
         "attachments": attachments,
     }
 
 
 def enrich_assignment_with_detail(driver, assignment):
-    driver.get(assignment["url"])
+    load_page(driver, assignment["url"])
     soup = get_soup(driver, timeout=DETAIL_PAGE_TIMEOUT_SEC)
     assignment["detail"] = extract_assignment_detail(soup)
     return assignment
 
 
+def start_worker_drivers(main_driver, count: int, workers: list):
+    """
+    Start `count` extra browsers logged in with the main browser's session.
+    Chrome locks its profile folder, so each gets a throwaway profile and the
+    Canvas cookies are copied over. Each browser is appended to the caller's
+    `workers` as soon as it starts, so quit_worker_drivers can clean up the
+    ones already running if a later one fails.
+    """
+    cookies = main_driver.get_cookies()
+    for _ in range(count):
+        profile_dir = tempfile.mkdtemp(prefix="canvas_worker_")
+        try:
+            driver = start_driver(profile_dir)
+        except Exception:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            raise
+        driver.worker_profile_dir = profile_dir
+        workers.append(driver)
+        load_page(driver, urljoin(CANVAS_BASE_URL, "/"))
+        for cookie in cookies:
+            cookie.pop("sameSite", None)
+            try:
+                driver.add_cookie(cookie)
+            except Exception as e:
+                print(f"⚠️ Could not copy cookie {cookie.get('name')}: {e}")
+
+
+def quit_worker_drivers(workers):
+    for driver in workers:
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"⚠️ Could not quit worker browser: {e}")
+        finally:
+            shutil.rmtree(driver.worker_profile_dir, ignore_errors=True)
+    workers.clear()
+
+
+def enrich_assignments_concurrently(drivers, assignments, on_done=None):
+    """
+    Fetch detail pages with every driver in `drivers` working at once.
+    Page loads share the rate limiter, so the pace is set by
+    REQUESTS_PER_SECOND no matter how many browsers are open.
+    `on_done(assignment)` is called as each one finishes.
+    """
+    idle = queue.Queue()
+    for driver in drivers:
+        idle.put(driver)
+
+    def enrich(a):
+        driver = idle.get()
+        try:
+            a = enrich_assignment_with_detail(driver, a)
+        except Exception as e:
+            a["detail_error"] = str(e)
+        finally:
+            idle.put(driver)
+        if on_done:
+            on_done(a)
+
+    with ThreadPoolExecutor(max_workers=len(drivers)) as executor:
+        list(executor.map(enrich, assignments))
+
+
+# ==========================
+# Checkpoint (JSONL)
+# ==========================
+class Checkpoint:
+    """
+    Append-only JSONL log of a snapshot in progress, one record per line:
+      {"type": "run", "synced_at", "canvas_base_url"}   each (re)start
+      {"type": "course", "id", "name", "url"}          before its assignments
+      {"type": "assignment", "course_id", ...}          as each detail page finishes
+      {"type": "course_done", "id"}                     after its last assignment
+    """
+
+    def __init__(self, path: str, resume: bool):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done_courses = set()
+        self.done_assignments = set()
+        if resume and os.path.exists(path):
+            for record in iter_checkpoint(path):
+                if record["type"] == "course_done":
+                    self.done_courses.add(record["id"])
+                elif record["type"] == "assignment" and "detail_error" not in record:
+                    self.done_assignments.add(record["id"])
+        self.file = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and self.file.tell() > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Cut off a torn last line so it can't swallow the next record
+                    self.file.write("\n")
+
+    def write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def iter_checkpoint(path: str):
+    """Yield checkpoint records, skipping a torn last line from a crash."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def compact_checkpoint(checkpoint_path: str = CHECKPOINT_FILE, out_path: str = OUT_FILE):
+    """
+    Write the checkpoint out as a canvas_snapshot.json-style file
+    ({synced_at, canvas_base_url, courses: [{id, name, url, assignments}]}),
+    keeping the latest record per assignment. Only line offsets are held in
+    memory; records are re-read one at a time while writing.
+    """
+    header = None
+    courses = {}       # course id -> course record
+    latest = {}        # (course id, assignment id) -> offset of latest record
+    order = {}         # course id -> assignment keys in first-seen order
+
+    with open(checkpoint_path, "rb") as f:
+        offset = 0
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if record is None:
+                pass
+            elif record["type"] == "run" and header is None:
+                header = record
+            elif record["type"] == "course":
+                courses.setdefault(record["id"], record)
+                order.setdefault(record["id"], [])
+            elif record["type"] == "assignment":
+                key = (record["course_id"], record["id"])
+                if key not in latest:
+                    order.setdefault(record["course_id"], []).append(key)
+                latest[key] = offset
+            offset += len(line)
+
+    header = header or {"synced_at": now_iso(), "canvas_base_url": CANVAS_BASE_URL}
+    tmp_path = out_path + ".tmp"
+    with open(checkpoint_path, "rb") as src, open(tmp_path, "w", encoding="utf-8") as out:
+        out.write("{\n")
+        out.write(f'  "synced_at": {json.dumps(header["synced_at"])},\n')
+        out.write(f'  "canvas_base_url": {json.dumps(header["canvas_base_url"])},\n')
+        out.write('  "courses": [')
+        for course_idx, (course_id, course) in enumerate(courses.items()):
+            out.write(",\n" if course_idx else "\n")
+            out.write("    {\n")
+            for key in ("id", "name", "url"):
+                out.write(f'      "{key}": {json.dumps(course[key], ensure_ascii=False)},\n')
+            out.write('      "assignments": [')
+            for a_idx, key in enumerate(order.get(course_id, [])):
+                src.seek(latest[key])
+                assignment = json.loads(src.readline())
+                del assignment["type"], assignment["course_id"]
+                body = json.dumps(assignment, indent=2, ensure_ascii=False)
+                out.write(",\n" if a_idx else "\n")
+                out.write(textwrap.indent(body, " " * 8))
+            out.write("\n      ]\n    }" if order.get(course_id) else "]\n    }")
+        out.write("\n  ]\n}\n" if courses else "]\n}\n")
+    os.replace(tmp_path, out_path)
+    return len(courses), len(latest)
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Snapshot Canvas courses and assignments to JSON")
+    ap.add_argument("--resume", action="store_true",
+                    help=f"Continue from {CHECKPOINT_FILE}, skipping assignments already captured")
+    ap.add_argument("--compact-only", action="store_true",
+                    help=f"Just rebuild {OUT_FILE} from {CHECKPOINT_FILE}")
+    return ap.parse_args()
+
+
 def main():
+    args = parse_args()
+    if args.compact_only:
+        n_courses, n_assignments = compact_checkpoint()
+        print(f"✅ Compacted {n_courses} courses / {n_assignments} assignments into {OUT_FILE}")
+        return
+
     driver = start_driver()
+    workers = []
+    checkpoint = Checkpoint(CHECKPOINT_FILE, resume=args.resume)
     try:
         ensure_logged_in(driver)
 
@@ -289,15 +564,22 @@ def main():
         if MAX_COURSES is not None:
             courses = courses[:MAX_COURSES]
 
-        snapshot = {
-            "synced_at": now_iso(),
-            "canvas_base_url": CANVAS_BASE_URL,
-            "courses": [],
-        }
+        checkpoint.write({"type": "run", "synced_at": now_iso(), "canvas_base_url": CANVAS_BASE_URL})
+        if args.resume:
+            print(f"↩️ Resuming: {len(checkpoint.done_courses)} courses / "
+                  f"{len(checkpoint.done_assignments)} assignments already captured")
+
+        if DETAIL_WORKERS > 1:
+            print(f"🧭 Starting {DETAIL_WORKERS - 1} extra browsers for detail pages")
+            start_worker_drivers(driver, DETAIL_WORKERS - 1, workers)
+        print(f"⏱️ Rate limit: {REQUESTS_PER_SECOND} pages/s (burst {REQUEST_BURST})")
 
         for course_idx, c in enumerate(courses, start=1):
+            if c["id"] in checkpoint.done_courses:
+                print(f"\n⏭️ ({course_idx}/{len(courses)}) Already captured: {c['name']}")
+                continue
             print(f"\n📘 ({course_idx}/{len(courses)}) Opening course: {c['name']}")
-            human_sleep(8, 15)  # pause before entering a new course
+            checkpoint.write({"type": "course", "id": c["id"], "name": c["name"], "url": c["url"]})
 
             assignments = get_assignments_list_for_course(driver, c["id"])
 
@@ -305,41 +587,34 @@ def main():
             if MAX_ASSIGNMENTS_PER_COURSE is not None:
                 assignments = assignments[:MAX_ASSIGNMENTS_PER_COURSE]
 
-            # Randomize assignment order
-            random.shuffle(assignments)
-
-            enriched = []
-            for idx, a in enumerate(assignments, start=1):
-                # Gentle pacing between assignment detail pages
-                human_sleep(2.0, 5.0)
+            pending = [a for a in assignments if a["id"] not in checkpoint.done_assignments]
 
-                try:
-                    enriched.append(enrich_assignment_with_detail(driver, a))
-                except Exception as e:
-                    a["detail_error"] = str(e)
-                    enriched.append(a)
+            # Randomize assignment order
+            random.shuffle(pending)
 
-                # Every ~10 assignments, take a longer break
-                if idx % 10 == 0:
-                    long_break()
+            failed = []
 
-            snapshot["courses"].append({
-                "id": c["id"],
-                "name": c["name"],
-                "url": c["url"],
-                "assignments": enriched,
-            })
+            def record(a, course_id=c["id"]):
+                checkpoint.write({"type": "assignment", "course_id": course_id, **a})
+                if "detail_error" in a:
+                    failed.append(a["id"])
 
-            print(f"✅ Finished course: {c['name']} ({len(enriched)} assignments)")
-            human_sleep(10, 20)  # long pause between courses
+            enrich_assignments_concurrently([driver] + workers, pending, on_done=record)
+            # Courses with failed detail pages stay open so --resume retries them
+            if not failed:
+                checkpoint.write({"type": "course_done", "id": c["id"]})
 
-        with open(OUT_FILE, "w", encoding="utf-8") as f:
-            json.dump(snapshot, f, indent=2, ensure_ascii=False)
+            print(f"✅ Finished course: {c['name']} ({len(pending)} fetched, "
+                  f"{len(assignments) - len(pending)} already captured, {len(failed)} failed)")
 
-        print(f"\n✅ Saved to {OUT_FILE}")
+        checkpoint.close()
+        n_courses, n_assignments = compact_checkpoint()
+        print(f"\n✅ Saved {n_courses} courses / {n_assignments} assignments to {OUT_FILE}")
         print("Tip: after one good run, set SKIP_LOGIN_PAUSE=True to skip the login pause.")
 
     finally:
+        checkpoint.close()
+        quit_worker_drivers(workers)
         driver.quit()
 
 
@@ -90,7 +90,7 @@ export default function ClassDetailPage() {
         // Get sources
         const { data: sourcesData } = await supabase
           .from('class_sources')
-          .select('*')
+          .select('id, source_type, url, auth_hint')
           .eq('class_id', id);
         setSources(sourcesData || []);
         
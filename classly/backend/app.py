@@ -75,4 +75,10 @@ def health_check():
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', '1') == '1'
+    # Background staleness-driven sync of class sources (opt-in). Only the dev
+    # server starts it, and only in the reloader's child; production runs it
+    # once via `python -m services.job_worker --scheduler`.
+    if os.getenv('SYNC_SCHEDULER_ENABLED', '0') == '1' and (not debug or os.getenv('WERKZEUG_RUN_MAIN') == 'true'):
+        from services.sync_scheduler import get_sync_scheduler
+        get_sync_scheduler().start()
     app.run(host='0.0.0.0', port=port, debug=debug)
@@ -0,0 +1,6 @@
+-- Add an incremental sync cursor to class_sources
+-- Run this in your Supabase SQL Editor
+-- Used by scrapers/campuswire_api.py (via services/scraper_service.py) to store the
+-- newest Campuswire post seen for each source: {"id": "...", "published_at": "..."}
+
+ALTER TABLE class_sources ADD COLUMN IF NOT EXISTS sync_cursor JSONB;
@@ -0,0 +1,12 @@
+-- Add sync statistics to class_sources
+-- Run this in your Supabase SQL Editor
+-- Used by services/sync_scheduler.py to decide which sources are stale
+
+ALTER TABLE class_sources ADD COLUMN IF NOT EXISTS last_fetched_at TIMESTAMPTZ;
+ALTER TABLE class_sources ADD COLUMN IF NOT EXISTS last_changed_at TIMESTAMPTZ;
+ALTER TABLE class_sources ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE class_sources ADD COLUMN IF NOT EXISTS fetch_count INTEGER DEFAULT 0;
+ALTER TABLE class_sources ADD COLUMN IF NOT EXISTS change_count INTEGER DEFAULT 0;
+
+-- Create index for finding the next deadline per class
+CREATE INDEX IF NOT EXISTS idx_tasks_class_due_at ON tasks(class_id, due_at);
@@ -0,0 +1,32 @@
+-- Create class_source_credentials table in Supabase
+-- Run this in your Supabase SQL Editor
+-- Stores per-source API tokens (used by scrapers/prairielearn_scraper.py to read
+-- assessments from the PrairieLearn API instead of a browser). Kept out of
+-- class_sources so the dashboard, which reads class_sources with the anon key,
+-- can never see them.
+
+CREATE TABLE IF NOT EXISTS class_source_credentials (
+    source_id UUID PRIMARY KEY REFERENCES class_sources(id) ON DELETE CASCADE,
+    api_token TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Enable Row Level Security (RLS) with no policies: only the backend's
+-- service role key can read or write tokens
+ALTER TABLE class_source_credentials ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON class_source_credentials FROM anon, authenticated;
+
+-- Move tokens from the earlier class_sources.api_token column, if it was added
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'class_sources' AND column_name = 'api_token'
+    ) THEN
+        INSERT INTO class_source_credentials (source_id, api_token)
+        SELECT id, api_token FROM class_sources WHERE api_token IS NOT NULL
+        ON CONFLICT (source_id) DO NOTHING;
+        ALTER TABLE class_sources DROP COLUMN api_token;
+    END IF;
+END $$;
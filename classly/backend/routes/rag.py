@@ -5,11 +5,15 @@ Provides endpoints for asking questions about course materials using vector sear
 
 from flask import Blueprint, jsonify, request
 import os
-import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
 from supabase import create_client, Client
 
+from services.local_embedder import embed_text as create_local_embedding
+from services.embedding_cache import get_embedding_cache
+
 # Initialize blueprint
 rag_bp = Blueprint('rag', __name__)
 
@@ -19,9 +23,20 @@ SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
 EMBEDDING_DIM = 1536
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# Retrieval: top-k chunks across the selected courses, and the deadline budget
+RAG_MATCH_COUNT = int(os.getenv('RAG_MATCH_COUNT', '8'))
+# Local hashing embeddings score lower cosine similarity than OpenAI's for the same match
+RAG_MIN_SIMILARITY = float(os.getenv('RAG_MIN_SIMILARITY', '0.5' if OPENAI_API_KEY else '0.1'))
+RAG_MAX_DEADLINES = int(os.getenv('RAG_MAX_DEADLINES', '20'))
 
 # Initialize Supabase client
 _supabase_client = None
+_openai_client = None
+
+# Retrieval (embedding + RPC) runs here while the course context loads
+_retrieval_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='rag-retrieval')
 
 def get_supabase() -> Client:
     """Get or create Supabase client."""
@@ -37,48 +52,113 @@ def get_supabase() -> Client:
 # Embedding Functions
 # ============================================
 
-def create_deterministic_embedding(text: str) -> List[float]:
-    """
-    Create a deterministic fake embedding based on text hash.
-    Used when OpenAI API key is not available.
-    """
-    text_hash = hashlib.sha256(text.encode()).hexdigest()
-    
-    embedding = []
-    for i in range(EMBEDDING_DIM):
-        hex_chunk = text_hash[(i * 4) % len(text_hash):((i * 4) % len(text_hash)) + 4]
-        if len(hex_chunk) < 4:
-            hex_chunk = text_hash[:4]
-        val = (int(hex_chunk, 16) / 65535) * 2 - 1
-        embedding.append(val)
-    
-    # Normalize
-    magnitude = sum(x ** 2 for x in embedding) ** 0.5
-    if magnitude > 0:
-        embedding = [x / magnitude for x in embedding]
-    
-    return embedding
+def get_openai_client():
+    """Get or create the OpenAI client (reused across requests)."""
+    global _openai_client
+    if _openai_client is None:
+        from openai import OpenAI
+        _openai_client = OpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
 
 
 def create_openai_embedding(text: str) -> List[float]:
     """Create embedding using OpenAI API."""
-    from openai import OpenAI
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    response = client.embeddings.create(
-        model="text-embedding-ada-002",
+    response = get_openai_client().embeddings.create(
+        model=OPENAI_EMBEDDING_MODEL,
         input=text
     )
     return response.data[0].embedding
 
 
 def get_query_embedding(text: str) -> List[float]:
-    """Get embedding for query text."""
+    """Get embedding for query text (OpenAI embeddings are cached by content)."""
     if OPENAI_API_KEY:
         try:
-            return create_openai_embedding(text)
+            return get_embedding_cache().get_or_compute(
+                OPENAI_EMBEDDING_MODEL, [text], lambda texts: [create_openai_embedding(t) for t in texts]
+            )[0]
         except Exception as e:
-            print(f"OpenAI embedding failed: {e}, using deterministic")
-    return create_deterministic_embedding(text)
+            print(f"OpenAI embedding failed: {e}, using local embedder")
+    return create_local_embedding(text)
+
+
+# ============================================
+# Retrieval
+# ============================================
+
+def retrieve_chunks(supabase: Client, question: str, course_codes: List[str]) -> List[Dict]:
+    """
+    Top RAG_MATCH_COUNT chunks for `question` across the given course codes
+    (all courses when empty), from one match_course_chunks_multi call.
+    """
+    course_ids = None
+    if course_codes:
+        rag_courses = supabase.table('rag_courses').select('id').in_('code', course_codes).execute()
+        course_ids = [c['id'] for c in rag_courses.data or []]
+        if not course_ids:
+            return []
+
+    result = supabase.rpc('match_course_chunks_multi', {
+        'p_course_ids': course_ids,
+        'p_query_embedding': get_query_embedding(question),
+        'p_match_count': RAG_MATCH_COUNT,
+        'p_min_similarity': RAG_MIN_SIMILARITY,
+    }).execute()
+    return result.data or []
+
+
+def chunk_sources(chunks: List[Dict]) -> List[Dict]:
+    """Distinct source documents of the retrieved chunks, best match first."""
+    sources = []
+    seen = set()
+    for chunk in chunks:
+        if chunk['doc_id'] in seen:
+            continue
+        seen.add(chunk['doc_id'])
+        metadata = chunk.get('metadata') or {}
+        sources.append({
+            'title': metadata.get('doc_title', 'Unknown'),
+            'source': f"{chunk.get('course_code', '')} {metadata.get('source', '')}".strip(),
+            'doc_id': chunk['doc_id'],
+        })
+    return sources
+
+
+def load_course_context(supabase: Client, course_codes: List[str]) -> List[Dict]:
+    """
+    Resolve course codes (all classes when empty) and fetch their deadlines
+    with one query and one upcoming_deadlines_by_course call.
+
+    Returns one dict per course (id, code, title, deadlines) in the order the
+    codes were given. Each course gets its next
+    RAG_MAX_DEADLINES // len(courses) upcoming deadlines, ranked per course
+    in SQL so no course is crowded out.
+    """
+    query = supabase.table('classes').select('id, code, title')
+    if course_codes:
+        query = query.in_('code', course_codes)
+    classes = query.execute().data or []
+
+    if course_codes:
+        by_code = {}
+        for c in classes:
+            by_code.setdefault(c['code'], c)
+        classes = [by_code[code] for code in dict.fromkeys(course_codes) if code in by_code]
+    if not classes:
+        return []
+
+    titles = list(dict.fromkeys(c['title'] for c in classes))
+    per_course = max(1, RAG_MAX_DEADLINES // len(classes))
+    deadlines = supabase.rpc('upcoming_deadlines_by_course', {
+        'p_course_names': titles,
+        'p_per_course': per_course,
+    }).execute().data or []
+
+    by_title = defaultdict(list)
+    for d in deadlines:
+        by_title[d['course_name']].append(d)
+
+    return [dict(c, deadlines=by_title.get(c['title'], [])) for c in classes]
 
 
 # ============================================
@@ -197,44 +277,32 @@ def ask_question():
         
         supabase = get_supabase()
         
-        # Step 1: Get course IDs to search
-        all_course_ids = []
-        course_names = []
-        
-        if course_codes and len(course_codes) > 0:
-            # Search specific courses
-            for code in course_codes:
-                course_result = supabase.table('classes').select('id, code, title').eq('code', code).execute()
-                if course_result.data:
-                    all_course_ids.append(course_result.data[0]['id'])
-                    course_names.append(course_result.data[0]['title'])
-        else:
-            # Search ALL courses
-            all_courses = supabase.table('classes').select('id, code, title').execute()
-            for c in all_courses.data:
-                all_course_ids.append(c['id'])
-                course_names.append(c['title'])
+        # Retrieve the most relevant course material chunks while the
+        # course context loads
+        chunks_future = _retrieval_pool.submit(retrieve_chunks, supabase, question, course_codes)
+
+        # Resolve courses and their deadlines (two queries in total)
+        courses = load_course_context(supabase, course_codes)
+        course_names = [c['title'] for c in courses]
         
-        if not all_course_ids:
+        if not courses:
             return jsonify({
                 'success': False,
                 'error': 'No courses found'
             }), 404
         
+        try:
+            chunks = chunks_future.result()
+        except Exception as e:
+            print(f"Chunk retrieval failed: {e}")
+            chunks = []
+
         # Fetch actual course data to include in context
         course_data_context = []
-        
-        # Get deadlines/assignments for selected courses
-        for i, course_id in enumerate(all_course_ids):
-            course_code = course_codes[i] if course_codes and i < len(course_codes) else 'Unknown'
-            course_name = course_names[i] if i < len(course_names) else 'Unknown'
-            
-            # Get deadlines for this course
-            deadlines_result = supabase.table('deadlines').select('*').eq('course_name', course_name).order('due_date').limit(20).execute()
-            
-            if deadlines_result.data:
-                course_data_context.append(f"\n## {course_code} - {course_name} Assignments:")
-                for d in deadlines_result.data:
+        for course in courses:
+            if course['deadlines']:
+                course_data_context.append(f"\n## {course['code']} - {course['title']} Assignments:")
+                for d in course['deadlines']:
                     due = d.get('due_date_text') or d.get('due_date') or 'No due date'
                     status = d.get('status', 'pending')
                     points = d.get('points_possible', '')
@@ -243,6 +311,10 @@ def ask_question():
         
         # Build context string
         context_str = "\n".join(course_data_context) if course_data_context else "No assignment data available for these courses yet."
+        materials_str = "\n\n---\n\n".join(
+            f"[Source: {chunk.get('course_code', '')} {(chunk.get('metadata') or {}).get('doc_title', 'Unknown')}]\n{chunk['content']}"
+            for chunk in chunks
+        ) or "No matching course materials found."
         
         # Generate answer using OpenAI with actual course data
         courses_str = ', '.join(course_codes) if course_codes else 'all your courses'
@@ -258,7 +330,11 @@ You have access to the student's actual course data below. Use this information
 COURSE DATA:
 {context_str}
 
+COURSE MATERIALS (most relevant excerpts):
+{materials_str}
+
 Answer the student's question based on this data. Be specific and reference actual assignments, due dates, etc. when relevant.
+Cite the course materials by source when you use them.
 If the data doesn't contain what they're asking about, let them know what information IS available."""
 
                 response = requests.post(
@@ -285,6 +361,8 @@ If the data doesn't contain what they're asking about, let them know what inform
                     answer = f"I can help you with questions about {courses_str}. (API Error: {error_detail})"
             except Exception as e:
                 answer = f"I can help you with questions about {courses_str}. (Error: {str(e)})"
+        elif chunks:
+            answer = generate_mock_answer(question, chunks, courses_str)
         else:
             answer = f"I can help you with questions about {courses_str}. Configure OPENAI_API_KEY for AI-powered answers."
         
@@ -295,10 +373,21 @@ If the data doesn't contain what they're asking about, let them know what inform
             'courseNames': course_names,
             'question': question,
             'answer': answer,
-            'sources': [],
-            'retrieved': [],
+            'sources': chunk_sources(chunks),
+            'retrieved': [
+                {
+                    'chunk_id': chunk['chunk_id'],
+                    'doc_id': chunk['doc_id'],
+                    'course_code': chunk.get('course_code'),
+                    'content': chunk['content'],
+                    'similarity': chunk['similarity'],
+                }
+                for chunk in chunks
+            ],
             'metadata': {
-                'llm_type': 'openai' if OPENAI_API_KEY else 'mock'
+                'llm_type': 'openai' if OPENAI_API_KEY else 'mock',
+                'embedding_type': 'openai' if OPENAI_API_KEY else 'local',
+                'chunks_retrieved': len(chunks)
             }
         })
         
@@ -410,8 +499,9 @@ def health_check():
             'config': {
                 'supabase_connected': True,
                 'openai_available': bool(OPENAI_API_KEY),
-                'embedding_type': 'openai' if OPENAI_API_KEY else 'deterministic',
-                'llm_type': 'openai' if OPENAI_API_KEY else 'mock'
+                'embedding_type': 'openai' if OPENAI_API_KEY else 'local',
+                'llm_type': 'openai' if OPENAI_API_KEY else 'mock',
+                'embedding_cache': get_embedding_cache().stats()
             }
         })
     except Exception as e:
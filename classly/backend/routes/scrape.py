@@ -2,14 +2,51 @@
 Scrape routes - Trigger and manage scraping jobs
 """
 
-from flask import Blueprint, jsonify, request
+import json
+import time
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from db.supabase_client import supabase
-from services.scraper_service import ScraperService
-import threading
+from services.job_queue import get_job_queue, TERMINAL_STATUSES
 
 scrape_bp = Blueprint('scrape', __name__)
 
 
+def _authenticated_user_id(allow_query_token: bool = False):
+    """
+    User id for the request's Bearer token, or None if missing or invalid.
+
+    With `allow_query_token`, a Supabase access token (a short-lived JWT) in
+    ?access_token= is accepted too, since a browser EventSource can't set
+    headers.
+    """
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        token = auth_header.split(' ')[1]
+    elif allow_query_token and request.args.get('access_token'):
+        token = request.args['access_token']
+    else:
+        return None
+    try:
+        return supabase.auth.get_user(token).user.id
+    except Exception:
+        return None
+
+
+def _get_owned_job(job_id, allow_query_token: bool = False):
+    """
+    The queued job if it belongs to the request's user, else (None, error
+    response). Other users' jobs are reported as not found.
+    """
+    user_id = _authenticated_user_id(allow_query_token)
+    if not user_id:
+        return None, (jsonify({"error": "Unauthorized"}), 401)
+    job = get_job_queue().get(job_id)
+    if not job or str(job['payload'].get('user_id')) != str(user_id):
+        return None, (jsonify({"error": "Job not found"}), 404)
+    return job, None
+
+
 @scrape_bp.route('/start', methods=['POST'])
 def start_scrape():
     """
@@ -27,45 +64,32 @@ def start_scrape():
     if not platforms:
         platforms = ['canvas', 'gradescope', 'campuswire', 'prairielearn']
 
-    # Run scraping in background thread
-    def run_scrape():
-        scraper = ScraperService(user_id)
-        for i, platform in enumerate(platforms):
-            job_id = job_ids[i] if i < len(job_ids) else None
-            try:
-                scraper.scrape_platform(platform, job_id)
-            except Exception as e:
-                print(f"Error scraping {platform}: {e}")
-                if job_id:
-                    supabase.table('scrape_jobs').update({
-                        'status': 'failed',
-                        'error_message': str(e)
-                    }).eq('id', job_id).execute()
-
-    thread = threading.Thread(target=run_scrape)
-    thread.start()
+    # Queue one job per platform; job workers pick them up
+    queue = get_job_queue()
+    queued = []
+    for i, platform in enumerate(platforms):
+        job_id = job_ids[i] if i < len(job_ids) else None
+        queued.append(queue.enqueue('scrape_platform', {
+            'user_id': user_id,
+            'platform': platform,
+            'scrape_job_id': job_id,
+        }, job_id=job_id))
 
     return jsonify({
-        "message": "Scraping started",
-        "platforms": platforms
+        "message": "Scraping queued",
+        "platforms": platforms,
+        "job_ids": queued
     })
 
 
 @scrape_bp.route('/status', methods=['GET'])
 def get_scrape_status():
     """Get status of recent scrape jobs for the user"""
-    # Get user from auth header
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header.startswith('Bearer '):
+    # Verify the Bearer token and get its user
+    if not request.headers.get('Authorization', '').startswith('Bearer '):
         return jsonify({"error": "Unauthorized"}), 401
-
-    token = auth_header.split(' ')[1]
-    
-    # Verify token and get user
-    try:
-        user_response = supabase.auth.get_user(token)
-        user_id = user_response.user.id
-    except Exception as e:
+    user_id = _authenticated_user_id()
+    if not user_id:
         return jsonify({"error": "Invalid token"}), 401
 
     # Get recent jobs
@@ -103,38 +127,100 @@ def sync_from_courses():
     except Exception:
         pass
 
-    def run_sync():
-        scraper = ScraperService(user_id)
-        try:
-            scraper.sync_from_user_courses(job_id=job_id)
-        except Exception as e:
-            print(f"Sync from courses failed: {e}")
-            if job_id:
-                supabase.table('scrape_jobs').update({
-                    'status': 'failed',
-                    'error_message': str(e)
-                }).eq('id', job_id).execute()
-
-    thread = threading.Thread(target=run_sync)
-    thread.start()
+    job_id = get_job_queue().enqueue('sync_from_courses', {
+        'user_id': user_id,
+        'scrape_job_id': job_id,
+    }, job_id=job_id)
 
     return jsonify({
-        "message": "Sync from courses started",
+        "message": "Sync from courses queued",
         "job_id": job_id,
     })
 
 
+@scrape_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a queued job's status, attempts, result and error"""
+    job, error = _get_owned_job(job_id)
+    if error:
+        return error
+    return jsonify({"job": job})
+
+
+@scrape_bp.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """
+    Stream a job's progress as Server-Sent Events.
+
+    Each event is a pipeline stage (queued, running, scraping, parsing,
+    upserting, done, ...) with its counts and timings. Reconnecting clients
+    resume from the Last-Event-ID header (or ?after=<event id>). The token
+    (Bearer header, or ?access_token= for EventSource) is checked once, when
+    the stream opens.
+    """
+    _, error = _get_owned_job(job_id, allow_query_token=True)
+    if error:
+        return error
+    queue = get_job_queue()
+
+    after = request.headers.get('Last-Event-ID') or request.args.get('after') or 0
+    try:
+        last_id = int(after)
+    except ValueError:
+        last_id = 0
+
+    def generate():
+        nonlocal last_id
+        last_sent = time.monotonic()
+        finished_polls = 0
+        while True:
+            # Read status before events so no event written before the job
+            # finished can be missed; workers record the final event just
+            # after the terminal status, so drain one more poll after that
+            job = queue.get(job_id)
+            events = queue.get_events(job_id, after_id=last_id)
+            for event in events:
+                last_id = event['id']
+                payload = {**event['data'], 'stage': event['stage'], 'at': event['created_at']}
+                yield f"id: {event['id']}\nevent: {event['stage']}\ndata: {json.dumps(payload)}\n\n"
+                last_sent = time.monotonic()
+
+            if job is None or job['status'] in TERMINAL_STATUSES:
+                finished_polls = 0 if events else finished_polls + 1
+                if job is None or finished_polls > 1:
+                    break
+            if time.monotonic() - last_sent > 15:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            if not events:
+                time.sleep(0.5)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
 @scrape_bp.route('/cancel/<job_id>', methods=['POST'])
 def cancel_scrape(job_id):
-    """Cancel a running scrape job"""
-    # Update job status to cancelled
+    """Cancel one of the current user's queued or running scrape jobs"""
+    job, error = _get_owned_job(job_id)
+    if error:
+        return error
+
+    # Queued jobs are dropped; running jobs have their worker process killed
+    queue_status = get_job_queue().cancel(job_id)
+
+    # Mirror to scrape_jobs (its status check has no 'cancelled')
     result = supabase.table('scrape_jobs') \
         .update({'status': 'failed', 'error_message': 'Cancelled by user'}) \
         .eq('id', job_id) \
-        .eq('status', 'running') \
+        .eq('user_id', job['payload']['user_id']) \
+        .in_('status', ['pending', 'running']) \
         .execute()
 
-    if result.data:
+    if queue_status in ('queued', 'running', 'cancelled') or result.data:
         return jsonify({"message": "Job cancelled"})
     else:
         return jsonify({"error": "Job not found or already completed"}), 404
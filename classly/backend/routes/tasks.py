@@ -3,9 +3,10 @@ Task Sync Routes - API endpoints for syncing tasks from class sources
 """
 
 from flask import Blueprint, jsonify, request
-import threading
 import logging
 from services.task_sync_service import sync_tasks_for_class, sync_all_classes_for_user
+from services.parse_cache import get_parse_cache
+from services.job_queue import get_job_queue
 from db.supabase_client import supabase
 
 # Set up logging
@@ -24,18 +25,21 @@ def sync_tasks():
     {
         "user_id": "uuid",           // Required: user to sync for
         "class_id": "uuid",          // Optional: sync specific class only
-        "async": true                // Optional: run in background (default: false)
+        "async": true,               // Optional: run in background (default: false)
+        "force": true                // Optional: re-scrape fresh sources too (default: false)
     }
     """
     data = request.get_json() or {}
     user_id = data.get('user_id')
     class_id = data.get('class_id')
     run_async = data.get('async', False)
+    force = bool(data.get('force', False))
     
     logger.info(f"\n🔔 SYNC REQUEST RECEIVED")
     logger.info(f"   user_id: {user_id}")
     logger.info(f"   class_id: {class_id}")
     logger.info(f"   async: {run_async}")
+    logger.info(f"   force: {force}")
     
     if not user_id:
         logger.error("❌ Missing user_id in request")
@@ -44,27 +48,24 @@ def sync_tasks():
     def do_sync():
         if class_id:
             logger.info(f"🔄 Syncing single class: {class_id}")
-            return sync_tasks_for_class(class_id)
+            return sync_tasks_for_class(class_id, force=force)
         else:
             logger.info(f"🔄 Syncing all classes for user: {user_id}")
-            return sync_all_classes_for_user(user_id)
+            return sync_all_classes_for_user(user_id, force=force)
     
     if run_async:
-        # Run in background thread
-        def background_sync():
-            try:
-                result = do_sync()
-                logger.info(f"✅ Background sync completed: {result}")
-            except Exception as e:
-                logger.error(f"❌ Background sync error: {e}")
-        
-        thread = threading.Thread(target=background_sync)
-        thread.start()
+        # Queue for the job workers
+        job_id = get_job_queue().enqueue('sync_tasks', {
+            'user_id': user_id,
+            'class_id': class_id,
+            'force': force,
+        })
         
         return jsonify({
             'success': True,
-            'message': 'Sync started in background',
-            'async': True
+            'message': 'Sync queued in background',
+            'async': True,
+            'job_id': job_id
         })
     else:
         # Run synchronously
@@ -80,6 +81,17 @@ def sync_tasks():
             }), 500
 
 
+@tasks_bp.route('/parse-cache', methods=['GET'])
+def parse_cache_stats():
+    """
+    Get LLM parse cache counters (hits, misses, hit_rate, entries).
+    """
+    return jsonify({
+        'success': True,
+        'cache': get_parse_cache().stats()
+    })
+
+
 @tasks_bp.route('/list', methods=['GET'])
 def list_tasks():
     """
@@ -161,6 +173,16 @@ def update_task(task_id: str):
         }), 500
 
 
+def _with_token_flags(sources: list) -> list:
+    """Mark which class_sources rows have an API token in class_source_credentials."""
+    source_ids = [s['id'] for s in sources if s.get('id')]
+    with_token = set()
+    if source_ids:
+        result = supabase.table('class_source_credentials').select('source_id').in_('source_id', source_ids).execute()
+        with_token = {row['source_id'] for row in result.data or []}
+    return [dict(s, has_api_token=s.get('id') in with_token) for s in sources]
+
+
 @tasks_bp.route('/sources', methods=['GET'])
 def list_sources():
     """
@@ -181,7 +203,7 @@ def list_sources():
         
         return jsonify({
             'success': True,
-            'sources': result.data or []
+            'sources': _with_token_flags(result.data or [])
         })
         
     except Exception as e:
@@ -201,7 +223,8 @@ def add_source():
         "class_id": "uuid",
         "url": "https://...",
         "platform": "prairielearn",  // Optional, will auto-detect
-        "label": "CS 225 Assessments"  // Optional
+        "label": "CS 225 Assessments",  // Optional
+        "api_token": "..."  // Optional, PrairieLearn API token for this source
     }
     """
     data = request.get_json() or {}
@@ -226,17 +249,29 @@ def add_source():
         else:
             platform = 'other'
     
+    row = {
+        'class_id': class_id,
+        'url': url,
+        'platform': platform,
+        'label': data.get('label', '')
+    }
+
     try:
-        result = supabase.table('class_sources').insert({
-            'class_id': class_id,
-            'url': url,
-            'platform': platform,
-            'label': data.get('label', '')
-        }).execute()
+        result = supabase.table('class_sources').insert(row).execute()
+        source = result.data[0] if result.data else None
+        
+        if source:
+            # Tokens live in a service-role-only table, never on class_sources
+            if data.get('api_token'):
+                supabase.table('class_source_credentials').upsert({
+                    'source_id': source['id'],
+                    'api_token': data['api_token']
+                }, on_conflict='source_id').execute()
+            source = dict(source, has_api_token=bool(data.get('api_token')))
         
         return jsonify({
             'success': True,
-            'source': result.data[0] if result.data else None
+            'source': source
         })
         
     except Exception as e:
@@ -0,0 +1,230 @@
+"""
+Campuswire API client - incremental feed sync over Campuswire's JSON API.
+
+Replaces scrolling the rendered feed: pages through a group's posts newest
+first by `before` cursor, stops at the newest post seen on the previous run,
+and fetches the new posts' comments concurrently. Authenticates with
+CAMPUSWIRE_API_TOKEN or with the session of a logged-in Chrome profile.
+The caller owns the last-seen cursor (class_sources.sync_cursor): it passes
+it in and stores the result's 'newest_post' once the posts are saved.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CAMPUSWIRE_BASE_URL = os.getenv('CAMPUSWIRE_BASE_URL', 'https://campuswire.com')
+CAMPUSWIRE_API_URL = os.getenv('CAMPUSWIRE_API_URL', 'https://api.campuswire.com/v1')
+CAMPUSWIRE_API_TOKEN = os.getenv('CAMPUSWIRE_API_TOKEN')
+CAMPUSWIRE_API_TIMEOUT = float(os.getenv('CAMPUSWIRE_API_TIMEOUT', '20'))
+CAMPUSWIRE_PAGE_SIZE = int(os.getenv('CAMPUSWIRE_PAGE_SIZE', '50'))
+CAMPUSWIRE_DETAIL_CONCURRENCY = int(os.getenv('CAMPUSWIRE_DETAIL_CONCURRENCY', '4'))
+# Posts fetched per group on the first run, before any post has been seen
+CAMPUSWIRE_INITIAL_MAX_POSTS = int(os.getenv('CAMPUSWIRE_INITIAL_MAX_POSTS', '100'))
+# How long a session exported from a Chrome profile is reused before re-exporting
+CAMPUSWIRE_SESSION_TTL_SECONDS = float(os.getenv('CAMPUSWIRE_SESSION_TTL_SECONDS', '1800'))
+
+_session_cache: Dict[str, Dict[str, Any]] = {}
+_session_lock = threading.Lock()
+
+
+class CampuswireAuthError(Exception):
+    """Raised when Campuswire rejects our credentials."""
+
+
+def group_id_from_url(url: str) -> Optional[str]:
+    """Extract the group id from a feed URL like https://campuswire.com/c/<group>/feed."""
+    match = re.search(r'/c/([^/?#]+)', url or '')
+    return match.group(1) if match else None
+
+
+def export_profile_session(profile_dir: str, force: bool = False) -> Dict[str, Any]:
+    """
+    Get the Campuswire session (cookies and API token) from a logged-in Chrome profile.
+
+    The web app keeps its API token in localStorage, so both are read through
+    a pooled driver for that profile and cached for CAMPUSWIRE_SESSION_TTL_SECONDS.
+    """
+    with _session_lock:
+        cached = _session_cache.get(profile_dir)
+        if cached and not force and time.time() - cached['at'] < CAMPUSWIRE_SESSION_TTL_SECONDS:
+            return cached['session']
+
+    from scrapers.driver_pool import lease_driver
+
+    with lease_driver(profile_dir) as driver:
+        if not driver.current_url.startswith(CAMPUSWIRE_BASE_URL):
+            driver.get(CAMPUSWIRE_BASE_URL)
+        session = {
+            'cookies': {c['name']: c['value'] for c in driver.get_cookies()},
+            'token': driver.execute_script("return window.localStorage.getItem('token');"),
+        }
+
+    with _session_lock:
+        _session_cache[profile_dir] = {'session': session, 'at': time.time()}
+    return session
+
+
+def _session(token: Optional[str], cookies: Optional[Dict[str, str]]) -> requests.Session:
+    session = requests.Session()
+    session.headers['Accept'] = 'application/json'
+    if token:
+        session.headers['Authorization'] = f'Bearer {token}'
+    if cookies:
+        session.cookies.update(cookies)
+    return session
+
+
+def _get_json(session: requests.Session, path: str, params: Optional[Dict] = None) -> Any:
+    response = session.get(f"{CAMPUSWIRE_API_URL}{path}", params=params, timeout=CAMPUSWIRE_API_TIMEOUT)
+    if response.status_code in (401, 403):
+        raise CampuswireAuthError(f"Campuswire API returned {response.status_code}")
+    response.raise_for_status()
+    return response.json()
+
+
+def list_new_posts(session: requests.Session, group_id: str,
+                   last_seen: Optional[Dict[str, Any]] = None) -> List[Dict]:
+    """
+    Page through a group's posts newest first until reaching `last_seen`.
+
+    Pinned posts are listed ahead of newer ones, so an old pinned post is
+    skipped rather than ending the walk; only the last-seen post or an
+    unpinned post older than it does.
+    """
+    posts = []
+    before = None
+    while True:
+        params = {'number': CAMPUSWIRE_PAGE_SIZE}
+        if before:
+            params['before'] = before
+        page = _get_json(session, f"/group/{group_id}/posts", params)
+        if not page:
+            break
+        for post in page:
+            if last_seen and post.get('id') == last_seen['id']:
+                return posts
+            if last_seen and (post.get('publishedAt') or '') < last_seen['published_at']:
+                if post.get('pinned'):
+                    continue
+                return posts
+            posts.append(post)
+        if not last_seen and len(posts) >= CAMPUSWIRE_INITIAL_MAX_POSTS:
+            return posts[:CAMPUSWIRE_INITIAL_MAX_POSTS]
+        if len(page) < CAMPUSWIRE_PAGE_SIZE:
+            break
+        # Page on from the oldest unpinned post; a pinned one could be far older
+        unpinned = [p for p in page if not p.get('pinned')]
+        before = (unpinned or page)[-1].get('publishedAt')
+        if not before:
+            break
+    return posts
+
+
+def _fetch_comments(session: requests.Session, group_id: str, post_id: str) -> List[Dict]:
+    try:
+        return _get_json(session, f"/group/{group_id}/posts/{post_id}/comments") or []
+    except requests.RequestException as e:
+        logger.warning(f"⚠️ Could not fetch comments for Campuswire post {post_id}: {e}")
+        return []
+
+
+def _author_name(author: Optional[Dict]) -> Optional[str]:
+    if not author:
+        return None
+    name = f"{author.get('firstName') or ''} {author.get('lastName') or ''}".strip()
+    return name or None
+
+
+def _to_feed_post(post: Dict, comments: List[Dict], group_id: str, index: int) -> Dict[str, Any]:
+    """Shape an API post like a scrape_campuswire.scrape_feed() post plus its details."""
+    url = f"{CAMPUSWIRE_BASE_URL}/c/{group_id}/feed/{post.get('slug') or post['id']}"
+    return {
+        'index': index,
+        'id': post['id'],
+        'text': (post.get('body') or '').strip(),
+        'title': (post.get('title') or '').strip(),
+        'author': _author_name(post.get('author')),
+        'date': post.get('publishedAt'),
+        'category': post.get('categoryId'),
+        'type': post.get('type'),
+        'url': url,
+        'links': [{'text': post.get('title') or '', 'href': url}],
+        'comments': [{'index': j, 'text': (c.get('body') or '').strip()} for j, c in enumerate(comments, 1)],
+        'comment_count': len(comments),
+    }
+
+
+def fetch_new_posts(
+    feed_url: str,
+    *,
+    last_seen: Optional[Dict[str, Any]] = None,
+    token: Optional[str] = None,
+    profile_dir: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Fetch the posts added to a Campuswire feed since `last_seen`, the
+    {'id', 'published_at'} cursor the caller stored for this source.
+
+    Returns data shaped like scrape_campuswire.scrape_feed() output plus
+    'newest_post' (the next cursor), or None when no credentials are
+    available or Campuswire rejects them. Store 'newest_post' only after the
+    posts are saved, so a failed save refetches them next run.
+    """
+    group_id = group_id_from_url(feed_url)
+    token = token or CAMPUSWIRE_API_TOKEN
+    if not group_id or (not token and not profile_dir):
+        return None
+    if last_seen and not (last_seen.get('id') and last_seen.get('published_at')):
+        last_seen = None
+    for attempt in range(2):
+        cookies = None
+        session_token = token
+        if not token:
+            try:
+                exported = export_profile_session(profile_dir, force=attempt > 0)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not export Campuswire session from profile: {e}")
+                return None
+            cookies, session_token = exported['cookies'], exported['token']
+        session = _session(session_token, cookies)
+        try:
+            posts = list_new_posts(session, group_id, last_seen)
+        except CampuswireAuthError as e:
+            if token or attempt > 0:
+                logger.warning(f"⚠️ Campuswire API auth failed for group {group_id}: {e}")
+                return None
+            continue  # the exported session may be stale; re-export once
+        except requests.RequestException as e:
+            logger.warning(f"⚠️ Campuswire API request failed for group {group_id}: {e}")
+            return None
+        break
+    else:
+        return None
+
+    with ThreadPoolExecutor(max_workers=max(1, CAMPUSWIRE_DETAIL_CONCURRENCY)) as executor:
+        comments = list(executor.map(lambda p: _fetch_comments(session, group_id, p['id']), posts))
+
+    feed_posts = [_to_feed_post(post, post_comments, group_id, i)
+                  for i, (post, post_comments) in enumerate(zip(posts, comments), 1)]
+    newest = max(posts, key=lambda p: p.get('publishedAt') or '', default=None)
+
+    logger.info(f"⚡ Campuswire API returned {len(feed_posts)} new posts for group {group_id}")
+    return {
+        'feed_url': feed_url,
+        'posts': feed_posts,
+        'total_posts': len(feed_posts),
+        'scraped_at': datetime.now().isoformat(),
+        'group_id': group_id,
+        'newest_post': ({'id': newest['id'], 'published_at': newest['publishedAt']}
+                        if newest and newest.get('publishedAt') else last_seen),
+    }
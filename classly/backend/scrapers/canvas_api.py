@@ -0,0 +1,150 @@
+"""
+Canvas REST API client - fetches a course's assignments over HTTP.
+
+Fast path for canvas_scraper: one paginated JSON request instead of rendering
+/courses/<id>/assignments in Chrome. Authenticates with an API token
+(CANVAS_API_TOKEN) or with the session cookies of a logged-in Chrome profile.
+"""
+
+import os
+import time
+import json
+import logging
+import threading
+from typing import Optional, List, Dict, Any
+from urllib.parse import urljoin
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CANVAS_BASE_URL = os.getenv('CANVAS_BASE_URL', 'https://canvas.illinois.edu/')
+CANVAS_API_TOKEN = os.getenv('CANVAS_API_TOKEN')
+CANVAS_API_TIMEOUT = float(os.getenv('CANVAS_API_TIMEOUT', '20'))
+# How long cookies exported from a Chrome profile are reused before re-exporting
+CANVAS_COOKIE_TTL_SECONDS = float(os.getenv('CANVAS_COOKIE_TTL_SECONDS', '1800'))
+
+_cookie_cache: Dict[str, Dict[str, Any]] = {}
+_cookie_lock = threading.Lock()
+
+
+class CanvasAuthError(Exception):
+    """Raised when Canvas rejects our credentials."""
+
+
+def export_profile_cookies(profile_dir: str, force: bool = False) -> Dict[str, str]:
+    """
+    Get Canvas session cookies from a logged-in Chrome profile.
+
+    Chrome encrypts its cookie store on disk, so the cookies are read through a
+    pooled driver for that profile and cached for CANVAS_COOKIE_TTL_SECONDS.
+    """
+    with _cookie_lock:
+        cached = _cookie_cache.get(profile_dir)
+        if cached and not force and time.time() - cached['at'] < CANVAS_COOKIE_TTL_SECONDS:
+            return cached['cookies']
+
+    from scrapers.driver_pool import lease_driver
+
+    with lease_driver(profile_dir) as driver:
+        if not driver.current_url.startswith(CANVAS_BASE_URL.rstrip('/')):
+            driver.get(CANVAS_BASE_URL)
+        cookies = {c['name']: c['value'] for c in driver.get_cookies()}
+
+    with _cookie_lock:
+        _cookie_cache[profile_dir] = {'cookies': cookies, 'at': time.time()}
+    return cookies
+
+
+def _session(token: Optional[str], cookies: Optional[Dict[str, str]]) -> requests.Session:
+    session = requests.Session()
+    session.headers['Accept'] = 'application/json'
+    if token:
+        session.headers['Authorization'] = f'Bearer {token}'
+    if cookies:
+        session.cookies.update(cookies)
+    return session
+
+
+def _decode(response: requests.Response) -> Any:
+    # Cookie-authenticated responses carry Canvas's anti-JSON-hijacking prefix
+    text = response.text
+    if text.startswith('while(1);'):
+        text = text[len('while(1);'):]
+    return json.loads(text)
+
+
+def get_paginated(session: requests.Session, url: str, params: Optional[Dict] = None) -> List[Dict]:
+    """GET every page of a Canvas list endpoint by following its Link: rel="next" header."""
+    items = []
+    while url:
+        response = session.get(url, params=params, timeout=CANVAS_API_TIMEOUT)
+        if response.status_code in (401, 403):
+            raise CanvasAuthError(f"Canvas API returned {response.status_code}")
+        response.raise_for_status()
+        if 'json' not in response.headers.get('Content-Type', ''):
+            # Cookie auth that expired redirects to the HTML login page
+            raise CanvasAuthError("Canvas API returned a non-JSON response (login page?)")
+        items.extend(_decode(response))
+        url = response.links.get('next', {}).get('url')
+        params = None  # the next link already carries the query string
+    return items
+
+
+def _to_scraper_dict(assignment: Dict) -> Dict[str, Any]:
+    """Shape an API assignment like canvas_scraper.get_assignments_for_course() output."""
+    return {
+        "id": assignment['id'],
+        "title": assignment.get('name') or '',
+        "url": assignment.get('html_url') or urljoin(
+            CANVAS_BASE_URL, f"/courses/{assignment.get('course_id')}/assignments/{assignment['id']}"
+        ),
+        "due_text_raw": None,
+        "due_at": assignment.get('due_at'),
+        "points_possible": assignment.get('points_possible'),
+    }
+
+
+def fetch_course_assignments(
+    course_id: int,
+    *,
+    token: Optional[str] = None,
+    profile_dir: Optional[str] = None,
+) -> Optional[List[Dict]]:
+    """
+    Fetch all assignments for a course from /api/v1/courses/:id/assignments.
+
+    Uses `token` (or CANVAS_API_TOKEN), otherwise cookies exported from
+    `profile_dir`. Returns None when no credentials are available or Canvas
+    rejects them, so callers can fall back to Selenium.
+    """
+    token = token or CANVAS_API_TOKEN
+    if not token and not profile_dir:
+        return None
+
+    url = urljoin(CANVAS_BASE_URL, f"/api/v1/courses/{course_id}/assignments")
+    params = {'per_page': 100, 'order_by': 'due_at'}
+
+    for attempt in range(2):
+        cookies = None
+        if not token:
+            try:
+                cookies = export_profile_cookies(profile_dir, force=attempt > 0)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not export Canvas cookies from profile: {e}")
+                return None
+        try:
+            assignments = get_paginated(_session(token, cookies), url, params)
+        except CanvasAuthError as e:
+            if token or attempt > 0:
+                logger.warning(f"⚠️ Canvas API auth failed for course {course_id}: {e}")
+                return None
+            continue  # cookies may be stale; re-export once
+        except requests.RequestException as e:
+            logger.warning(f"⚠️ Canvas API request failed for course {course_id}: {e}")
+            return None
+
+        logger.info(f"⚡ Canvas API returned {len(assignments)} assignments for course {course_id}")
+        return [_to_scraper_dict(a) for a in assignments if a.get('id') is not None]
+
+    return None
@@ -4,22 +4,18 @@ Used by the backend to sync assignments from user's course_sources (Canvas links
 """
 
 import re
-import time
 from typing import Optional, List, Dict
 from urllib.parse import urljoin, urlparse
 
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-try:
-    from webdriver_manager.chrome import ChromeDriverManager
-except ImportError:
-    ChromeDriverManager = None
+from scrapers.canvas_api import fetch_course_assignments
+from scrapers.driver_pool import create_chrome_driver, lease_driver
+from scrapers.waits import wait_for_network_idle, wait_for_platform_ready
 
 CANVAS_BASE_URL = "https://canvas.illinois.edu/"
 
@@ -44,7 +40,9 @@ def get_assignments_for_course(driver: webdriver.Chrome, course_id: int) -> List
     url = urljoin(CANVAS_BASE_URL, f"/courses/{course_id}/assignments")
     driver.get(url)
     WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.CSS_SELECTOR, "body")))
-    time.sleep(0.5)
+    # The assignment list is filled in by XHR after load
+    wait_for_network_idle(driver, timeout=10, name='canvas.network_idle')
+    wait_for_platform_ready(driver, 'canvas', timeout=10)
 
     soup = BeautifulSoup(driver.page_source, "html.parser")
     assignments = []
@@ -81,40 +79,41 @@ def scrape_assignments_for_course_url(
     headless: bool = True,
     driver: Optional[webdriver.Chrome] = None,
     profile_dir: Optional[str] = None,
+    api_token: Optional[str] = None,
+    use_api: bool = True,
 ) -> List[Dict]:
     """
     Scrape assignments for a single Canvas course URL.
 
     - course_url: e.g. https://canvas.illinois.edu/courses/66465
     - headless: run Chrome headless (default True for backend)
-    - driver: reuse an existing driver (e.g. already logged in). If None, creates a new one.
+    - driver: reuse an existing driver (e.g. already logged in). If None, leases a warm
+      headless driver from the shared pool (or launches a visible one if headless=False).
     - profile_dir: optional path to Chrome user-data-dir with saved Canvas login (set CANVAS_PROFILE_DIR in env).
+    - api_token / use_api: when no driver is passed, first try the Canvas REST API (token, CANVAS_API_TOKEN,
+      or the profile's session cookies) and only render the page in Chrome if that fails.
 
-    Returns list of {id, title, url, due_text_raw}.
+    Returns list of {id, title, url, due_text_raw} (API results also carry due_at).
     Without login (profile or shared driver), the assignments page may show login and return empty list.
     """
     course_id = _parse_course_id_from_url(course_url)
     if not course_id:
         return []
 
-    own_driver = False
-    if driver is None:
-        opts = Options()
-        if headless:
-            opts.add_argument("--headless=new")
-        opts.add_argument("--no-sandbox")
-        opts.add_argument("--disable-dev-shm-usage")
-        if profile_dir:
-            opts.add_argument(f"--user-data-dir={profile_dir}")
-        if ChromeDriverManager:
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=opts)
-        else:
-            driver = webdriver.Chrome(options=opts)
-        own_driver = True
+    if driver is not None:
+        return get_assignments_for_course(driver, course_id)
+
+    if use_api:
+        assignments = fetch_course_assignments(course_id, token=api_token, profile_dir=profile_dir)
+        if assignments is not None:
+            return assignments
+
+    if headless:
+        with lease_driver(profile_dir, network_logging=True) as pooled_driver:
+            return get_assignments_for_course(pooled_driver, course_id)
 
+    driver = create_chrome_driver(headless=False, profile_dir=profile_dir, network_logging=True)
     try:
         return get_assignments_for_course(driver, course_id)
     finally:
-        if own_driver:
-            driver.quit()
+        driver.quit()
@@ -0,0 +1,271 @@
+"""
+WebDriver pool - keeps warm, logged-in Chrome drivers and leases them to scrapers.
+
+Launching Chrome (and resolving chromedriver) dominates the cost of scraping a
+single page, so drivers are kept alive between scrapes, one pool per Chrome
+profile. A driver is recycled after a number of leases or once its browser
+processes exceed a memory ceiling. CDP performance logging (for
+waits.wait_for_network_idle) is only enabled for callers that ask for it.
+"""
+
+import os
+import atexit
+import shutil
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Iterator
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from scrapers.waits import enable_network_logging
+
+try:
+    from webdriver_manager.chrome import ChromeDriverManager
+except ImportError:
+    ChromeDriverManager = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+DRIVER_POOL_SIZE = int(os.getenv('DRIVER_POOL_SIZE', '3'))
+DRIVER_MAX_PAGES = int(os.getenv('DRIVER_MAX_PAGES', '50'))
+DRIVER_MAX_MEMORY_MB = float(os.getenv('DRIVER_MAX_MEMORY_MB', '1500'))
+DRIVER_LEASE_TIMEOUT = float(os.getenv('DRIVER_LEASE_TIMEOUT', '300'))
+
+_chromedriver_path: Optional[str] = None
+_chromedriver_lock = threading.Lock()
+
+
+def chromedriver_path() -> Optional[str]:
+    """Resolve the chromedriver binary once per process (None lets Selenium find it)."""
+    global _chromedriver_path
+    if _chromedriver_path is None and ChromeDriverManager:
+        with _chromedriver_lock:
+            if _chromedriver_path is None:
+                _chromedriver_path = ChromeDriverManager().install()
+    return _chromedriver_path
+
+
+def create_chrome_driver(
+    *,
+    headless: bool = True,
+    profile_dir: Optional[str] = None,
+    extra_args: Optional[List[str]] = None,
+    network_logging: bool = False,
+) -> webdriver.Chrome:
+    """
+    Launch a Chrome driver with the options every scraper uses.
+    `network_logging` turns on the performance log wait_for_network_idle reads.
+    """
+    opts = Options()
+    if headless:
+        opts.add_argument("--headless=new")
+    opts.add_argument("--no-sandbox")
+    opts.add_argument("--disable-dev-shm-usage")
+    opts.add_argument("--disable-gpu")
+    opts.add_argument("--window-size=1920,1080")
+    for arg in extra_args or []:
+        opts.add_argument(arg)
+    if profile_dir:
+        opts.add_argument(f"--user-data-dir={profile_dir}")
+    if network_logging:
+        enable_network_logging(opts)
+
+    path = chromedriver_path()
+    if path:
+        return webdriver.Chrome(service=Service(path), options=opts)
+    return webdriver.Chrome(options=opts)
+
+
+def _clone_profile(profile_dir: str) -> str:
+    """Copy a Chrome profile so another browser can use its login at the same time."""
+    clone = tempfile.mkdtemp(prefix='chrome-pool-')
+    shutil.copytree(
+        profile_dir, clone, dirs_exist_ok=True,
+        ignore=shutil.ignore_patterns('Singleton*', 'lockfile', '*Cache*'),
+    )
+    return clone
+
+
+class _PooledDriver:
+    def __init__(self, driver: webdriver.Chrome, profile_copy: Optional[str], network_logging: bool = False):
+        self.driver = driver
+        self.profile_copy = profile_copy
+        self.network_logging = network_logging
+        self.pages = 0
+
+    def drain_network_log(self) -> None:
+        """Discard buffered performance log entries so they don't pile up between leases."""
+        if not self.network_logging:
+            return
+        try:
+            self.driver.get_log('performance')
+        except Exception:
+            pass
+
+    def memory_mb(self) -> Optional[float]:
+        """Resident memory of chromedriver plus its browser processes."""
+        if psutil is None:
+            return None
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            procs = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in procs) / (1024 * 1024)
+        except Exception:
+            return None
+
+    def quit(self) -> None:
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        if self.profile_copy:
+            shutil.rmtree(self.profile_copy, ignore_errors=True)
+
+
+class DriverPool:
+    """Pool of up to `size` headless Chrome drivers sharing one profile."""
+
+    def __init__(
+        self,
+        profile_dir: Optional[str] = None,
+        size: int = DRIVER_POOL_SIZE,
+        max_pages: int = DRIVER_MAX_PAGES,
+        max_memory_mb: float = DRIVER_MAX_MEMORY_MB,
+        network_logging: bool = False,
+    ):
+        self.profile_dir = profile_dir
+        self.network_logging = network_logging
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._idle: List[_PooledDriver] = []
+        self._profile_in_use = False
+        self._closed = False
+
+    def _launch(self) -> _PooledDriver:
+        # Chrome locks its user-data-dir, so only one live driver may use the
+        # original profile; the rest get a copy of it.
+        profile = self.profile_dir
+        profile_copy = None
+        with self._lock:
+            use_original = profile and not self._profile_in_use
+            if use_original:
+                self._profile_in_use = True
+        if profile and not use_original:
+            profile_copy = profile = _clone_profile(self.profile_dir)
+        try:
+            network_logging = self.network_logging
+            driver = create_chrome_driver(headless=True, profile_dir=profile, network_logging=network_logging)
+        except Exception:
+            if use_original:
+                with self._lock:
+                    self._profile_in_use = False
+            if profile_copy:
+                shutil.rmtree(profile_copy, ignore_errors=True)
+            raise
+        logger.info(f"🚗 Launched pooled Chrome (profile={self.profile_dir or 'none'})")
+        return _PooledDriver(driver, profile_copy, network_logging)
+
+    def _retire(self, pooled: _PooledDriver) -> None:
+        pooled.quit()
+        if self.profile_dir and pooled.profile_copy is None:
+            with self._lock:
+                self._profile_in_use = False
+
+    def _should_recycle(self, pooled: _PooledDriver) -> bool:
+        if self.max_pages and pooled.pages >= self.max_pages:
+            return True
+        memory = pooled.memory_mb()
+        return bool(self.max_memory_mb and memory and memory > self.max_memory_mb)
+
+    @contextmanager
+    def lease(self, timeout: float = DRIVER_LEASE_TIMEOUT) -> Iterator[webdriver.Chrome]:
+        """Borrow a driver; it goes back to the pool (or is recycled) on exit."""
+        if self._closed:
+            raise RuntimeError("Driver pool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No Chrome driver free after {timeout:.0f}s")
+
+        pooled = None
+        broken = False
+        try:
+            with self._lock:
+                pooled = self._idle.pop() if self._idle else None
+            if pooled is None:
+                pooled = self._launch()
+            try:
+                yield pooled.driver
+            except WebDriverException:
+                broken = True
+                raise
+        finally:
+            if pooled is not None:
+                pooled.pages += 1
+                if broken or self._closed or self._should_recycle(pooled):
+                    logger.info(f"♻️ Recycling pooled Chrome after {pooled.pages} pages")
+                    self._retire(pooled)
+                else:
+                    pooled.drain_network_log()
+                    with self._lock:
+                        self._idle.append(pooled)
+            self._slots.release()
+
+    def close(self) -> None:
+        """Quit all idle drivers; leased drivers are quit when returned."""
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._retire(pooled)
+
+
+_pools: Dict[Optional[str], DriverPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_driver_pool(profile_dir: Optional[str] = None, network_logging: bool = False) -> DriverPool:
+    """
+    Get the process-wide pool for a Chrome profile (None = no profile).
+    Once any caller asks for `network_logging`, drivers the pool launches
+    from then on have it; older ones make wait_for_network_idle poll instead.
+    """
+    with _pools_lock:
+        pool = _pools.get(profile_dir)
+        if pool is None or pool._closed:
+            pool = _pools[profile_dir] = DriverPool(profile_dir, network_logging=network_logging)
+        elif network_logging:
+            pool.network_logging = True
+        return pool
+
+
+@contextmanager
+def lease_driver(profile_dir: Optional[str] = None, network_logging: bool = False) -> Iterator[webdriver.Chrome]:
+    """
+    Borrow a warm headless driver for `profile_dir` from its shared pool.
+    Pass `network_logging` when the caller uses wait_for_network_idle.
+    """
+    with get_driver_pool(profile_dir, network_logging).lease() as driver:
+        yield driver
+
+
+def close_all_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all_pools)
@@ -0,0 +1,41 @@
+"""
+PrairieLearn access rules - pick the deadline students see for an assessment.
+
+Shared by the backend PrairieLearn scraper and the standalone pl.py
+downloader, so it only depends on the standard library. Standalone scripts at
+the repo root import this by adding classly/backend to sys.path.
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse an API timestamp ('2026-02-03T23:59:00-06') into an aware datetime."""
+    if not value:
+        return None
+    value = re.sub(r'([+-]\d{2})$', r'\1:00', value.replace(' ', 'T', 1))
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def latest_due_rule(rules: List[Dict]) -> Tuple[Optional[Dict], Optional[datetime]]:
+    """
+    (rule, end datetime) for the latest end date among full-credit rules that
+    apply to everyone (no uid list, no exam session). End dates are compared
+    as parsed datetimes, since rules carry different UTC offsets across DST.
+    Returns (None, None) when no rule has an end date.
+    """
+    general = [r for r in rules or [] if not r.get('uids') and not r.get('exam_uuid') and r.get('end_date')]
+    candidates = [r for r in general if (r.get('credit') or 0) >= 100] or general
+    if not candidates:
+        return None, None
+    parsed = [(parse_timestamp(r['end_date']), r) for r in candidates]
+    dated = [(due, r) for due, r in parsed if due is not None]
+    if not dated:
+        return candidates[0], None
+    due, rule = max(dated, key=lambda pair: pair[0].timestamp())
+    return rule, due
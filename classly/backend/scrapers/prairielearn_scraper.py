@@ -1,29 +1,38 @@
 """
 PrairieLearn scraper - fetches assessments for a course instance.
-Uses Selenium to handle authentication and scrape assessment tables.
+Uses the PrairieLearn API when a token is available; otherwise Selenium
+handles authentication and scrapes the assessments table.
 """
 
-import json
+import os
 import re
-import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from urllib.parse import urlparse, urljoin
 
+import requests
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-try:
-    from webdriver_manager.chrome import ChromeDriverManager
-except ImportError:
-    ChromeDriverManager = None
+from scrapers.driver_pool import create_chrome_driver, lease_driver
+from scrapers.prairielearn_access import latest_due_rule
+from scrapers.waits import wait_for_document_ready, wait_for_platform_ready
+
+logger = logging.getLogger(__name__)
 
 PRAIRIELEARN_BASE_URL = "https://us.prairielearn.com"
+PRAIRIELEARN_API_URL = os.getenv('PRAIRIELEARN_API_URL', f"{PRAIRIELEARN_BASE_URL}/pl/api/v1")
+PRAIRIELEARN_API_TOKEN = os.getenv('PRAIRIELEARN_API_TOKEN')
+PRAIRIELEARN_API_TIMEOUT = float(os.getenv('PRAIRIELEARN_API_TIMEOUT', '20'))
+PRAIRIELEARN_API_CONCURRENCY = int(os.getenv('PRAIRIELEARN_API_CONCURRENCY', '4'))
+
+# Column order of the assessments table, mirrored by API results
+API_HEADERS = ['Assessment', 'Title', 'Available credit', 'Score']
 
 
 def _parse_course_instance_id(url: str) -> Optional[str]:
@@ -44,21 +53,193 @@ def _parse_due_date(due_text: str) -> Optional[str]:
     return due_text if due_text else None
 
 
+def _api_get(session: requests.Session, path: str) -> Any:
+    response = session.get(f"{PRAIRIELEARN_API_URL}{path}", timeout=PRAIRIELEARN_API_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def _due_from_access_rules(rules: List[Dict]) -> Dict[str, Any]:
+    """
+    Pick the deadline students see from an assessment's access rules (see
+    latest_due_rule) and shape it like the assessments table's due column.
+    """
+    rule, due = latest_due_rule(rules)
+    if rule is None:
+        return {'due_at': None, 'due_info': 'None'}
+    if due is None:
+        return {'due_at': None, 'due_info': f"{rule.get('credit') or 0}%"}
+    return {
+        'due_at': due.isoformat(),
+        'due_info': f"{rule.get('credit') or 0}% until {due:%H:%M, %a, %b} {due.day}, {due.year}",
+    }
+
+
+def _api_assessment_row(assessment: Dict, due: Dict[str, Any], course_instance_id: str) -> Dict[str, Any]:
+    """Shape an API assessment like a parsed row of the assessments table."""
+    href = f"{PRAIRIELEARN_BASE_URL}/pl/course_instance/{course_instance_id}/assessment/{assessment['assessment_id']}/"
+    label = assessment.get('assessment_label') or ''
+    title = assessment.get('title') or assessment.get('assessment_name') or ''
+    texts = [label, title, due['due_info'], '']
+    return {
+        "week": assessment.get('assessment_set_heading'),
+        "cells": [{"index": i, "text": text, "html": ""} for i, text in enumerate(texts)],
+        "links": [{"text": title, "href": href}],
+        "label": label,
+        "title": title,
+        "due_info": due['due_info'],
+        "due_at": due['due_at'],
+        "assessment_id": str(assessment['assessment_id']),
+        "type": assessment.get('type'),
+    }
+
+
+def fetch_assessments_api(course_url: str, course_instance_id: str, token: str) -> Dict[str, Any]:
+    """
+    Fetch a course instance's assessments and their access rules from the
+    PrairieLearn API. Returns the same shape as the Selenium scrape.
+    Raises requests.RequestException on auth or network failures.
+    """
+    session = requests.Session()
+    session.headers['Private-Token'] = token
+    base_path = f"/course_instances/{course_instance_id}"
+
+    assessments = _api_get(session, f"{base_path}/assessments")
+    assessments.sort(key=lambda a: (a.get('assessment_set_number') or 0, a.get('assessment_number') or '',
+                                    a.get('assessment_label') or ''))
+
+    def access_rules(assessment):
+        return _api_get(session, f"{base_path}/assessments/{assessment['assessment_id']}/assessment_access_rules")
+
+    with ThreadPoolExecutor(max_workers=max(1, PRAIRIELEARN_API_CONCURRENCY)) as executor:
+        rules = list(executor.map(access_rules, assessments))
+
+    return {
+        "headers": API_HEADERS,
+        "assessments": [_api_assessment_row(a, _due_from_access_rules(r), course_instance_id)
+                        for a, r in zip(assessments, rules)],
+        "course_instance_id": course_instance_id,
+        "scraped_at": datetime.now().isoformat(),
+        "source_url": course_url,
+    }
+
+
+def _scrape_assessments_page(driver: webdriver.Chrome, course_url: str, course_instance_id: str) -> Dict[str, Any]:
+    """Load a course instance's assessments page in `driver` and parse its table."""
+    driver.get(course_url)
+    WebDriverWait(driver, 30).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "table, .alert, body"))
+    )
+    wait_for_platform_ready(driver, 'prairielearn', timeout=10)
+
+    soup = BeautifulSoup(driver.page_source, "html.parser")
+
+    # Check if we hit a login page
+    if "login" in driver.current_url.lower() or soup.select_one('form[action*="login"]'):
+        return {
+            "error": "Authentication required - please log in to PrairieLearn",
+            "assessments": [],
+            "course_instance_id": course_instance_id
+        }
+
+    # Find the assessments table
+    table = soup.select_one('table.table')
+    if not table:
+        return {
+            "error": "Could not find assessments table",
+            "assessments": [],
+            "course_instance_id": course_instance_id
+        }
+
+    # Parse headers
+    headers = []
+    header_row = table.select_one('thead tr')
+    if header_row:
+        headers = [th.get_text(strip=True) for th in header_row.select('th')]
+
+    # Parse assessment rows
+    assessments = []
+    rows = table.select('tbody tr')
+
+    current_week = None
+    for row in rows:
+        cells = row.select('td')
+
+        # Check if this is a week separator row
+        if len(cells) == 1 or row.select_one('th[colspan]'):
+            week_text = row.get_text(strip=True)
+            if week_text:
+                current_week = week_text
+            continue
+
+        if len(cells) < 2:
+            continue
+
+        # Extract assessment data
+        assessment = {
+            "week": current_week,
+            "cells": [],
+            "links": []
+        }
+
+        for idx, cell in enumerate(cells):
+            cell_text = cell.get_text(strip=True)
+            assessment["cells"].append({
+                "index": idx,
+                "text": cell_text,
+                "html": str(cell)[:200]  # Truncate HTML
+            })
+
+            # Extract links
+            for link in cell.select('a[href]'):
+                href = link.get('href', '')
+                if href.startswith('/'):
+                    href = urljoin(PRAIRIELEARN_BASE_URL, href)
+                assessment["links"].append({
+                    "text": link.get_text(strip=True),
+                    "href": href
+                })
+
+        # Extract key fields based on typical PrairieLearn structure
+        if len(assessment["cells"]) >= 4:
+            assessment["label"] = assessment["cells"][0]["text"]  # A1, POGIL1, etc.
+            assessment["title"] = assessment["cells"][1]["text"]  # Assessment name
+            assessment["due_info"] = assessment["cells"][2]["text"]  # Due date/credit info
+            assessment["status"] = assessment["cells"][3]["text"]  # Score/status
+
+        assessments.append(assessment)
+
+    return {
+        "headers": headers,
+        "assessments": assessments,
+        "course_instance_id": course_instance_id,
+        "scraped_at": datetime.now().isoformat(),
+        "source_url": course_url
+    }
+
+
 def scrape_prairielearn_assessments(
     course_url: str,
     *,
     headless: bool = True,
     driver: Optional[webdriver.Chrome] = None,
     profile_dir: Optional[str] = None,
+    api_token: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Scrape assessments from a PrairieLearn course instance.
+
+    With an API token (per source, or PRAIRIELEARN_API_TOKEN) the assessments
+    come from the PrairieLearn API and no browser is started; if the API call
+    fails, the page is scraped with Selenium instead.
     
     Args:
         course_url: URL like https://us.prairielearn.com/pl/course_instance/206336/assessments
         headless: Run Chrome in headless mode
-        driver: Reuse an existing driver (with auth session)
+        driver: Reuse an existing driver (with auth session). If None, leases a warm
+            headless driver from the shared pool (or launches a visible one if headless=False)
         profile_dir: Path to Chrome profile with saved login
+        api_token: PrairieLearn API token for this source
     
     Returns:
         Dict with headers, assessments list, and metadata
@@ -70,121 +251,27 @@ def scrape_prairielearn_assessments(
     # Ensure URL ends with /assessments
     if not course_url.rstrip('/').endswith('/assessments'):
         course_url = course_url.rstrip('/') + '/assessments'
+
+    api_token = api_token or PRAIRIELEARN_API_TOKEN
+    if api_token:
+        try:
+            return fetch_assessments_api(course_url, course_instance_id, api_token)
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"⚠️ PrairieLearn API failed for course instance {course_instance_id}, "
+                           f"falling back to Selenium: {e}")
     
-    own_driver = False
-    if driver is None:
-        opts = Options()
-        if headless:
-            opts.add_argument("--headless=new")
-        opts.add_argument("--no-sandbox")
-        opts.add_argument("--disable-dev-shm-usage")
-        opts.add_argument("--disable-gpu")
-        opts.add_argument("--window-size=1920,1080")
-        if profile_dir:
-            opts.add_argument(f"--user-data-dir={profile_dir}")
-        
-        if ChromeDriverManager:
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=opts)
-        else:
-            driver = webdriver.Chrome(options=opts)
-        own_driver = True
+    if driver is not None:
+        return _scrape_assessments_page(driver, course_url, course_instance_id)
+    
+    if headless:
+        with lease_driver(profile_dir) as pooled_driver:
+            return _scrape_assessments_page(pooled_driver, course_url, course_instance_id)
     
+    driver = create_chrome_driver(headless=False, profile_dir=profile_dir)
     try:
-        driver.get(course_url)
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "table, .alert, body"))
-        )
-        time.sleep(1)  # Let dynamic content load
-        
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        
-        # Check if we hit a login page
-        if "login" in driver.current_url.lower() or soup.select_one('form[action*="login"]'):
-            return {
-                "error": "Authentication required - please log in to PrairieLearn",
-                "assessments": [],
-                "course_instance_id": course_instance_id
-            }
-        
-        # Find the assessments table
-        table = soup.select_one('table.table')
-        if not table:
-            return {
-                "error": "Could not find assessments table",
-                "assessments": [],
-                "course_instance_id": course_instance_id
-            }
-        
-        # Parse headers
-        headers = []
-        header_row = table.select_one('thead tr')
-        if header_row:
-            headers = [th.get_text(strip=True) for th in header_row.select('th')]
-        
-        # Parse assessment rows
-        assessments = []
-        rows = table.select('tbody tr')
-        
-        current_week = None
-        for row in rows:
-            cells = row.select('td')
-            
-            # Check if this is a week separator row
-            if len(cells) == 1 or row.select_one('th[colspan]'):
-                week_text = row.get_text(strip=True)
-                if week_text:
-                    current_week = week_text
-                continue
-            
-            if len(cells) < 2:
-                continue
-            
-            # Extract assessment data
-            assessment = {
-                "week": current_week,
-                "cells": [],
-                "links": []
-            }
-            
-            for idx, cell in enumerate(cells):
-                cell_text = cell.get_text(strip=True)
-                assessment["cells"].append({
-                    "index": idx,
-                    "text": cell_text,
-                    "html": str(cell)[:200]  # Truncate HTML
-                })
-                
-                # Extract links
-                for link in cell.select('a[href]'):
-                    href = link.get('href', '')
-                    if href.startswith('/'):
-                        href = urljoin(PRAIRIELEARN_BASE_URL, href)
-                    assessment["links"].append({
-                        "text": link.get_text(strip=True),
-                        "href": href
-                    })
-            
-            # Extract key fields based on typical PrairieLearn structure
-            if len(assessment["cells"]) >= 4:
-                assessment["label"] = assessment["cells"][0]["text"]  # A1, POGIL1, etc.
-                assessment["title"] = assessment["cells"][1]["text"]  # Assessment name
-                assessment["due_info"] = assessment["cells"][2]["text"]  # Due date/credit info
-                assessment["status"] = assessment["cells"][3]["text"]  # Score/status
-            
-            assessments.append(assessment)
-        
-        return {
-            "headers": headers,
-            "assessments": assessments,
-            "course_instance_id": course_instance_id,
-            "scraped_at": datetime.now().isoformat(),
-            "source_url": course_url
-        }
-        
+        return _scrape_assessments_page(driver, course_url, course_instance_id)
     finally:
-        if own_driver:
-            driver.quit()
+        driver.quit()
 
 
 def scrape_prairielearn_with_cookies(
@@ -203,22 +290,12 @@ def scrape_prairielearn_with_cookies(
     Returns:
         Scraped assessment data
     """
-    opts = Options()
-    if headless:
-        opts.add_argument("--headless=new")
-    opts.add_argument("--no-sandbox")
-    opts.add_argument("--disable-dev-shm-usage")
-    
-    if ChromeDriverManager:
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=opts)
-    else:
-        driver = webdriver.Chrome(options=opts)
+    driver = create_chrome_driver(headless=headless)
     
     try:
         # First visit the domain to set cookies
         driver.get(PRAIRIELEARN_BASE_URL)
-        time.sleep(1)
+        wait_for_document_ready(driver, timeout=10, name='prairielearn.cookie_domain')
         
         # Add cookies
         for cookie in cookies:
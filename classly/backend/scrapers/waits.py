@@ -0,0 +1,266 @@
+"""
+Scraper waits - condition-based waits shared by all scrapers.
+
+Replaces fixed time.sleep() pauses with waits that return as soon as the page
+is actually ready: document ready, DOM stable (no mutations for a quiet
+period), network idle (Chrome performance log, i.e. CDP Network events, with a
+Resource Timing fallback for other browsers) and per-platform readiness
+predicates. Every wait records how long it took in a per-name histogram.
+
+Standalone scripts at the repo root import this by adding classly/backend to
+sys.path.
+"""
+
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Any
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds, in seconds
+WAIT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+Predicate = Callable[[Any], Any]
+
+
+class WaitTimings:
+    """Thread-safe per-wait timing histograms."""
+
+    def __init__(self, buckets=WAIT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            stat = self._stats.setdefault(name, {
+                'count': 0, 'timeouts': 0, 'total': 0.0, 'max': 0.0,
+                'histogram': [0] * (len(self.buckets) + 1),
+            })
+            stat['count'] += 1
+            stat['timeouts'] += int(timed_out)
+            stat['total'] += seconds
+            stat['max'] = max(stat['max'], seconds)
+            stat['histogram'][bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-wait count, timeouts, total/mean/max seconds and bucket counts."""
+        labels = [f"<={b}s" for b in self.buckets] + [f">{self.buckets[-1]}s"]
+        with self._lock:
+            return {
+                name: {
+                    'count': s['count'],
+                    'timeouts': s['timeouts'],
+                    'total_s': round(s['total'], 3),
+                    'mean_s': round(s['total'] / s['count'], 3),
+                    'max_s': round(s['max'], 3),
+                    'histogram': {label: n for label, n in zip(labels, s['histogram']) if n},
+                }
+                for name, s in self._stats.items()
+            }
+
+    def report(self) -> str:
+        """One line per wait, slowest total first."""
+        stats = sorted(self.snapshot().items(), key=lambda item: item[1]['total_s'], reverse=True)
+        return "\n".join(
+            f"{name}: n={s['count']} total={s['total_s']}s mean={s['mean_s']}s max={s['max_s']}s"
+            f" timeouts={s['timeouts']} {s['histogram']}"
+            for name, s in stats
+        )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+wait_timings = WaitTimings()
+
+
+@contextmanager
+def timed_wait(name: str) -> Iterator[Dict[str, bool]]:
+    """Record the duration of the enclosed block; set state['timed_out'] to flag a timeout."""
+    state = {'timed_out': False}
+    started = time.monotonic()
+    try:
+        yield state
+    finally:
+        wait_timings.record(name, time.monotonic() - started, state['timed_out'])
+
+
+def wait_until(driver, predicate: Predicate, timeout: float, name: str, poll: float = 0.1) -> Any:
+    """
+    Poll `predicate(driver)` until it returns something truthy.
+
+    Returns that value, or None on timeout (waits replace sleeps, so running
+    out of time is not an error; the caller carries on as before).
+    """
+    with timed_wait(name) as state:
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=poll).until(predicate)
+        except TimeoutException:
+            state['timed_out'] = True
+            return None
+
+
+def document_ready(driver) -> bool:
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def wait_for_document_ready(driver, timeout: float = 15, name: str = 'document_ready') -> bool:
+    return bool(wait_until(driver, document_ready, timeout, name))
+
+
+# Installs a MutationObserver once per document and returns milliseconds since
+# the last DOM mutation (or since installation).
+_DOM_QUIET_JS = """
+if (!window.__scraperWaits) {
+    window.__scraperWaits = {last: performance.now()};
+    new MutationObserver(() => { window.__scraperWaits.last = performance.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+return performance.now() - window.__scraperWaits.last;
+"""
+
+
+def wait_for_dom_stable(driver, timeout: float = 10, quiet_period: float = 0.3,
+                        name: str = 'dom_stable') -> bool:
+    """Wait until the DOM has had no mutations for `quiet_period` seconds."""
+    quiet_ms = quiet_period * 1000
+
+    def stable(d):
+        if not document_ready(d):
+            return False
+        return d.execute_script(_DOM_QUIET_JS) >= quiet_ms
+
+    return bool(wait_until(driver, stable, timeout, name))
+
+
+class _NetworkTracker:
+    """In-flight request count from CDP Network events in Chrome's performance log."""
+
+    def __init__(self):
+        self.in_flight = set()
+        self.last_activity = time.monotonic()
+
+    def update(self, entries: List[Dict]) -> None:
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method', '')
+            request_id = message.get('params', {}).get('requestId')
+            if method == 'Network.requestWillBeSent':
+                self.in_flight.add(request_id)
+            elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+                self.in_flight.discard(request_id)
+            else:
+                continue
+            self.last_activity = time.monotonic()
+
+
+# Fallback for drivers without a performance log: number of finished resource loads
+_RESOURCE_COUNT_JS = "return performance.getEntriesByType('resource').length;"
+
+
+def enable_network_logging(options) -> None:
+    """Ask chromedriver for CDP Network events in the performance log (used by wait_for_network_idle)."""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+def wait_for_network_idle(driver, timeout: float = 10, idle_time: float = 0.5,
+                          name: str = 'network_idle') -> bool:
+    """Wait until no requests have been in flight for `idle_time` seconds."""
+    tracker = _NetworkTracker()
+    use_log = True
+    last_count = None
+
+    def idle(d):
+        nonlocal use_log, last_count
+        if use_log:
+            try:
+                tracker.update(d.get_log('performance'))
+            except (WebDriverException, AttributeError):
+                use_log = False
+        if not use_log:
+            count = d.execute_script(_RESOURCE_COUNT_JS)
+            if count != last_count:
+                last_count = count
+                tracker.last_activity = time.monotonic()
+        quiet_for = time.monotonic() - tracker.last_activity
+        return not tracker.in_flight and quiet_for >= idle_time and document_ready(d)
+
+    return bool(wait_until(driver, idle, timeout, name))
+
+
+def wait_for_page_settled(driver, timeout: float = 10, name: str = 'page_settled') -> bool:
+    """Document ready, then the DOM stops changing."""
+    deadline = time.monotonic() + timeout
+    if not wait_for_document_ready(driver, timeout, name=f'{name}.ready'):
+        return False
+    return wait_for_dom_stable(driver, max(0.1, deadline - time.monotonic()), name=f'{name}.dom')
+
+
+def url_contains(*fragments: str) -> Predicate:
+    return lambda d: any(f in d.current_url.lower() for f in fragments)
+
+
+def url_excludes(*fragments: str) -> Predicate:
+    return lambda d: not any(f in d.current_url.lower() for f in fragments)
+
+
+def url_changed(from_url: str) -> Predicate:
+    return lambda d: d.current_url != from_url
+
+
+def any_selector(*selectors: str) -> Predicate:
+    """True once any of the CSS selectors matches an element."""
+    script = "return arguments[0].some(s => document.querySelector(s) !== null);"
+    return lambda d: d.execute_script(script, list(selectors))
+
+
+def wait_for_scroll_growth(driver, last_height: int, timeout: float = 2,
+                           name: str = 'scroll_growth') -> Optional[int]:
+    """After scrolling, wait for the page to grow past `last_height`; returns the new height."""
+    def grown(d):
+        height = d.execute_script("return document.body.scrollHeight")
+        return height if height > last_height else None
+
+    return wait_until(driver, grown, timeout, name)
+
+
+def _login_or(predicate: Predicate) -> Predicate:
+    # A login redirect is "ready" too; callers detect it and handle auth
+    login = url_contains('login', 'signin', 'shibboleth', 'microsoftonline')
+    return lambda d: login(d) or (document_ready(d) and predicate(d))
+
+
+PLATFORM_READY: Dict[str, Predicate] = {
+    'canvas': _login_or(any_selector('a[href*="/assignments/"]', '.ig-empty-msg', '#assignment_group_upcoming',
+                                     '#content .alert')),
+    'prairielearn': _login_or(any_selector('table', '.alert', 'form[action*="login"]')),
+    'campuswire': _login_or(any_selector("[class*='feed']", "[class*='post']", "[class*='thread']")),
+    'course_explorer': _login_or(any_selector('table tbody tr', '.alert')),
+}
+
+
+def wait_for_platform_ready(driver, platform: str, timeout: float = 15) -> bool:
+    """Wait for a platform's page to show its content (or a login redirect), then for the DOM to settle."""
+    deadline = time.monotonic() + timeout
+    if not wait_until(driver, PLATFORM_READY[platform], timeout, f'{platform}.ready'):
+        return False
+    return wait_for_dom_stable(driver, max(0.1, min(3, deadline - time.monotonic())),
+                               name=f'{platform}.dom_stable')
+
+
+def log_wait_summary() -> None:
+    report = wait_timings.report()
+    if report:
+        logger.info(f"⏱️ Scraper waits:\n{report}")
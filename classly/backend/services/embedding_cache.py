@@ -0,0 +1,240 @@
+"""
+Embedding Cache - Persistent content-addressed cache of text embeddings.
+
+Keyed by (model, sha256(text)), so re-seeding identical chunks and repeated
+questions skip the embeddings API. Shared by /api/rag and
+scripts/seed_supabase_mock.py. An in-process LRU sits in front of a local
+SQLite file, which is kept under EMBEDDING_CACHE_MAX_MB by evicting the
+least recently used vectors.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), '..', '.cache', 'embedding_cache.sqlite3')
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', DEFAULT_CACHE_PATH)
+EMBEDDING_CACHE_MAX_MB = float(os.getenv('EMBEDDING_CACHE_MAX_MB', '256'))
+# Vectors kept in memory (a 1536-dim float32 vector is 6 KiB)
+EMBEDDING_CACHE_LRU_SIZE = int(os.getenv('EMBEDDING_CACHE_LRU_SIZE', '2048'))
+# After an eviction the store is trimmed to this fraction of its limit
+EVICT_TO_FRACTION = 0.9
+
+Vector = List[float]
+Key = Tuple[str, str]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """Memory LRU over a size-bounded SQLite store, with hit/miss counters per tier."""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_bytes: float = EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+                 lru_size: int = EMBEDDING_CACHE_LRU_SIZE):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.lru_size = lru_size
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lru: 'OrderedDict[Key, array]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._total_bytes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS embeddings ('
+                ' model TEXT NOT NULL,'
+                ' text_hash TEXT NOT NULL,'
+                ' vector BLOB NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' last_used REAL NOT NULL,'
+                ' PRIMARY KEY (model, text_hash))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)')
+            conn.commit()
+            self._total_bytes = conn.execute('SELECT COALESCE(SUM(size), 0) FROM embeddings').fetchone()[0]
+            self._initialized = True
+        return conn
+
+    def _remember(self, key: Key, vector: array) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[Vector]]:
+        """Cached vectors for `texts` (None where missing), checking memory then disk."""
+        keys = [(model, text_hash(t)) for t in texts]
+        found: Dict[Key, array] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+            self.memory_hits += sum(1 for key in keys if key in found)
+
+            on_disk = list(dict.fromkeys(key[1] for key in keys if key not in found))
+            if on_disk:
+                try:
+                    conn = self._connect()
+                    try:
+                        rows = []
+                        # Stay under SQLite's bound-parameter limit
+                        for i in range(0, len(on_disk), 500):
+                            batch = on_disk[i:i + 500]
+                            rows += conn.execute(
+                                f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                                f"AND text_hash IN ({','.join('?' * len(batch))})",
+                                (model, *batch)
+                            ).fetchall()
+                        if rows:
+                            conn.executemany(
+                                'UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?',
+                                [(time.time(), model, h) for h, _ in rows]
+                            )
+                            conn.commit()
+                    finally:
+                        conn.close()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ Embedding cache read failed: {e}")
+                    rows = []
+                disk_found = set()
+                for h, blob in rows:
+                    vector = array('f')
+                    vector.frombytes(blob)
+                    found[(model, h)] = vector
+                    disk_found.add(h)
+                    self._remember((model, h), vector)
+                self.disk_hits += sum(1 for key in keys if key[1] in disk_found)
+
+            self.misses += sum(1 for key in keys if key not in found)
+        return [found[key].tolist() if key in found else None for key in keys]
+
+    def get(self, model: str, text: str) -> Optional[Vector]:
+        return self.get_many(model, [text])[0]
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Vector]) -> None:
+        """Store vectors for `texts`, evicting least recently used entries past the size limit."""
+        now = time.time()
+        by_hash = {}
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                packed = array('f', vector)
+                key = (model, text_hash(text))
+                self._remember(key, packed)
+                blob = packed.tobytes()
+                by_hash[key[1]] = (model, key[1], blob, len(blob), now)
+            rows = list(by_hash.values())
+            try:
+                conn = self._connect()
+                try:
+                    replaced = 0
+                    for i in range(0, len(rows), 500):
+                        batch = [r[1] for r in rows[i:i + 500]]
+                        replaced += conn.execute(
+                            f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE model = ? "
+                            f"AND text_hash IN ({','.join('?' * len(batch))})",
+                            (model, *batch)
+                        ).fetchone()[0]
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO embeddings (model, text_hash, vector, size, last_used) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        rows
+                    )
+                    self._total_bytes += sum(r[3] for r in rows) - replaced
+                    if self._total_bytes > self.max_bytes:
+                        self._evict(conn)
+                    conn.commit()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Embedding cache write failed: {e}")
+
+    def put(self, model: str, text: str, vector: Vector) -> None:
+        self.put_many(model, [text], [vector])
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Delete least recently used rows until the store is under EVICT_TO_FRACTION of its limit."""
+        target = self.max_bytes * EVICT_TO_FRACTION
+        freed = 0
+        doomed = []
+        for model, h, size in conn.execute('SELECT model, text_hash, size FROM embeddings ORDER BY last_used'):
+            if self._total_bytes - freed <= target:
+                break
+            doomed.append((model, h))
+            freed += size
+        conn.executemany('DELETE FROM embeddings WHERE model = ? AND text_hash = ?', doomed)
+        self._total_bytes -= freed
+        self.evictions += len(doomed)
+        for key in doomed:
+            self._lru.pop(key, None)
+        logger.info(f"🧹 Embedding cache evicted {len(doomed)} vectors ({freed / 1024 / 1024:.1f} MB)")
+
+    def get_or_compute(self, model: str, texts: Sequence[str],
+                       compute: Callable[[List[str]], List[Vector]]) -> List[Vector]:
+        """
+        Vectors for `texts`, calling `compute` once with only the uncached
+        (deduplicated) texts and storing its results.
+        """
+        vectors = self.get_many(model, texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            computed = dict(zip(missing, compute(missing)))
+            self.put_many(model, list(computed), list(computed.values()))
+            vectors = [v if v is not None else computed[t] for t, v in zip(texts, vectors)]
+        return vectors
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus the store's size."""
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    entries = conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                entries = None
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'entries': entries,
+                'memory_entries': len(self._lru),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+            }
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get the process-wide embedding cache, creating its directory on first use."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                os.makedirs(os.path.dirname(os.path.abspath(EMBEDDING_CACHE_PATH)), exist_ok=True)
+                _embedding_cache = EmbeddingCache()
+    return _embedding_cache
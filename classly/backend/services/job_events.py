@@ -0,0 +1,39 @@
+"""
+Job Events - Per-stage progress events for queued scrape and sync jobs.
+
+The sync pipeline calls emit_event() as each source moves through queued ->
+scraping -> parsing -> upserting -> done. Events land in the job queue's
+SQLite file so the SSE endpoint in the web process can stream them from the
+worker processes. Outside a queued job, emit_event() is a no-op.
+"""
+
+import logging
+from typing import Optional
+
+from services.job_queue import get_job_queue
+
+logger = logging.getLogger(__name__)
+
+# A worker process runs one job at a time, so a module global is enough
+# (and, unlike a contextvar, is visible from the scrape worker threads).
+_current_job_id: Optional[str] = None
+
+
+def set_current_job(job_id: Optional[str]) -> None:
+    global _current_job_id
+    _current_job_id = job_id
+
+
+def current_job() -> Optional[str]:
+    return _current_job_id
+
+
+def emit_event(stage: str, job_id: Optional[str] = None, **data) -> None:
+    """Record a progress event for `job_id` (default: the current job)."""
+    job_id = job_id or _current_job_id
+    if not job_id:
+        return
+    try:
+        get_job_queue().add_event(job_id, stage, data)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not record {stage} event for job {job_id}: {e}")
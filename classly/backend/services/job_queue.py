@@ -0,0 +1,346 @@
+"""
+Job Queue - Durable local queue for scrape and sync jobs.
+
+Routes enqueue work here instead of spawning threads; separate worker
+processes (services/job_worker.py) lease jobs, heartbeat while running and
+retry failures with backoff. Backed by a SQLite file so queued work survives
+restarts. When a job mirrors a scrape_jobs row, it uses the same id.
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(__file__), '..', '.cache', 'job_queue.sqlite3')
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', DEFAULT_QUEUE_PATH)
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_BASE_SECONDS = float(os.getenv('JOB_RETRY_BASE_SECONDS', '30'))
+JOB_RETRY_MAX_SECONDS = float(os.getenv('JOB_RETRY_MAX_SECONDS', '900'))
+
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class JobQueue:
+    """SQLite-backed job queue with leases, heartbeats, retries and cancellation."""
+
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id TEXT PRIMARY KEY,'
+                ' kind TEXT NOT NULL,'
+                ' payload TEXT NOT NULL,'
+                ' status TEXT NOT NULL,'
+                ' attempts INTEGER NOT NULL DEFAULT 0,'
+                ' max_attempts INTEGER NOT NULL,'
+                ' run_after REAL NOT NULL,'
+                ' lease_owner TEXT,'
+                ' lease_expires_at REAL,'
+                ' heartbeat_at REAL,'
+                ' cancel_requested INTEGER NOT NULL DEFAULT 0,'
+                ' result TEXT,'
+                ' error TEXT,'
+                ' created_at REAL NOT NULL,'
+                ' updated_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, run_after)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS job_events ('
+                ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                ' job_id TEXT NOT NULL,'
+                ' stage TEXT NOT NULL,'
+                ' data TEXT NOT NULL,'
+                ' created_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events(job_id, id)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _row_to_job(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None,
+                max_attempts: int = JOB_MAX_ATTEMPTS, requeue_finished: bool = False) -> str:
+        """
+        Add a job and return its id. Enqueueing an id that already exists
+        (a retried request with a client-supplied id) leaves that job as it
+        is and returns its id.
+
+        With `requeue_finished`, an existing job with that id that has
+        already finished is reset and queued again (its old events are
+        dropped); one that is still queued or running is left alone. The
+        scheduler uses this to keep at most one sync per user in flight.
+        """
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            sql = ('INSERT INTO jobs (id, kind, payload, status, max_attempts, run_after, created_at, updated_at)'
+                   ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)')
+            if requeue_finished:
+                sql += (" ON CONFLICT(id) DO UPDATE SET kind = excluded.kind, payload = excluded.payload,"
+                        " status = 'queued', attempts = 0, max_attempts = excluded.max_attempts,"
+                        " run_after = excluded.run_after, lease_owner = NULL, lease_expires_at = NULL,"
+                        " heartbeat_at = NULL, cancel_requested = 0, result = NULL, error = NULL,"
+                        " created_at = excluded.created_at, updated_at = excluded.updated_at"
+                        f" WHERE jobs.status IN ({','.join('?' * len(TERMINAL_STATUSES))})")
+            else:
+                sql += ' ON CONFLICT(id) DO NOTHING'
+            params = (job_id, kind, json.dumps(payload), 'queued', max_attempts, now, now, now)
+            cursor = conn.execute(sql, params + (TERMINAL_STATUSES if requeue_finished else ()))
+            if cursor.rowcount and requeue_finished:
+                conn.execute('DELETE FROM job_events WHERE job_id = ?', (job_id,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        if cursor.rowcount == 0:
+            logger.info(f"📥 Job {job_id} already enqueued, not adding {kind} again")
+            return job_id
+        logger.info(f"📥 Enqueued {kind} job {job_id}")
+        self.add_event(job_id, 'queued', {'kind': kind})
+        return job_id
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next runnable job to `worker_id`.
+
+        Runnable means queued and past its retry delay, or running under a
+        lease that expired (its worker died without finishing) with attempts
+        left. Expired jobs that have used all their attempts are failed.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            # Cancelled jobs whose worker died before acknowledging
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', lease_owner = NULL, updated_at = ?"
+                " WHERE status = 'running' AND cancel_requested = 1 AND lease_expires_at < ?",
+                (now, now)
+            )
+            # Crashed on every attempt: fail instead of leasing it again
+            exhausted = [r['id'] for r in conn.execute(
+                "SELECT id FROM jobs WHERE status = 'running' AND cancel_requested = 0"
+                " AND lease_expires_at < ? AND attempts >= max_attempts",
+                (now,)
+            ).fetchall()]
+            conn.executemany(
+                "UPDATE jobs SET status = 'failed', error = 'Lease expired on the final attempt',"
+                " lease_owner = NULL, lease_expires_at = NULL, updated_at = ? WHERE id = ?",
+                [(now, job_id) for job_id in exhausted]
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs"
+                " WHERE cancel_requested = 0 AND ("
+                "  (status = 'queued' AND run_after <= ?)"
+                "  OR (status = 'running' AND lease_expires_at < ? AND attempts < max_attempts))"
+                " ORDER BY run_after, created_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                self._record_exhausted(exhausted)
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?,"
+                " lease_expires_at = ?, heartbeat_at = ?, updated_at = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, now, row['id'])
+            )
+            job = conn.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+            conn.execute('COMMIT')
+            self._record_exhausted(exhausted)
+            return self._row_to_job(job)
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _record_exhausted(self, job_ids: List[str]) -> None:
+        for job_id in job_ids:
+            logger.warning(f"⚠️ Job {job_id} lease expired on its final attempt; marked failed")
+            self.add_event(job_id, 'failed', {'error': 'Lease expired on the final attempt'})
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """
+        Extend the lease on a running job.
+
+        Returns False if the job should stop: cancellation was requested or
+        another worker took over the lease.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, heartbeat_at = ?, updated_at = ?"
+                " WHERE id = ? AND lease_owner = ? AND status = 'running' AND cancel_requested = 0",
+                (now + lease_seconds, now, now, job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def complete(self, job_id: str, worker_id: str, result: Any = None) -> None:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'completed', result = ?, error = NULL, lease_owner = NULL,"
+                " lease_expires_at = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (json.dumps(result, default=str), now, job_id, worker_id)
+            )
+        finally:
+            conn.close()
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> str:
+        """Record a failed attempt; requeue with jittered exponential backoff if attempts remain."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            job = conn.execute('SELECT attempts, max_attempts, cancel_requested FROM jobs WHERE id = ?',
+                               (job_id,)).fetchone()
+            if job is None:
+                return 'missing'
+            if job['cancel_requested']:
+                status, run_after = 'cancelled', now
+            elif job['attempts'] < job['max_attempts']:
+                delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** (job['attempts'] - 1))
+                status, run_after = 'queued', now + delay * random.uniform(0.5, 1.0)
+            else:
+                status, run_after = 'failed', now
+            conn.execute(
+                "UPDATE jobs SET status = ?, run_after = ?, error = ?, lease_owner = NULL,"
+                " lease_expires_at = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (status, run_after, error, now, job_id, worker_id)
+            )
+            return status
+        finally:
+            conn.close()
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a job. Queued jobs are cancelled immediately; running jobs are
+        flagged and their worker kills the work at its next heartbeat.
+
+        Returns the job's resulting status, or None if it doesn't exist.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            status = row['status']
+            if status == 'queued':
+                status = 'cancelled'
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', cancel_requested = 1, updated_at = ? WHERE id = ?",
+                    (now, job_id)
+                )
+            elif status == 'running':
+                conn.execute(
+                    'UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ?',
+                    (now, job_id)
+                )
+            conn.execute('COMMIT')
+            return status
+        finally:
+            conn.close()
+
+    def mark_cancelled(self, job_id: str, worker_id: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', error = 'Cancelled by user', lease_owner = NULL,"
+                " lease_expires_at = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (time.time(), job_id, worker_id)
+            )
+        finally:
+            conn.close()
+
+    def add_event(self, job_id: str, stage: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """Append a progress event for a job (read by the SSE endpoint)."""
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT INTO job_events (job_id, stage, data, created_at) VALUES (?, ?, ?, ?)',
+                (job_id, stage, json.dumps(data or {}, default=str), time.time())
+            )
+        finally:
+            conn.close()
+
+    def get_events(self, job_id: str, after_id: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        """Events for a job with id > `after_id`, oldest first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT * FROM job_events WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?',
+                (job_id, after_id, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [{**dict(row), 'data': json.loads(row['data'])} for row in rows]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            return self._row_to_job(conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+        finally:
+            conn.close()
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            if status:
+                rows = conn.execute('SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?',
+                                    (status, limit)).fetchall()
+            else:
+                rows = conn.execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+            return [self._row_to_job(row) for row in rows]
+        finally:
+            conn.close()
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue."""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    return _job_queue
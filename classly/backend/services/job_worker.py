@@ -0,0 +1,213 @@
+"""
+Job Worker - Runs queued scrape/sync jobs in separate processes.
+
+Usage (from classly/backend):
+    python -m services.job_worker --workers 2
+
+Each worker process is long-lived: it leases one job at a time from the job
+queue and runs it in-process, heartbeating from a background thread, so the
+per-profile warm Chrome pools (scrapers/driver_pool.py) survive from one job
+to the next. If a job is cancelled (or its lease is lost) the job is
+interrupted and the worker process exits, which quits its Chrome drivers;
+the supervisor starts a fresh one. Concurrency is bounded by the number of
+worker processes.
+"""
+
+import os
+import time
+import signal
+import socket
+import logging
+import argparse
+import threading
+import multiprocessing
+from typing import Dict, Any, Callable
+
+from services.job_queue import get_job_queue
+from services.job_events import set_current_job, emit_event
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '60'))
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', '10'))
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '2'))
+
+
+def _run_scrape_platform(payload: Dict[str, Any]) -> Any:
+    from services.scraper_service import ScraperService
+    return ScraperService(payload['user_id']).scrape_platform(payload['platform'], payload.get('scrape_job_id'))
+
+
+def _run_sync_from_courses(payload: Dict[str, Any]) -> Any:
+    from services.scraper_service import ScraperService
+    return ScraperService(payload['user_id']).sync_from_user_courses(job_id=payload.get('scrape_job_id'))
+
+
+def _run_sync_tasks(payload: Dict[str, Any]) -> Any:
+    from services.task_sync_service import sync_tasks_for_class, sync_all_classes_for_user
+    force = payload.get('force', False)
+    if payload.get('class_id'):
+        return sync_tasks_for_class(payload['class_id'], force=force)
+    return sync_all_classes_for_user(payload['user_id'], force=force)
+
+
+JOB_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    'scrape_platform': _run_scrape_platform,
+    'sync_from_courses': _run_sync_from_courses,
+    'sync_tasks': _run_sync_tasks,
+}
+
+
+class JobInterrupted(BaseException):
+    """
+    Raised in a worker's main thread when its job is cancelled or its lease
+    is lost. A BaseException so handlers' `except Exception` can't swallow it.
+    """
+
+
+def _interrupt(signum, frame) -> None:
+    raise JobInterrupted()
+
+
+def run_job(job: Dict[str, Any], worker_id: str) -> str:
+    """
+    Run one leased job in this process to completion, cancellation or
+    failure, heartbeating from a background thread. Returns its final status.
+
+    On cancellation (or a lost lease) the heartbeat thread signals the main
+    thread, which raises JobInterrupted out of the handler and returns
+    'cancelled'; the caller should then recycle the process, since the
+    interrupted handler may have left pooled drivers mid-page.
+    """
+    queue = get_job_queue()
+    job_id = job['id']
+    kind = job['kind']
+
+    if kind not in JOB_HANDLERS:
+        status = queue.fail(job_id, worker_id, f"Unknown job kind: {kind}")
+        emit_event(status, job_id, error=f"Unknown job kind: {kind}")
+        return status
+
+    finished = threading.Event()
+    interrupt_lock = threading.Lock()
+
+    def heartbeat() -> None:
+        while not finished.wait(JOB_HEARTBEAT_SECONDS):
+            if not queue.heartbeat(job_id, worker_id, JOB_LEASE_SECONDS):
+                with interrupt_lock:
+                    if not finished.is_set():
+                        logger.info(f"⏹️ [{worker_id}] Job {job_id} cancelled, interrupting it")
+                        # Aim at the main thread so a blocking call there is interrupted
+                        signal.pthread_kill(threading.main_thread().ident, signal.SIGUSR1)
+                return
+
+    started = time.monotonic()
+    logger.info(f"▶️ [{worker_id}] Running {kind} job {job_id} (attempt {job['attempts']})")
+    set_current_job(job_id)
+    emit_event('running', job_id, attempt=job['attempts'], worker=worker_id)
+    beater = threading.Thread(target=heartbeat, name=f'heartbeat-{job_id}', daemon=True)
+    beater.start()
+    try:
+        try:
+            outcome, value = 'ok', JOB_HANDLERS[kind](job['payload'])
+        except Exception as e:
+            outcome, value = 'error', f"{type(e).__name__}: {e}"
+        finally:
+            with interrupt_lock:
+                finished.set()
+        beater.join()
+    except JobInterrupted:
+        finished.set()
+        queue.mark_cancelled(job_id, worker_id)
+        emit_event('cancelled', job_id, elapsed_ms=round((time.monotonic() - started) * 1000))
+        set_current_job(None)
+        return 'cancelled'
+    set_current_job(None)
+
+    elapsed_ms = round((time.monotonic() - started) * 1000)
+    if outcome == 'ok':
+        queue.complete(job_id, worker_id, value)
+        logger.info(f"✅ [{worker_id}] Job {job_id} completed")
+        emit_event('completed', job_id, elapsed_ms=elapsed_ms)
+        return 'completed'
+
+    status = queue.fail(job_id, worker_id, value)
+    logger.warning(f"⚠️ [{worker_id}] Job {job_id} failed ({value}); now {status}")
+    emit_event('retrying' if status == 'queued' else status, job_id, error=value, elapsed_ms=elapsed_ms)
+    return status
+
+
+def worker_loop(worker_id: str, stop_event=None) -> None:
+    """
+    Lease and run jobs until `stop_event` is set. Returns early after a
+    cancelled job so the supervisor replaces this process.
+    """
+    queue = get_job_queue()
+    while stop_event is None or not stop_event.is_set():
+        job = queue.claim(worker_id, JOB_LEASE_SECONDS)
+        if job is None:
+            time.sleep(JOB_POLL_SECONDS)
+            continue
+        try:
+            status = run_job(job, worker_id)
+        except JobInterrupted:
+            # The interrupt landed after the handler returned; the job's own
+            # status update wins since mark_cancelled needs the lease
+            queue.mark_cancelled(job['id'], worker_id)
+            status = 'cancelled'
+        except Exception as e:
+            logger.error(f"❌ [{worker_id}] Worker error on job {job['id']}: {e}")
+            queue.fail(job['id'], worker_id, str(e))
+            continue
+        if status == 'cancelled':
+            logger.info(f"♻️ [{worker_id}] Recycling worker process after a cancelled job")
+            return
+
+
+def _worker_process_main(index: int) -> None:
+    logging.basicConfig(level=logging.INFO)
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGUSR1, _interrupt)
+    worker_loop(f"{socket.gethostname()}-{os.getpid()}-{index}", stop_event)
+
+
+def _start_worker(ctx, index: int):
+    process = ctx.Process(target=_worker_process_main, args=(index,), name=f'job-worker-{index}')
+    process.start()
+    return process
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run scrape/sync job workers")
+    parser.add_argument('--workers', type=int, default=JOB_WORKERS, help="Number of worker processes")
+    parser.add_argument('--scheduler', action='store_true',
+                        help="Also run the staleness-driven sync scheduler (run it in one place only)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.scheduler:
+        from services.sync_scheduler import get_sync_scheduler
+        get_sync_scheduler().start()
+    ctx = multiprocessing.get_context('spawn')
+    processes = [_start_worker(ctx, i) for i in range(max(1, args.workers))]
+    logger.info(f"👷 Started {len(processes)} job workers")
+
+    try:
+        # Keep N workers alive; a worker exits after a cancelled job
+        while True:
+            time.sleep(JOB_POLL_SECONDS)
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    logger.info(f"🔁 Restarting job worker {i} (exit code {process.exitcode})")
+                    processes[i] = _start_worker(ctx, i)
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Local Embedder - Feature-hashing text embeddings for offline RAG.
+
+Used instead of OpenAI embeddings when no API key is configured, by both the
+/api/rag routes and scripts/seed_supabase_mock.py. Word unigrams, word
+bigrams and character n-grams of each word are hashed into a signed
+1536-dim vector (the course_chunks.embedding width), log-scaled and
+L2-normalized in NumPy. Texts that share words or word fragments get similar
+vectors, so pgvector's cosine search returns relevant chunks.
+"""
+
+import re
+import math
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Bump when the features or weights change; embeddings from different
+# versions are not comparable
+MODEL_NAME = 'local-hashing-v1'
+EMBEDDING_DIM = 1536
+
+CHAR_NGRAM_SIZES = (3, 4, 5)
+WORD_WEIGHT = 1.0
+BIGRAM_WEIGHT = 0.7
+# Spread over each word's character n-grams so long words don't dominate
+CHAR_WEIGHT = 1.0
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do for from has have how i if in is it its
+me my not of on or our so that the their them then there these they this to
+was we were what when where which who will with you your
+""".split())
+
+
+@lru_cache(maxsize=1 << 18)
+def _hash_feature(feature: str) -> Tuple[int, float]:
+    """Stable (index, sign) for a feature; Python's hash() is salted per process."""
+    digest = zlib.crc32(feature.encode('utf-8'))
+    return (digest & 0x7FFFFFFF) % EMBEDDING_DIM, (1.0 if digest >> 31 else -1.0)
+
+
+@lru_cache(maxsize=1 << 16)
+def _word_features(word: str) -> Tuple[Tuple[int, ...], Tuple[float, ...]]:
+    """Indices and signed weights for a word and its character n-grams."""
+    index, sign = _hash_feature(f"w:{word}")
+    indices = [index]
+    values = [sign * WORD_WEIGHT]
+
+    padded = f"<{word}>"
+    grams = [padded[i:i + n] for n in CHAR_NGRAM_SIZES for i in range(len(padded) - n + 1)]
+    if grams:
+        weight = CHAR_WEIGHT / math.sqrt(len(grams))
+        for gram in grams:
+            index, sign = _hash_feature(f"c:{gram}")
+            indices.append(index)
+            values.append(sign * weight)
+    return tuple(indices), tuple(values)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords."""
+    return [t for t in TOKEN_PATTERN.findall((text or '').lower()) if t not in STOPWORDS]
+
+
+def _text_features(text: str) -> Tuple[List[int], List[float]]:
+    tokens = tokenize(text)
+    indices: List[int] = []
+    values: List[float] = []
+
+    for word, count in Counter(tokens).items():
+        scale = 1.0 + math.log(count)
+        word_indices, word_values = _word_features(word)
+        indices.extend(word_indices)
+        values.extend(v * scale for v in word_values)
+
+    for bigram, count in Counter(zip(tokens, tokens[1:])).items():
+        index, sign = _hash_feature(f"b:{bigram[0]} {bigram[1]}")
+        indices.append(index)
+        values.append(sign * BIGRAM_WEIGHT * (1.0 + math.log(count)))
+
+    return indices, values
+
+
+def embed_texts(texts: Sequence[str]) -> np.ndarray:
+    """
+    Embed a batch of texts. Returns a float32 array of shape
+    (len(texts), EMBEDDING_DIM) with unit-length rows (all-zero for texts
+    with no tokens).
+    """
+    if not texts:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+    # One bincount over row-offset indices builds the whole batch at once
+    flat_indices: List[np.ndarray] = []
+    flat_values: List[float] = []
+    for row, text in enumerate(texts):
+        indices, values = _text_features(text)
+        flat_indices.append(np.asarray(indices, dtype=np.int64) + row * EMBEDDING_DIM)
+        flat_values.extend(values)
+
+    matrix = np.bincount(
+        np.concatenate(flat_indices),
+        weights=np.asarray(flat_values, dtype=np.float64),
+        minlength=len(texts) * EMBEDDING_DIM,
+    ).reshape(len(texts), EMBEDDING_DIM)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix.astype(np.float32)
+
+
+def embed_text(text: str) -> List[float]:
+    """Embed one text as a plain list (JSON-serializable for Supabase)."""
+    return embed_texts([text])[0].tolist()
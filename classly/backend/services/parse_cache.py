@@ -0,0 +1,166 @@
+"""
+Parse Cache - Persistent cache of LLM-parsed task lists.
+
+Keyed by a stable hash of the normalized scraped payload plus platform,
+class and prompt version, so an unchanged PrairieLearn table or Canvas list
+skips the LLM call entirely. Backed by a local SQLite file.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), '..', '.cache', 'parse_cache.sqlite3')
+PARSE_CACHE_PATH = os.getenv('PARSE_CACHE_PATH', DEFAULT_CACHE_PATH)
+PARSE_CACHE_MAX_AGE_HOURS = float(os.getenv('PARSE_CACHE_MAX_AGE_HOURS', '24'))
+
+# Keys that change on every scrape without the underlying data changing
+VOLATILE_KEYS = {'scraped_at'}
+
+
+def _normalize(value: Any) -> Any:
+    """Drop volatile keys and collapse whitespace so equivalent scrapes hash the same."""
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    return value
+
+
+def make_cache_key(raw_data: Any, platform: str, class_info: Dict, prompt_version: str) -> str:
+    """Stable sha256 over the normalized payload and everything else the prompt depends on."""
+    material = {
+        'platform': platform,
+        'class': [class_info.get('id'), class_info.get('code'), class_info.get('title')],
+        'prompt_version': prompt_version,
+        'raw_data': _normalize(raw_data),
+    }
+    encoded = json.dumps(material, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class ParseCache:
+    """SQLite-backed cache of parsed task lists with hit/miss counters and age-based eviction."""
+
+    def __init__(self, path: str = PARSE_CACHE_PATH, max_age_hours: float = PARSE_CACHE_MAX_AGE_HOURS):
+        self.path = path
+        self.max_age_seconds = max_age_hours * 3600
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS parse_cache ('
+                ' key TEXT PRIMARY KEY,'
+                ' platform TEXT,'
+                ' tasks TEXT NOT NULL,'
+                ' created_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_parse_cache_created ON parse_cache(created_at)')
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Return the cached task list for `key`, or None on a miss or expired entry."""
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    row = conn.execute(
+                        'SELECT tasks FROM parse_cache WHERE key = ? AND created_at >= ?',
+                        (key, cutoff)
+                    ).fetchone()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Parse cache read failed: {e}")
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, tasks: List[Dict], platform: Optional[str] = None) -> None:
+        """Store a parsed task list under `key`, pruning expired entries."""
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO parse_cache (key, platform, tasks, created_at) VALUES (?, ?, ?, ?)',
+                        (key, platform, json.dumps(tasks), time.time())
+                    )
+                    conn.execute(
+                        'DELETE FROM parse_cache WHERE created_at < ?',
+                        (time.time() - self.max_age_seconds,)
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Parse cache write failed: {e}")
+
+    def evict_older_than(self, max_age_seconds: float) -> int:
+        """Delete entries older than `max_age_seconds`. Returns the number removed."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                cursor = conn.execute(
+                    'DELETE FROM parse_cache WHERE created_at < ?',
+                    (time.time() - max_age_seconds,)
+                )
+                conn.commit()
+                return cursor.rowcount
+            finally:
+                conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus the current entry count."""
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    entries = conn.execute('SELECT COUNT(*) FROM parse_cache').fetchone()[0]
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                entries = None
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': entries,
+            }
+
+
+_parse_cache: Optional[ParseCache] = None
+_parse_cache_lock = threading.Lock()
+
+
+def get_parse_cache() -> ParseCache:
+    """Get the process-wide parse cache, creating its directory on first use."""
+    global _parse_cache
+    if _parse_cache is None:
+        with _parse_cache_lock:
+            if _parse_cache is None:
+                os.makedirs(os.path.dirname(os.path.abspath(PARSE_CACHE_PATH)), exist_ok=True)
+                _parse_cache = ParseCache()
+    return _parse_cache
@@ -5,6 +5,7 @@ Scraper Service - Orchestrates scraping from all platforms and stores to Supabas
 import json
 import os
 import sys
+import time
 from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
 
@@ -12,12 +13,23 @@ from typing import Optional, List, Dict, Any
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from db.supabase_client import supabase
+from services.job_events import emit_event
 
 try:
     from scrapers.canvas_scraper import scrape_assignments_for_course_url as canvas_scrape_url
 except ImportError:
     canvas_scrape_url = None
 
+try:
+    from scrapers.campuswire_api import fetch_new_posts as campuswire_fetch_new_posts
+except ImportError:
+    campuswire_fetch_new_posts = None
+
+try:
+    from pl import open_store as open_pl_download, to_sync_data as pl_to_sync_data
+except ImportError:
+    open_pl_download = None
+
 
 class ScraperService:
     """Service to orchestrate scraping and data storage"""
@@ -38,6 +50,8 @@ class ScraperService:
 
         try:
             items_synced = 0
+            emit_event('scraping', platform=platform)
+            started = time.monotonic()
 
             if platform == 'canvas':
                 items_synced = self._scrape_canvas()
@@ -50,6 +64,9 @@ class ScraperService:
             else:
                 raise ValueError(f"Unknown platform: {platform}")
 
+            emit_event('done', platform=platform, items_synced=items_synced,
+                       elapsed_ms=round((time.monotonic() - started) * 1000))
+
             if job_id:
                 supabase.table('scrape_jobs').update({
                     'status': 'completed',
@@ -156,6 +173,10 @@ class ScraperService:
 
     def _scrape_campuswire(self) -> int:
         """Scrape Campuswire posts"""
+        synced = self._sync_campuswire_feeds()
+        if synced is not None:
+            return synced
+
         campuswire_file = os.path.join(os.path.dirname(__file__), '..', '..', '..',
                                         'campuswire_posts.json')
         
@@ -167,6 +188,41 @@ class ScraperService:
         print("Campuswire scraper: No existing data file found")
         return 0
 
+    def _sync_campuswire_feeds(self) -> Optional[int]:
+        """
+        Pull only new posts from the user's Campuswire feeds over the JSON API.
+        Returns None when there are no feeds or no credentials to use.
+        """
+        if not campuswire_fetch_new_posts:
+            return None
+
+        classes_res = supabase.table('classes').select('id').eq('user_id', self.user_id).execute()
+        class_ids = [c['id'] for c in classes_res.data or []]
+        if not class_ids:
+            return None
+        sources_res = supabase.table('class_sources').select('id, url, sync_cursor') \
+            .in_('class_id', class_ids).execute()
+        feeds = [row for row in sources_res.data or []
+                 if 'campuswire.com' in (row.get('url') or '').lower()]
+        if not feeds:
+            return None
+
+        profile_dir = os.environ.get('CAMPUSWIRE_PROFILE_DIR')
+        items_synced = None
+        for feed in feeds:
+            # The cursor lives on this user's source, so users sharing a
+            # Campuswire group don't move each other's position
+            data = campuswire_fetch_new_posts(feed['url'], last_seen=feed.get('sync_cursor'),
+                                              profile_dir=profile_dir)
+            if data is None:
+                continue
+            items_synced = (items_synced or 0) + self._process_campuswire_data(data)
+            # Only advance the cursor once this feed's posts are stored
+            if data.get('newest_post') and data['newest_post'] != feed.get('sync_cursor'):
+                supabase.table('class_sources').update({'sync_cursor': data['newest_post']}) \
+                    .eq('id', feed['id']).execute()
+        return items_synced
+
     def _process_campuswire_data(self, data: Dict[str, Any]) -> int:
         """Process Campuswire JSON data"""
         # Campuswire posts don't directly map to deadlines
@@ -175,6 +231,15 @@ class ScraperService:
 
     def _scrape_prairielearn(self) -> int:
         """Scrape PrairieLearn assessments"""
+        # Prefer a pl.py download (files or sqlite) when one is configured
+        download_dir = os.environ.get('PRAIRIELEARN_DOWNLOAD_DIR')
+        if open_pl_download and download_dir and os.path.isdir(download_dir):
+            store = open_pl_download(download_dir)
+            try:
+                return self._process_prairielearn_data(pl_to_sync_data(store))
+            finally:
+                store.close()
+
         pl_file = os.path.join(os.path.dirname(__file__), '..', '..', '..',
                                'prairielearn_assessments.json')
         
@@ -253,6 +318,9 @@ class ScraperService:
             items_synced = 0
             now_iso = datetime.now(timezone.utc).isoformat()
 
+            for row in sources_res.data:
+                emit_event('queued', source_id=row.get('id'), platform=(row.get('source_type') or '').lower())
+
             for row in sources_res.data:
                 source_type = (row.get('source_type') or '').strip().lower()
                 url = (row.get('url') or '').strip()
@@ -265,19 +333,26 @@ class ScraperService:
                 if source_type == 'canvas':
                     if not canvas_scrape_url:
                         continue
+                    emit_event('scraping', source_id=source_row_id, platform='canvas')
+                    started = time.monotonic()
                     assignments = canvas_scrape_url(course_url=url, headless=True, profile_dir=profile_dir)
+                    scrape_ms = round((time.monotonic() - started) * 1000)
+                    emit_event('upserting', source_id=source_row_id, platform='canvas',
+                               tasks=len(assignments), scrape_ms=scrape_ms)
                     for a in assignments:
                         supabase.table('tasks').insert({
                             'class_id': class_id,
                             'title': a['title'],
                             'task_type': 'assignment',
-                            'due_at': None,
+                            'due_at': a.get('due_at'),
                             'url': a.get('url'),
                             'source_id': str(a['id']),
                             'source_label': 'Canvas Assignment',
                             'status': 'todo',
                         }).execute()
                         items_synced += 1
+                    emit_event('done', source_id=source_row_id, platform='canvas', inserted=len(assignments),
+                               elapsed_ms=round((time.monotonic() - started) * 1000))
                     try:
                         supabase.table('class_sources').update({
                             'last_fetched_at': now_iso,
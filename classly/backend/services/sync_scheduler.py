@@ -0,0 +1,254 @@
+"""
+Sync Scheduler - Decides which class_sources are stale and re-syncs only those.
+
+A source's target refresh interval shrinks when its content changes often
+and when its class has a deadline coming up, so quiet sources are scraped
+rarely while imminent deadlines stay fresh. A background loop with jitter
+queues a sync_tasks job (services/job_queue.py) for every user with stale
+sources, so the scrapes run on the job workers with their leases, retries
+and concurrency cap; `force` bypasses the check.
+"""
+
+import os
+import json
+import random
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Optional
+
+from dateutil import parser as date_parser
+
+from db.supabase_client import supabase
+
+logger = logging.getLogger(__name__)
+
+SYNC_MIN_INTERVAL_MINUTES = float(os.getenv('SYNC_MIN_INTERVAL_MINUTES', '30'))
+SYNC_MAX_INTERVAL_MINUTES = float(os.getenv('SYNC_MAX_INTERVAL_MINUTES', '1440'))
+# Refresh at least this many times in the window before a class's next deadline
+SYNC_REFRESHES_BEFORE_DEADLINE = int(os.getenv('SYNC_REFRESHES_BEFORE_DEADLINE', '4'))
+SYNC_DEADLINE_HORIZON_HOURS = float(os.getenv('SYNC_DEADLINE_HORIZON_HOURS', '72'))
+
+SYNC_SCHEDULER_INTERVAL_SECONDS = float(os.getenv('SYNC_SCHEDULER_INTERVAL_SECONDS', '300'))
+SYNC_SCHEDULER_JITTER = float(os.getenv('SYNC_SCHEDULER_JITTER', '0.2'))
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = date_parser.isoparse(value)
+    except (ValueError, TypeError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def change_rate(source: Dict) -> float:
+    """Fraction of past fetches that found changed content (Laplace-smoothed)."""
+    fetches = source.get('fetch_count') or 0
+    changes = source.get('change_count') or 0
+    return (changes + 1) / (fetches + 2)
+
+
+def target_interval(source: Dict, next_due_at: Optional[datetime], now: datetime) -> timedelta:
+    """How long a source's data may age before it counts as stale."""
+    rate = change_rate(source)
+    minutes = SYNC_MAX_INTERVAL_MINUTES * (1 - rate) + SYNC_MIN_INTERVAL_MINUTES * rate
+
+    if next_due_at is not None:
+        until_due = next_due_at - now
+        if timedelta(0) <= until_due <= timedelta(hours=SYNC_DEADLINE_HORIZON_HOURS):
+            minutes = min(minutes, until_due.total_seconds() / 60 / SYNC_REFRESHES_BEFORE_DEADLINE)
+
+    return timedelta(minutes=max(SYNC_MIN_INTERVAL_MINUTES, minutes))
+
+
+def staleness(source: Dict, next_due_at: Optional[datetime] = None, now: Optional[datetime] = None) -> float:
+    """
+    Age of a source's data as a multiple of its target interval.
+
+    >= 1.0 means stale. Sources that were never fetched are infinitely stale.
+    """
+    now = now or datetime.now(timezone.utc)
+    last_fetched = _parse_timestamp(source.get('last_fetched_at'))
+    if last_fetched is None:
+        return float('inf')
+    return (now - last_fetched) / target_interval(source, next_due_at, now)
+
+
+def next_deadlines_by_class(class_ids: List[str], now: Optional[datetime] = None) -> Dict[str, datetime]:
+    """Earliest upcoming task due_at per class, in one query."""
+    if not class_ids:
+        return {}
+    now = now or datetime.now(timezone.utc)
+    horizon = now + timedelta(hours=SYNC_DEADLINE_HORIZON_HOURS)
+    result = supabase.table('tasks') \
+        .select('class_id, due_at') \
+        .in_('class_id', class_ids) \
+        .gte('due_at', now.isoformat()) \
+        .lte('due_at', horizon.isoformat()) \
+        .execute()
+
+    deadlines = {}
+    for row in result.data or []:
+        due_at = _parse_timestamp(row.get('due_at'))
+        if due_at is None:
+            continue
+        current = deadlines.get(row['class_id'])
+        if current is None or due_at < current:
+            deadlines[row['class_id']] = due_at
+    return deadlines
+
+
+def filter_stale_sources(sources: List[Dict], force: bool = False) -> List[Dict]:
+    """Return the sources that are due for a sync (all of them when `force`)."""
+    if force or not sources:
+        return list(sources)
+
+    now = datetime.now(timezone.utc)
+    try:
+        deadlines = next_deadlines_by_class(sorted({s['class_id'] for s in sources if s.get('class_id')}), now)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load upcoming deadlines: {e}")
+        deadlines = {}
+
+    stale = []
+    for source in sources:
+        score = staleness(source, deadlines.get(source.get('class_id')), now)
+        if score >= 1.0:
+            stale.append(source)
+        else:
+            logger.info(f"   ⏭️ Source {source.get('id')} is fresh (staleness {score:.2f}), skipping")
+    return stale
+
+
+def tasks_content_hash(tasks: List[Dict]) -> str:
+    """Order-independent hash of the fields that matter for change detection."""
+    keys = sorted(
+        (str(t.get('title')), str(t.get('due_at')), str(t.get('status')))
+        for t in tasks
+    )
+    return hashlib.sha256(json.dumps(keys).encode('utf-8')).hexdigest()
+
+
+def record_source_fetch(source: Dict, tasks: List[Dict]) -> None:
+    """Update a source's fetch/change counters after a successful scrape."""
+    if not source.get('id'):
+        return
+    now_iso = datetime.now(timezone.utc).isoformat()
+    content_hash = tasks_content_hash(tasks)
+    changed = content_hash != source.get('content_hash')
+
+    update = {
+        'last_fetched_at': now_iso,
+        'content_hash': content_hash,
+        'fetch_count': (source.get('fetch_count') or 0) + 1,
+        'change_count': (source.get('change_count') or 0) + (1 if changed else 0),
+    }
+    if changed:
+        update['last_changed_at'] = now_iso
+
+    try:
+        supabase.table('class_sources').update(update).eq('id', source['id']).execute()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not record fetch for source {source['id']}: {e}")
+
+
+def _select_all(table: str, columns: str, page_size: int = 1000) -> List[Dict]:
+    """Every row of `table`, paged so PostgREST's row cap doesn't truncate it."""
+    rows: List[Dict] = []
+    while True:
+        page = supabase.table(table).select(columns).range(len(rows), len(rows) + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+
+class SyncScheduler:
+    """Background loop that queues staleness-driven syncs for every user with stale sources."""
+
+    def __init__(self, interval_seconds: float = SYNC_SCHEDULER_INTERVAL_SECONDS, jitter: float = SYNC_SCHEDULER_JITTER):
+        self.interval_seconds = interval_seconds
+        self.jitter = jitter
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._force_next = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sync-scheduler', daemon=True)
+        self._thread.start()
+        logger.info(f"🕒 Sync scheduler started (every ~{self.interval_seconds:.0f}s)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self, force: bool = False) -> None:
+        """Run a pass now instead of waiting for the next tick."""
+        self._force_next = self._force_next or force
+        self._wake.set()
+
+    def _next_delay(self) -> float:
+        spread = self.interval_seconds * self.jitter
+        return max(1.0, self.interval_seconds + random.uniform(-spread, spread))
+
+    def _run(self) -> None:
+        # Stagger the first pass so several workers don't start in lockstep
+        self._wake.wait(random.uniform(0, self.interval_seconds * self.jitter))
+        while not self._stop.is_set():
+            self._wake.clear()
+            force, self._force_next = self._force_next, False
+            try:
+                self.run_once(force=force)
+            except Exception as e:
+                logger.error(f"❌ Sync scheduler pass failed: {e}")
+            self._wake.wait(self._next_delay())
+
+    def run_once(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Queue a sync_tasks job for every user with stale sources (every user
+        with classes when `force`). Each user has one job id, so a pass never
+        queues a second sync while the previous one is still pending.
+        """
+        from services.job_queue import get_job_queue
+
+        classes = _select_all('classes', 'id, user_id')
+        user_by_class = {c['id']: c['user_id'] for c in classes if c.get('user_id')}
+        if force:
+            user_ids = sorted(set(user_by_class.values()))
+        else:
+            sources = [s for s in _select_all('class_sources', '*')
+                       if s.get('url') and s.get('class_id') in user_by_class]
+            user_ids = sorted({user_by_class[s['class_id']] for s in filter_stale_sources(sources)})
+        logger.info(f"🕒 Scheduler pass: {len(user_ids)} of {len(set(user_by_class.values()))} users due (force={force})")
+
+        queue = get_job_queue()
+        summary = {}
+        for user_id in user_ids:
+            if self._stop.is_set():
+                break
+            summary[user_id] = queue.enqueue('sync_tasks', {
+                'user_id': user_id,
+                'class_id': None,
+                'force': force,
+            }, job_id=f"scheduled-sync-{user_id}", requeue_finished=True)
+        return summary
+
+
+_scheduler: Optional[SyncScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_sync_scheduler() -> SyncScheduler:
+    """Get the process-wide scheduler (not started until start() is called)."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = SyncScheduler()
+    return _scheduler
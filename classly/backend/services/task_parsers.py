@@ -0,0 +1,252 @@
+"""
+Task Parsers - Deterministic parsers for scraped PrairieLearn and Canvas data.
+
+Maps scraper output straight into the task schema used by task_sync_service.
+Rows that can't be classified are handed back as leftovers so only those go
+to the LLM.
+"""
+
+import os
+import re
+import logging
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+SCHOOL_TIMEZONE = pytz.timezone(os.getenv('SCHOOL_TIMEZONE', 'America/Chicago'))
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+# "100% until 23:59, Tue, Feb 3" (optionally followed by ", 2026")
+PL_DUE_PATTERN = re.compile(
+    r'until\s+(\d{1,2}):(\d{2}),\s*[A-Za-z]{3,9},\s*([A-Za-z]{3,9})\.?\s+(\d{1,2})(?:,\s*(\d{4}))?'
+)
+# Credit text PrairieLearn shows when there is no upcoming deadline
+PL_NO_DUE_PATTERN = re.compile(r'^(none|\d+%(\s*\(.*\))?|expired|closed|not available)?$', re.IGNORECASE)
+PL_SCORE_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)%$')
+
+# "Due Feb 4 at 11:59pm", "Due: Feb 4, 2026 by 11:59 PM", "Due Feb 4"
+CANVAS_DUE_PATTERN = re.compile(
+    r'\bdue:?\s+([A-Za-z]{3,9})\.?\s+(\d{1,2})(?:,?\s+(\d{4}))?'
+    r'(?:\s*(?:at|by|,)?\s*(\d{1,2})(?::(\d{2}))?\s*([ap])\.?m\.?)?',
+    re.IGNORECASE
+)
+CANVAS_NO_DUE_PATTERN = re.compile(r'\bno due date\b', re.IGNORECASE)
+
+TASK_TYPE_KEYWORDS = [
+    ('exam', ('exam', 'midterm', 'final')),
+    ('quiz', ('quiz',)),
+    ('lab', ('lab',)),
+    ('project', ('project',)),
+    ('homework', ('homework', 'hw')),
+]
+# PrairieLearn assessment-set label prefixes, checked longest first
+PL_LABEL_TYPES = [
+    ('pogil', 'activity'),
+    ('quiz', 'quiz'),
+    ('exam', 'exam'),
+    ('lab', 'lab'),
+    ('hw', 'homework'),
+    ('mp', 'project'),
+    ('q', 'quiz'),
+    ('e', 'exam'),
+    ('a', 'activity'),
+]
+
+
+def _resolve_year(month: int, day: int, now: datetime) -> int:
+    """Pick the year that puts a yearless date closest to `now`."""
+    year = now.year
+    try:
+        candidate = datetime(year, month, day, tzinfo=now.tzinfo)
+    except ValueError:
+        return year
+    if candidate - now > timedelta(days=183):
+        return year - 1
+    if now - candidate > timedelta(days=183):
+        return year + 1
+    return year
+
+
+def _localize(year: int, month: int, day: int, hour: int, minute: int) -> Optional[str]:
+    try:
+        return SCHOOL_TIMEZONE.localize(datetime(year, month, day, hour, minute)).isoformat()
+    except ValueError:
+        return None
+
+
+def parse_prairielearn_due(due_text: str, now: Optional[datetime] = None) -> Optional[str]:
+    """Parse PrairieLearn credit text like '100% until 23:59, Tue, Feb 3' into ISO 8601."""
+    match = PL_DUE_PATTERN.search(due_text or '')
+    if not match:
+        return None
+    hour, minute, month_str, day, year = match.groups()
+    month = MONTHS.get(month_str[:3].lower())
+    if not month:
+        return None
+    now = now or datetime.now(SCHOOL_TIMEZONE)
+    year = int(year) if year else _resolve_year(month, int(day), now)
+    return _localize(year, month, int(day), int(hour), int(minute))
+
+
+def parse_canvas_due(due_text: str, now: Optional[datetime] = None) -> Optional[str]:
+    """Parse Canvas due text like 'Due Feb 4 at 11:59pm' into ISO 8601 (23:59 if no time given)."""
+    match = CANVAS_DUE_PATTERN.search(due_text or '')
+    if not match:
+        return None
+    month_str, day, year, hour, minute, meridiem = match.groups()
+    month = MONTHS.get(month_str[:3].lower())
+    if not month:
+        return None
+    if hour:
+        hour = int(hour) % 12 + (12 if meridiem.lower() == 'p' else 0)
+        minute = int(minute or 0)
+    else:
+        hour, minute = 23, 59
+    now = now or datetime.now(SCHOOL_TIMEZONE)
+    year = int(year) if year else _resolve_year(month, int(day), now)
+    return _localize(year, month, int(day), hour, minute)
+
+
+def classify_task_type(title: str, label: str = '', default: str = 'assignment') -> str:
+    """Guess task_type from an assessment-set label and/or title."""
+    label_lower = (label or '').strip().lower()
+    if label_lower:
+        for prefix, task_type in PL_LABEL_TYPES:
+            if re.match(rf'^{prefix}\d*$', label_lower) or (len(prefix) > 1 and label_lower.startswith(prefix)):
+                return task_type
+    words = re.findall(r'[a-z]+', (title or '').lower())
+    for task_type, keywords in TASK_TYPE_KEYWORDS:
+        if any(word in keywords for word in words):
+            return task_type
+    return default
+
+
+def _prairielearn_status(score_text: str, due_at: Optional[str], now: datetime) -> Optional[str]:
+    text = (score_text or '').strip().lower()
+    if text in ('', 'not started'):
+        status = 'not_started'
+    else:
+        match = PL_SCORE_PATTERN.match(text)
+        if not match:
+            return None
+        status = 'completed' if float(match.group(1)) >= 100 else 'in_progress'
+    if status != 'completed' and due_at and datetime.fromisoformat(due_at) < now:
+        return 'overdue'
+    return status
+
+
+def parse_prairielearn_tasks(raw_data: Dict[str, Any], class_info: Dict) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Map scrape_prairielearn_assessments() output into tasks.
+
+    Returns:
+        (tasks, leftover assessment rows that couldn't be classified)
+    """
+    now = datetime.now(SCHOOL_TIMEZONE)
+    tasks = []
+    leftovers = []
+
+    for assessment in raw_data.get('assessments', []):
+        cells = assessment.get('cells') or []
+        if not any(cell.get('text') for cell in cells):
+            # Week separator or empty row
+            continue
+
+        title = (assessment.get('title') or '').strip()
+        due_info = (assessment.get('due_info') or '').strip()
+        # API rows carry the real due date from the access rules
+        due_at = assessment.get('due_at') or parse_prairielearn_due(due_info, now)
+        if not title or (due_at is None and not PL_NO_DUE_PATTERN.match(due_info)):
+            leftovers.append(assessment)
+            continue
+
+        # API rows have no score column; None keeps the stored status on upsert
+        status = None
+        if 'status' in assessment:
+            status = _prairielearn_status(assessment['status'], due_at, now)
+            if status is None:
+                leftovers.append(assessment)
+                continue
+
+        links = assessment.get('links') or []
+        label = (assessment.get('label') or '').strip()
+        tasks.append({
+            'class_id': class_info['id'],
+            'title': title,
+            'task_type': classify_task_type(title, label, default='activity'),
+            'due_at': due_at,
+            'url': links[0].get('href') if links else None,
+            'status': status,
+            'source_label': label,
+        })
+
+    return tasks, leftovers
+
+
+def parse_canvas_tasks(raw_data: List[Dict], class_info: Dict) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Map scrape_assignments_for_course_url() output into tasks.
+
+    Returns:
+        (tasks, leftover assignments whose due text couldn't be parsed)
+    """
+    now = datetime.now(SCHOOL_TIMEZONE)
+    tasks = []
+    leftovers = []
+
+    for assignment in raw_data:
+        title = (assignment.get('title') or '').strip()
+        if not title:
+            continue
+
+        due_at = assignment.get('due_at')
+        due_text = assignment.get('due_text_raw')
+        if not due_at and due_text:
+            due_at = parse_canvas_due(due_text, now)
+            if due_at is None and not CANVAS_NO_DUE_PATTERN.search(due_text):
+                leftovers.append(assignment)
+                continue
+
+        status = 'not_started'
+        if due_at and datetime.fromisoformat(due_at.replace('Z', '+00:00')) < now:
+            status = 'overdue'
+        tasks.append({
+            'class_id': class_info['id'],
+            'title': title,
+            'task_type': classify_task_type(title),
+            'due_at': due_at,
+            'url': assignment.get('url'),
+            'status': status,
+            'source_label': '',
+        })
+
+    return tasks, leftovers
+
+
+def parse_tasks_structured(raw_data: Any, platform: str, class_info: Dict) -> Tuple[List[Dict], Any]:
+    """
+    Run the deterministic parser for `platform`.
+
+    Returns:
+        (tasks, leftover_raw_data) where leftover_raw_data has the same shape
+        as `raw_data` but only the unclassified rows, or None if every row
+        was handled. Platforms without a parser return ([], raw_data).
+    """
+    if platform == 'prairielearn' and isinstance(raw_data, dict):
+        tasks, leftovers = parse_prairielearn_tasks(raw_data, class_info)
+        leftover_raw = {**raw_data, 'assessments': leftovers} if leftovers else None
+    elif platform == 'canvas' and isinstance(raw_data, list):
+        tasks, leftovers = parse_canvas_tasks(raw_data, class_info)
+        leftover_raw = leftovers or None
+    else:
+        return [], raw_data
+
+    logger.info(f"🧮 Structured parser: {len(tasks)} tasks, {len(leftovers)} rows left for LLM")
+    return tasks, leftover_raw
@@ -4,16 +4,19 @@ Task Sync Service - Scrapes class sources and syncs tasks to Supabase.
 Flow:
 1. Read URLs from class_sources table (linked to classes)
 2. Scrape each source using appropriate scraper
-3. Use LLM to parse raw data into structured tasks
+3. Parse raw data into structured tasks (deterministic parsers, LLM for leftovers)
 4. Upsert tasks to the tasks table
 """
 
 import os
 import json
+import time
 import requests
 import logging
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dateutil import parser as date_parser
 
 # Set up logging
@@ -38,8 +41,45 @@ except ImportError as e:
     logger.warning(f"⚠️ Canvas scraper not available: {e}")
     scrape_assignments_for_course_url = None
 
+try:
+    from scrapers.waits import wait_timings
+except ImportError:
+    wait_timings = None
+
+from services.parse_cache import get_parse_cache, make_cache_key
+from services.task_parsers import parse_tasks_structured
+from services.sync_scheduler import filter_stale_sources, record_source_fetch
+from services.job_events import emit_event
+
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
+# Chrome profiles with saved logins; scrapers lease pooled drivers per profile
+CANVAS_PROFILE_DIR = os.getenv('CANVAS_PROFILE_DIR')
+PRAIRIELEARN_PROFILE_DIR = os.getenv('PRAIRIELEARN_PROFILE_DIR')
+
+# Bump whenever the parsing prompt or model changes so cached parses from the
+# old prompt are not reused.
+PARSE_PROMPT_VERSION = '2'
+
+# Token budget per LLM parse request and how many requests run at once when a
+# large payload is split into batches.
+LLM_CHUNK_TOKEN_BUDGET = int(os.getenv('LLM_CHUNK_TOKEN_BUDGET', '3000'))
+LLM_PARSE_CONCURRENCY = int(os.getenv('LLM_PARSE_CONCURRENCY', '4'))
+
+# Concurrency limits for source scraping. Each scrape drives its own Chrome,
+# so the global cap bounds browsers per sync and the per-platform caps keep
+# us from hammering a single LMS.
+SYNC_MAX_WORKERS = int(os.getenv('SYNC_MAX_WORKERS', '4'))
+PLATFORM_CONCURRENCY = {
+    'canvas': int(os.getenv('SYNC_CANVAS_CONCURRENCY', '3')),
+    'prairielearn': int(os.getenv('SYNC_PRAIRIELEARN_CONCURRENCY', '2')),
+}
+
+# Rows per PostgREST upsert request when writing tasks.
+TASK_UPSERT_BATCH_SIZE = int(os.getenv('TASK_UPSERT_BATCH_SIZE', '500'))
+# Titles per existing-task lookup (they go in the query string).
+TASK_KEY_LOOKUP_CHUNK = int(os.getenv('TASK_KEY_LOOKUP_CHUNK', '100'))
+
 
 def detect_platform(url: str) -> str:
     """Detect which platform a URL belongs to."""
@@ -55,27 +95,7 @@ def detect_platform(url: str) -> str:
     return 'unknown'
 
 
-def parse_tasks_with_llm(raw_data: Dict[str, Any], platform: str, class_info: Dict) -> List[Dict]:
-    """
-    Use GPT-4o to parse raw scraped data into structured task objects.
-    
-    Args:
-        raw_data: Raw scraped data from the scraper
-        platform: Platform name (prairielearn, canvas, etc.)
-        class_info: Class metadata (id, code, title)
-    
-    Returns:
-        List of task dicts ready for database insertion
-    """
-    logger.info(f"🤖 Parsing tasks with LLM for {class_info.get('code', 'unknown')} from {platform}")
-    logger.info(f"   Raw data keys: {list(raw_data.keys()) if isinstance(raw_data, dict) else 'list'}")
-    
-    if not OPENAI_API_KEY:
-        logger.warning("⚠️ No OpenAI API key - falling back to basic parsing")
-        # Fallback: basic parsing without LLM
-        return parse_tasks_basic(raw_data, platform, class_info)
-    
-    system_prompt = """You are a data parser that converts raw scraped course data into structured task objects.
+PARSE_SYSTEM_PROMPT = """You are a data parser that converts raw scraped course data into structured task objects.
 
 Given raw scraped data from a course platform, extract each assignment/assessment as a task object.
 
@@ -92,12 +112,85 @@ Extract status from text like "Not started", "0%", "100%", etc.
 
 Return ONLY valid JSON array, no explanation."""
 
+
+def _compact_payload(value: Any) -> Any:
+    """Strip per-cell html and empty values so the prompt only carries text."""
+    if isinstance(value, dict):
+        compact = {}
+        for k, v in value.items():
+            if k in ('html', 'raw_text', 'scraped_at'):
+                continue
+            v = _compact_payload(v)
+            if v in (None, '', [], {}):
+                continue
+            compact[k] = v
+        return compact
+    if isinstance(value, list):
+        return [_compact_payload(v) for v in value]
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    return value
+
+
+def _estimate_tokens(value: Any) -> int:
+    # ~4 characters per token is close enough for budgeting JSON
+    return len(json.dumps(value, separators=(',', ':'))) // 4 + 1
+
+
+def split_payload_for_llm(raw_data: Any, token_budget: int = LLM_CHUNK_TOKEN_BUDGET) -> List[Any]:
+    """
+    Split a compacted scrape payload into batches of rows that each fit `token_budget`.
+    
+    PrairieLearn payloads are split on their 'assessments' rows (the other
+    keys are repeated in every batch as context); Canvas payloads are plain
+    lists and are split directly. Anything else is a single batch.
+    """
+    if isinstance(raw_data, dict) and isinstance(raw_data.get('assessments'), list):
+        context = {k: v for k, v in raw_data.items() if k != 'assessments'}
+        rows = raw_data['assessments']
+        wrap = lambda batch: {**context, 'assessments': batch}
+        overhead = _estimate_tokens(context)
+    elif isinstance(raw_data, list):
+        rows = raw_data
+        wrap = lambda batch: batch
+        overhead = 0
+    else:
+        return [raw_data]
+    
+    batches = []
+    current = []
+    current_tokens = overhead
+    for row in rows:
+        row_tokens = _estimate_tokens(row)
+        if current and current_tokens + row_tokens > token_budget:
+            batches.append(wrap(current))
+            current = []
+            current_tokens = overhead
+        current.append(row)
+        current_tokens += row_tokens
+    if current or not batches:
+        batches.append(wrap(current))
+    return batches
+
+
+def _parse_batch_with_llm(batch: Any, platform: str, class_info: Dict, batch_label: str) -> List[Dict]:
+    """Parse one payload batch with GPT-4o, consulting the parse cache first."""
+    # Skip the LLM entirely if this exact payload was parsed before
+    cache = get_parse_cache()
+    cache_key = make_cache_key(batch, platform, class_info, PARSE_PROMPT_VERSION)
+    cached_tasks = cache.get(cache_key)
+    if cached_tasks is not None:
+        logger.info(f"⚡ Parse cache hit for batch {batch_label} - reusing {len(cached_tasks)} tasks")
+        for task in cached_tasks:
+            task['class_id'] = class_info['id']
+        return cached_tasks
+    
     user_prompt = f"""Platform: {platform}
 Class: {class_info.get('code', '')} - {class_info.get('title', '')}
 Current date: {datetime.now().strftime('%Y-%m-%d')}
 
 Raw scraped data:
-{json.dumps(raw_data, indent=2)[:8000]}
+{json.dumps(batch, separators=(',', ':'))}
 
 Extract all tasks as a JSON array:"""
 
@@ -111,13 +204,13 @@ Extract all tasks as a JSON array:"""
             json={
                 'model': 'gpt-4o',
                 'messages': [
-                    {'role': 'system', 'content': system_prompt},
+                    {'role': 'system', 'content': PARSE_SYSTEM_PROMPT},
                     {'role': 'user', 'content': user_prompt}
                 ],
                 'temperature': 0.1,
-                'max_tokens': 2000
+                'max_tokens': 4000
             },
-            timeout=30
+            timeout=60
         )
         
         if response.status_code == 200:
@@ -129,7 +222,8 @@ Extract all tasks as a JSON array:"""
                 content = content.split('```')[1].split('```')[0]
             
             tasks = json.loads(content.strip())
-            logger.info(f"✅ LLM parsed {len(tasks)} tasks")
+            logger.info(f"✅ LLM parsed {len(tasks)} tasks from batch {batch_label}")
+            cache.put(cache_key, tasks, platform)
             
             # Add class_id to each task
             for task in tasks:
@@ -137,12 +231,80 @@ Extract all tasks as a JSON array:"""
             
             return tasks
         else:
-            logger.error(f"❌ LLM API error: {response.status_code} - {response.text}")
-            return parse_tasks_basic(raw_data, platform, class_info)
+            logger.error(f"❌ LLM API error on batch {batch_label}: {response.status_code} - {response.text}")
+            return parse_tasks_basic(batch, platform, class_info)
             
     except Exception as e:
-        logger.error(f"❌ LLM parsing error: {e}")
+        logger.error(f"❌ LLM parsing error on batch {batch_label}: {e}")
+        return parse_tasks_basic(batch, platform, class_info)
+
+
+def parse_tasks_with_llm(raw_data: Dict[str, Any], platform: str, class_info: Dict) -> List[Dict]:
+    """
+    Use GPT-4o to parse raw scraped data into structured task objects.
+    
+    The payload is compacted (no html, no whitespace), split into
+    token-budgeted batches of rows, and the batches are parsed concurrently.
+    Results are merged and de-duplicated by title. A batch whose LLM call
+    fails falls back to basic parsing on its own.
+    
+    Args:
+        raw_data: Raw scraped data from the scraper
+        platform: Platform name (prairielearn, canvas, etc.)
+        class_info: Class metadata (id, code, title)
+    
+    Returns:
+        List of task dicts ready for database insertion
+    """
+    logger.info(f"🤖 Parsing tasks with LLM for {class_info.get('code', 'unknown')} from {platform}")
+    logger.info(f"   Raw data keys: {list(raw_data.keys()) if isinstance(raw_data, dict) else 'list'}")
+    
+    if not OPENAI_API_KEY:
+        logger.warning("⚠️ No OpenAI API key - falling back to basic parsing")
+        # Fallback: basic parsing without LLM
         return parse_tasks_basic(raw_data, platform, class_info)
+    
+    batches = split_payload_for_llm(_compact_payload(raw_data))
+    labels = [f"{i + 1}/{len(batches)}" for i in range(len(batches))]
+    logger.info(f"   Split into {len(batches)} batch(es) of ≤{LLM_CHUNK_TOKEN_BUDGET} tokens")
+    
+    if len(batches) == 1:
+        batch_results = [_parse_batch_with_llm(batches[0], platform, class_info, labels[0])]
+    else:
+        workers = max(1, min(LLM_PARSE_CONCURRENCY, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='llm-parse') as executor:
+            batch_results = list(executor.map(
+                lambda args: _parse_batch_with_llm(args[0], platform, class_info, args[1]),
+                zip(batches, labels)
+            ))
+    
+    # Merge, keeping the first task seen for each title
+    tasks = []
+    seen_titles = set()
+    for batch_tasks in batch_results:
+        for task in batch_tasks:
+            title_key = ' '.join(str(task.get('title') or '').split()).lower()
+            if not title_key or title_key in seen_titles:
+                continue
+            seen_titles.add(title_key)
+            tasks.append(task)
+    
+    logger.info(f"✅ LLM parsed {len(tasks)} unique tasks across {len(batches)} batch(es)")
+    return tasks
+
+
+def parse_tasks(raw_data: Any, platform: str, class_info: Dict) -> List[Dict]:
+    """
+    Parse raw scraped data into tasks, deterministically where possible.
+    
+    The structured PrairieLearn/Canvas parsers handle every row they can
+    classify; only the leftovers (or the whole payload, for platforms without
+    a parser) are sent to the LLM.
+    """
+    tasks, leftover_raw = parse_tasks_structured(raw_data, platform, class_info)
+    if leftover_raw:
+        tasks.extend(parse_tasks_with_llm(leftover_raw, platform, class_info))
+    return tasks
 
 
 def parse_tasks_basic(raw_data: Dict[str, Any], platform: str, class_info: Dict) -> List[Dict]:
@@ -165,7 +327,8 @@ def parse_tasks_basic(raw_data: Dict[str, Any], platform: str, class_info: Dict)
                 'task_type': 'activity',
                 'due_at': None,
                 'url': assessment.get('links', [{}])[0].get('href') if assessment.get('links') else None,
-                'status': 'not_started' if 'not started' in assessment.get('status', '').lower() else 'in_progress',
+                'status': (('not_started' if 'not started' in assessment['status'].lower() else 'in_progress')
+                           if 'status' in assessment else None),
                 'source_label': assessment.get('label', ''),
             }
             tasks.append(task)
@@ -186,144 +349,345 @@ def parse_tasks_basic(raw_data: Dict[str, Any], platform: str, class_info: Dict)
     return tasks
 
 
-def sync_tasks_for_class(class_id: str) -> Dict[str, Any]:
+def _source_platform(source: Dict) -> str:
+    """Resolve the platform for a class_sources row."""
+    url = source.get('url') or ''
+    # Column is 'source_type' not 'platform'
+    platform = source.get('source_type') or source.get('platform') or detect_platform(url)
+    return platform.lower() if platform else 'unknown'
+
+
+def _source_event(stage: str, source: Dict, class_info: Dict, **data) -> None:
+    emit_event(
+        stage,
+        source_id=source.get('id'),
+        platform=_source_platform(source),
+        class_id=class_info.get('id'),
+        class_code=class_info.get('code'),
+        **data
+    )
+
+
+def scrape_source(source: Dict, class_info: Dict) -> Dict[str, Any]:
     """
-    Sync tasks for a single class by scraping its sources.
+    Scrape and parse a single class source.
     
     Args:
-        class_id: UUID of the class
+        source: class_sources row
+        class_info: Class metadata (id, code, title)
     
     Returns:
-        Dict with sync results
+        Dict with 'tasks' (parsed task dicts) and 'errors' (list of strings),
+        plus 'fetched_source' after a successful scrape. Its fetch stats are
+        recorded by _finish_class_sync once the tasks are stored.
     """
-    logger.info(f"\n{'='*50}")
-    logger.info(f"🔄 Starting sync for class_id: {class_id}")
+    url = source.get('url')
+    platform = _source_platform(source)
+    source_id = source.get('id')
     
-    # Get class info
-    class_result = supabase.table('classes').select('*').eq('id', class_id).single().execute()
-    if not class_result.data:
-        logger.error(f"❌ Class not found: {class_id}")
-        return {'success': False, 'error': 'Class not found'}
+    logger.info(f"\n🌐 Scraping {platform}: {url[:80]}...")
+    _source_event('scraping', source, class_info)
+    started = time.monotonic()
     
-    class_info = class_result.data
-    logger.info(f"📚 Class: {class_info.get('code')} - {class_info.get('title')}")
+    try:
+        # Scrape based on platform
+        raw_data = None
+        
+        if platform == 'prairielearn':
+            if scrape_prairielearn_assessments:
+                logger.info("   Using PrairieLearn scraper...")
+                raw_data = scrape_prairielearn_assessments(url, headless=True, profile_dir=PRAIRIELEARN_PROFILE_DIR,
+                                                           api_token=source.get('api_token'))
+            else:
+                logger.error("   ❌ PrairieLearn scraper not available!")
+                return {'tasks': [], 'errors': ["PrairieLearn scraper not available"]}
+        elif platform == 'canvas':
+            if scrape_assignments_for_course_url:
+                logger.info("   Using Canvas scraper...")
+                raw_data = scrape_assignments_for_course_url(url, headless=True, profile_dir=CANVAS_PROFILE_DIR)
+            else:
+                logger.error("   ❌ Canvas scraper not available!")
+                return {'tasks': [], 'errors': ["Canvas scraper not available"]}
+        else:
+            logger.warning(f"   ⚠️ No scraper for platform: {platform}")
+            return {'tasks': [], 'errors': [f"No scraper for platform: {platform}"]}
+        
+        logger.info(f"   📦 Raw data received: {type(raw_data)}")
+        if isinstance(raw_data, dict):
+            logger.info(f"   📦 Keys: {list(raw_data.keys())}")
+            if raw_data.get('assessments'):
+                logger.info(f"   📦 Assessments count: {len(raw_data.get('assessments', []))}")
+        
+        scrape_ms = round((time.monotonic() - started) * 1000)
+        scrape_error = raw_data.get('error') if isinstance(raw_data, dict) else None
+        if raw_data and not scrape_error:
+            rows = len(raw_data.get('assessments', [])) if isinstance(raw_data, dict) else len(raw_data)
+            _source_event('parsing', source, class_info, rows=rows, scrape_ms=scrape_ms)
+            parse_started = time.monotonic()
+            
+            # Parse structurally, with LLM fallback for leftover rows
+            tasks = parse_tasks(raw_data, platform, class_info)
+            logger.info(f"   ✅ Parsed {len(tasks)} tasks from {platform}")
+            _source_event('parsed', source, class_info, tasks=len(tasks),
+                          parse_ms=round((time.monotonic() - parse_started) * 1000))
+            
+            # Add source metadata
+            for task in tasks:
+                task['source_id'] = source_id
+                if not task.get('source_label'):
+                    task['source_label'] = platform
+            
+            return {'tasks': tasks, 'errors': [], 'fetched_source': source}
+        elif scrape_error:
+            logger.error(f"   ❌ Scraper error: {scrape_error}")
+            _source_event('error', source, class_info, error=scrape_error, scrape_ms=scrape_ms)
+            return {'tasks': [], 'errors': [f"{platform}: {scrape_error}"]}
+        else:
+            logger.warning(f"   ⚠️ No data returned from scraper")
+            _source_event('parsed', source, class_info, tasks=0, scrape_ms=scrape_ms)
+            return {'tasks': [], 'errors': []}
+            
+    except Exception as e:
+        logger.error(f"   ❌ Exception during scraping: {str(e)}")
+        _source_event('error', source, class_info, error=str(e))
+        return {'tasks': [], 'errors': [f"{platform}: {str(e)}"]}
+
+
+def scrape_sources_concurrently(
+    jobs: List[Tuple[Dict, Dict]],
+    max_workers: int = SYNC_MAX_WORKERS,
+    platform_limits: Optional[Dict[str, int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Scrape many (source, class_info) pairs on a bounded worker pool.
     
-    # Get sources for this class
-    sources_result = supabase.table('class_sources').select('*').eq('class_id', class_id).execute()
-    sources = sources_result.data or []
+    At most `max_workers` scrapes run at once overall, and at most
+    `platform_limits[platform]` at once for each listed platform. Jobs for a
+    saturated platform are held back (not parked on a worker) so other
+    platforms can use the free slots.
+    
+    Returns:
+        One scrape_source() result per job, in the same order as `jobs`
+    """
+    if platform_limits is None:
+        platform_limits = PLATFORM_CONCURRENCY
+    max_workers = max(1, max_workers)
     
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    for source, class_info in jobs:
+        _source_event('queued', source, class_info)
+    pending = deque(enumerate(jobs))
+    running = {}
+    in_flight = Counter()
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='source-scrape') as executor:
+        while pending or running:
+            held_back = []
+            while pending and len(running) < max_workers:
+                index, (source, class_info) = pending.popleft()
+                platform = _source_platform(source)
+                limit = platform_limits.get(platform)
+                if limit is not None and in_flight[platform] >= max(1, limit):
+                    held_back.append((index, (source, class_info)))
+                    continue
+                future = executor.submit(scrape_source, source, class_info)
+                running[future] = (index, platform)
+                in_flight[platform] += 1
+            pending.extendleft(reversed(held_back))
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, platform = running.pop(future)
+                in_flight[platform] -= 1
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    logger.error(f"   ❌ Scrape worker failed: {str(e)}")
+                    results[index] = {'tasks': [], 'errors': [f"{platform}: {str(e)}"]}
+    
+    return results
+
+
+def _log_sources(sources: List[Dict]) -> None:
     logger.info(f"🔗 Found {len(sources)} sources for this class")
     for src in sources:
         src_type = src.get('source_type') or src.get('platform') or 'unknown'
-        logger.info(f"   - {src_type}: {src.get('url', 'no url')[:60]}...")
+        logger.info(f"   - {src_type}: {(src.get('url') or 'no url')[:60]}...")
+
+
+def _task_row(task: Dict, updated_at: str) -> Dict[str, Any]:
+    """
+    Prepare a parsed task for insert into the tasks table. A task whose
+    status is None (unknown to the scraper) leaves the stored status alone.
+    """
+    row = {
+        'class_id': task['class_id'],
+        'title': task['title'],
+        'task_type': task.get('task_type', 'assignment'),
+        'due_at': task.get('due_at'),
+        'url': task.get('url'),
+        'source_id': task.get('source_id'),
+        'source_label': task.get('source_label', ''),
+        'status': task.get('status', 'not_started'),
+        'updated_at': updated_at
+    }
+    if row['status'] is None:
+        del row['status']
+    return row
+
+
+def _existing_task_keys(rows: List[Dict]) -> set:
+    """
+    Return the (class_id, title) pairs from `rows` that already exist in tasks.
+
+    Filters on the titles being written (in URL-sized chunks), so each
+    response is at most one chunk and PostgREST's row cap can't truncate it.
+    """
+    titles_by_class: Dict[str, List[str]] = {}
+    for row in rows:
+        titles_by_class.setdefault(row['class_id'], []).append(row['title'])
+    existing = set()
+    for class_id, titles in titles_by_class.items():
+        for start in range(0, len(titles), TASK_KEY_LOOKUP_CHUNK):
+            chunk = titles[start:start + TASK_KEY_LOOKUP_CHUNK]
+            result = supabase.table('tasks').select('class_id, title') \
+                .eq('class_id', class_id).in_('title', chunk).execute()
+            existing.update((r['class_id'], r['title']) for r in result.data or [])
+    return existing
+
+
+def upsert_tasks_batched(all_tasks: List[Dict], batch_size: int = TASK_UPSERT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Upsert parsed tasks to the tasks table in chunks of `batch_size` rows.
     
-    if not sources:
-        logger.warning("⚠️ No sources configured for this class")
-        return {'success': True, 'message': 'No sources configured', 'tasks_synced': 0}
+    Rows are keyed on (class_id, title), same as the single-row upsert, and
+    duplicate keys are collapsed (last one wins) since Postgres rejects a
+    batch that touches the same conflict key twice. If a whole batch fails,
+    its rows are retried one at a time so a single bad row doesn't sink the
+    other 499. Tasks that can't be turned into a row (e.g. no title) are
+    skipped and reported in 'errors'. Existing keys are read once up front,
+    for just the titles being written.
     
-    all_tasks = []
-    errors = []
+    Returns:
+        Dict with totals (synced, inserted, updated, failed), per-batch
+        stats under 'batches', error strings under 'errors' and the
+        (class_id, title) keys written under 'saved_keys'
+    """
+    batch_size = max(1, batch_size)
+    updated_at = datetime.now(timezone.utc).isoformat()
     
-    for source in sources:
-        url = source.get('url')
-        if not url:
-            logger.warning(f"⚠️ Source {source.get('id')} has no URL, skipping")
+    rows_by_key: Dict[Tuple[str, str], Dict] = {}
+    errors = []
+    for task in all_tasks:
+        try:
+            row = _task_row(task, updated_at)
+            if not row['class_id'] or not isinstance(row['title'], str) or not row['title'].strip():
+                raise ValueError("missing class_id or title")
+        except Exception as e:
+            logger.error(f"   ❌ Skipping malformed task {str(task)[:80]}: {e}")
+            errors.append(f"Malformed task skipped: {e}")
             continue
-        
-        # Column is 'source_type' not 'platform'
-        platform = source.get('source_type') or source.get('platform') or detect_platform(url)
-        platform = platform.lower() if platform else 'unknown'
-        source_id = source.get('id')
-        
-        logger.info(f"\n🌐 Scraping {platform}: {url[:80]}...")
+        rows_by_key[(row['class_id'], row['title'])] = row
+    # Every row in one PostgREST request needs the same columns, so rows
+    # without a status are sent in their own batches
+    rows_by_columns: Dict[Tuple[str, ...], List[Dict]] = {}
+    for row in rows_by_key.values():
+        rows_by_columns.setdefault(tuple(row), []).append(row)
+    chunks = [
+        rows[start:start + batch_size]
+        for rows in rows_by_columns.values()
+        for start in range(0, len(rows), batch_size)
+    ]
+    
+    # One lookup for the whole sync, only used to split inserted/updated counts
+    try:
+        existing = _existing_task_keys(list(rows_by_key.values())) if rows_by_key else set()
+    except Exception as e:
+        logger.warning(f"   ⚠️ Could not look up existing tasks: {str(e)}")
+        existing = set()
+    
+    batches = []
+    saved_keys = set()
+    for batch in chunks:
+        stats = {'batch': len(batches) + 1, 'rows': len(batch), 'inserted': 0, 'updated': 0, 'failed': 0}
         
         try:
-            # Scrape based on platform
-            raw_data = None
-            
-            if platform == 'prairielearn':
-                if scrape_prairielearn_assessments:
-                    logger.info("   Using PrairieLearn scraper...")
-                    raw_data = scrape_prairielearn_assessments(url, headless=True)
-                else:
-                    logger.error("   ❌ PrairieLearn scraper not available!")
-                    errors.append(f"PrairieLearn scraper not available")
-                    continue
-            elif platform == 'canvas':
-                if scrape_assignments_for_course_url:
-                    logger.info("   Using Canvas scraper...")
-                    raw_data = scrape_assignments_for_course_url(url, headless=True)
-                else:
-                    logger.error("   ❌ Canvas scraper not available!")
-                    errors.append(f"Canvas scraper not available")
-                    continue
-            else:
-                logger.warning(f"   ⚠️ No scraper for platform: {platform}")
-                errors.append(f"No scraper for platform: {platform}")
-                continue
-            
-            logger.info(f"   📦 Raw data received: {type(raw_data)}")
-            if isinstance(raw_data, dict):
-                logger.info(f"   📦 Keys: {list(raw_data.keys())}")
-                if raw_data.get('assessments'):
-                    logger.info(f"   📦 Assessments count: {len(raw_data.get('assessments', []))}")
-            
-            if raw_data and not raw_data.get('error'):
-                # Parse with LLM
-                tasks = parse_tasks_with_llm(raw_data, platform, class_info)
-                logger.info(f"   ✅ Parsed {len(tasks)} tasks from {platform}")
-                
-                # Add source metadata
-                for task in tasks:
-                    task['source_id'] = source_id
-                    if not task.get('source_label'):
-                        task['source_label'] = platform
-                
-                all_tasks.extend(tasks)
-            elif raw_data and raw_data.get('error'):
-                logger.error(f"   ❌ Scraper error: {raw_data.get('error')}")
-                errors.append(f"{platform}: {raw_data.get('error')}")
-            else:
-                logger.warning(f"   ⚠️ No data returned from scraper")
-                
+            result = supabase.table('tasks').upsert(batch, on_conflict='class_id,title').execute()
+            saved = result.data or []
         except Exception as e:
-            logger.error(f"   ❌ Exception during scraping: {str(e)}")
-            errors.append(f"{platform}: {str(e)}")
+            logger.error(f"   ❌ Batch {stats['batch']} upsert error, retrying row by row: {str(e)}")
+            saved = []
+            for row in batch:
+                try:
+                    saved.extend(supabase.table('tasks').upsert(row, on_conflict='class_id,title').execute().data or [])
+                except Exception as row_error:
+                    errors.append(f"DB insert error: {str(row_error)}")
+        
+        for row in saved:
+            saved_keys.add((row.get('class_id'), row.get('title')))
+            if (row.get('class_id'), row.get('title')) in existing:
+                stats['updated'] += 1
+            else:
+                stats['inserted'] += 1
+        stats['failed'] = len(batch) - len(saved)
+        
+        logger.info(
+            f"   💾 Batch {stats['batch']}: {stats['rows']} rows - "
+            f"{stats['inserted']} inserted, {stats['updated']} updated, {stats['failed']} failed"
+        )
+        batches.append(stats)
+    
+    return {
+        'synced': sum(b['inserted'] + b['updated'] for b in batches),
+        'inserted': sum(b['inserted'] for b in batches),
+        'updated': sum(b['updated'] for b in batches),
+        'failed': sum(b['failed'] for b in batches),
+        'batches': batches,
+        'errors': errors,
+        'saved_keys': saved_keys,
+    }
+
+
+def _finish_class_sync(scrape_results: List[Dict[str, Any]], class_info: Dict) -> Dict[str, Any]:
+    """Upsert the tasks from a class's scraped sources and build its result dict."""
+    all_tasks = []
+    errors = []
+    for scrape_result in scrape_results:
+        all_tasks.extend(scrape_result['tasks'])
+        errors.extend(scrape_result['errors'])
     
     logger.info(f"\n📊 Total tasks to sync: {len(all_tasks)}")
+    emit_event('upserting', class_id=class_info.get('id'), class_code=class_info.get('code'), tasks=len(all_tasks))
+    started = time.monotonic()
     
     # Upsert tasks to database
-    tasks_synced = 0
-    for task in all_tasks:
-        try:
-            # Prepare task for insert
-            task_data = {
-                'class_id': task['class_id'],
-                'title': task['title'],
-                'task_type': task.get('task_type', 'assignment'),
-                'due_at': task.get('due_at'),
-                'url': task.get('url'),
-                'source_id': task.get('source_id'),
-                'source_label': task.get('source_label', ''),
-                'status': task.get('status', 'not_started'),
-                'updated_at': datetime.now(timezone.utc).isoformat()
-            }
-            
-            logger.info(f"   💾 Upserting: {task_data['title'][:50]}...")
-            
-            # Upsert by class_id + title (to avoid duplicates)
-            result = supabase.table('tasks').upsert(
-                task_data,
-                on_conflict='class_id,title'
-            ).execute()
-            
-            if result.data:
-                tasks_synced += 1
-                logger.info(f"      ✅ Saved task ID: {result.data[0].get('id', 'unknown')}")
-                
-        except Exception as e:
-            logger.error(f"      ❌ DB insert error: {str(e)}")
-            errors.append(f"DB insert error: {str(e)}")
+    upsert_result = upsert_tasks_batched(all_tasks)
+    tasks_synced = upsert_result['synced']
+    errors.extend(upsert_result['errors'])
+    
+    # Only mark a source fresh once all of its tasks are stored, so a failed
+    # upsert gets re-scraped on the next pass
+    for scrape_result in scrape_results:
+        source = scrape_result.get('fetched_source')
+        if source is None:
+            continue
+        # Malformed tasks are never written, so they don't hold a source back
+        keys = {(task.get('class_id'), task.get('title')) for task in scrape_result['tasks']
+                if isinstance(task.get('title'), str) and task['title'].strip()}
+        if keys <= upsert_result['saved_keys']:
+            record_source_fetch(source, scrape_result['tasks'])
+        else:
+            logger.warning(f"⚠️ Source {source.get('id')} had tasks that weren't saved; leaving it stale")
+    emit_event(
+        'done',
+        class_id=class_info.get('id'),
+        class_code=class_info.get('code'),
+        inserted=upsert_result['inserted'],
+        updated=upsert_result['updated'],
+        failed=upsert_result['failed'],
+        upsert_ms=round((time.monotonic() - started) * 1000),
+        errors=len(errors)
+    )
     
     logger.info(f"\n{'='*50}")
     logger.info(f"✅ Sync complete: {tasks_synced}/{len(all_tasks)} tasks synced")
@@ -334,16 +698,100 @@ def sync_tasks_for_class(class_id: str) -> Dict[str, Any]:
         'success': True,
         'tasks_synced': tasks_synced,
         'total_scraped': len(all_tasks),
+        'inserted': upsert_result['inserted'],
+        'updated': upsert_result['updated'],
+        'failed': upsert_result['failed'],
+        'upsert_batches': upsert_result['batches'],
         'errors': errors if errors else None
     }
 
 
-def sync_all_classes_for_user(user_id: str) -> Dict[str, Any]:
+def _scrapeable_sources(sources: List[Dict]) -> List[Dict]:
+    usable = []
+    for source in sources:
+        if not source.get('url'):
+            logger.warning(f"⚠️ Source {source.get('id')} has no URL, skipping")
+            continue
+        usable.append(source)
+    return usable
+
+
+def _attach_api_tokens(sources: List[Dict]) -> None:
+    """Load per-source API tokens (class_source_credentials) onto the PrairieLearn sources in one query."""
+    pl_sources = {s['id']: s for s in sources if s.get('id') and _source_platform(s) == 'prairielearn'}
+    if not pl_sources:
+        return
+    try:
+        result = supabase.table('class_source_credentials').select('source_id, api_token') \
+            .in_('source_id', list(pl_sources)).execute()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load source API tokens: {e}")
+        return
+    for row in result.data or []:
+        pl_sources[row['source_id']]['api_token'] = row.get('api_token')
+
+
+def sync_tasks_for_class(class_id: str, force: bool = False) -> Dict[str, Any]:
+    """
+    Sync tasks for a single class by scraping its stale sources.
+    
+    Args:
+        class_id: UUID of the class
+        force: Scrape every source, even ones that are still fresh
+    
+    Returns:
+        Dict with sync results
+    """
+    logger.info(f"\n{'='*50}")
+    logger.info(f"🔄 Starting sync for class_id: {class_id}")
+    
+    # Get class info
+    class_result = supabase.table('classes').select('*').eq('id', class_id).single().execute()
+    if not class_result.data:
+        logger.error(f"❌ Class not found: {class_id}")
+        return {'success': False, 'error': 'Class not found'}
+    
+    class_info = class_result.data
+    logger.info(f"📚 Class: {class_info.get('code')} - {class_info.get('title')}")
+    
+    # Get sources for this class
+    sources_result = supabase.table('class_sources').select('*').eq('class_id', class_id).execute()
+    sources = sources_result.data or []
+    _log_sources(sources)
+    
+    if not sources:
+        logger.warning("⚠️ No sources configured for this class")
+        return {'success': True, 'message': 'No sources configured', 'tasks_synced': 0}
+    
+    scrapeable = _scrapeable_sources(sources)
+    due_sources = filter_stale_sources(scrapeable, force=force)
+    # Fresh sources are skipped; sources with no URL are reported separately
+    counts = {
+        'skipped_sources': len(scrapeable) - len(due_sources),
+        'sources_without_url': len(sources) - len(scrapeable),
+    }
+    _attach_api_tokens(due_sources)
+    if not due_sources:
+        logger.info("✅ All sources are fresh, nothing to sync")
+        return {'success': True, 'message': 'Sources up to date', 'tasks_synced': 0, **counts}
+    
+    jobs = [(source, class_info) for source in due_sources]
+    result = _finish_class_sync(scrape_sources_concurrently(jobs), class_info)
+    result.update(counts)
+    return result
+
+
+def sync_all_classes_for_user(user_id: str, force: bool = False) -> Dict[str, Any]:
     """
     Sync tasks for all classes belonging to a user.
     
+    Only stale sources are scraped (see sync_scheduler.filter_stale_sources)
+    unless `force` is set. They all share one worker pool (see
+    scrape_sources_concurrently), then tasks are upserted class by class.
+    
     Args:
         user_id: UUID of the user
+        force: Scrape every source, even ones that are still fresh
     
     Returns:
         Dict with sync results
@@ -364,11 +812,57 @@ def sync_all_classes_for_user(user_id: str) -> Dict[str, Any]:
         logger.warning("⚠️ No classes found for user")
         return {'success': True, 'message': 'No classes found', 'results': []}
     
+    # Get sources for all classes in one query
+    class_ids = [cls['id'] for cls in classes]
+    sources_result = supabase.table('class_sources').select('*').in_('class_id', class_ids).execute()
+    sources_by_class: Dict[str, List[Dict]] = {class_id: [] for class_id in class_ids}
+    for source in sources_result.data or []:
+        sources_by_class.setdefault(source.get('class_id'), []).append(source)
+    
+    scrapeable = _scrapeable_sources(sources_result.data or [])
+    scrapeable_by_class: Dict[str, int] = {}
+    for source in scrapeable:
+        scrapeable_by_class[source.get('class_id')] = scrapeable_by_class.get(source.get('class_id'), 0) + 1
+    due_sources = filter_stale_sources(scrapeable, force=force)
+    _attach_api_tokens(due_sources)
+    due_by_class: Dict[str, List[Dict]] = {class_id: [] for class_id in class_ids}
+    for source in due_sources:
+        due_by_class.setdefault(source.get('class_id'), []).append(source)
+    
+    jobs = []
+    job_class_ids = []
+    for cls in classes:
+        for source in due_by_class[cls['id']]:
+            jobs.append((source, cls))
+            job_class_ids.append(cls['id'])
+    
+    logger.info(f"🔗 Scraping {len(jobs)} sources (max {SYNC_MAX_WORKERS} at once, per-platform {PLATFORM_CONCURRENCY})")
+    scrape_results = scrape_sources_concurrently(jobs)
+    
+    results_by_class: Dict[str, List[Dict[str, Any]]] = {class_id: [] for class_id in class_ids}
+    for class_id, scrape_result in zip(job_class_ids, scrape_results):
+        results_by_class[class_id].append(scrape_result)
+    
     results = []
     total_synced = 0
     
     for cls in classes:
-        result = sync_tasks_for_class(cls['id'])
+        logger.info(f"\n{'='*50}")
+        logger.info(f"🔄 Finishing sync for {cls.get('code')}")
+        usable = scrapeable_by_class.get(cls['id'], 0)
+        counts = {
+            'skipped_sources': usable - len(due_by_class[cls['id']]),
+            'sources_without_url': len(sources_by_class[cls['id']]) - usable,
+        }
+        if not sources_by_class[cls['id']]:
+            logger.warning("⚠️ No sources configured for this class")
+            result = {'success': True, 'message': 'No sources configured', 'tasks_synced': 0}
+        elif not due_by_class[cls['id']]:
+            logger.info("✅ All sources are fresh, nothing to sync")
+            result = {'success': True, 'message': 'Sources up to date', 'tasks_synced': 0, **counts}
+        else:
+            result = _finish_class_sync(results_by_class[cls['id']], cls)
+            result.update(counts)
         result['class_code'] = cls.get('code')
         result['class_title'] = cls.get('title')
         results.append(result)
@@ -378,6 +872,9 @@ def sync_all_classes_for_user(user_id: str) -> Dict[str, Any]:
     
     logger.info(f"\n{'#'*60}")
     logger.info(f"🎉 SYNC COMPLETE: {total_synced} total tasks synced across {len(classes)} classes")
+    logger.info(f"   Parse cache: {get_parse_cache().stats()}")
+    if wait_timings:
+        logger.info(f"   Scraper waits:\n{wait_timings.report()}")
     logger.info(f"{'#'*60}\n")
     
     return {
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark POST /api/rag/ask latency against the number of selected courses.
+
+Compares the previous per-course lookups (one classes query per code and one
+deadlines query per course) with the set-based load_course_context. The
+Supabase client is simulated with a fixed round-trip time per PostgREST call,
+so results depend only on how many calls are made and in what order.
+
+Usage:
+    python scripts/bench_rag_ask.py [--max-courses 8] [--rtt-ms 25] [--runs 5]
+    python scripts/bench_rag_ask.py --live   # use SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import threading
+from types import SimpleNamespace
+from typing import List, Dict
+
+# Import the backend's routes
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from dotenv import load_dotenv
+
+backend_env = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'backend', '.env')
+load_dotenv(backend_env)
+
+from flask import Flask
+
+# Benchmark the retrieval path without calling OpenAI
+os.environ.pop('OPENAI_API_KEY', None)
+from routes import rag  # noqa: E402
+
+rag.OPENAI_API_KEY = None
+
+DEADLINES_PER_COURSE = 30
+
+
+class FakeQuery:
+    def __init__(self, client, table: str):
+        self.client = client
+        self.table = table
+        self.filters = []
+        self.order_key = None
+        self.limit_n = None
+
+    def select(self, *args):
+        return self
+
+    def eq(self, key, value):
+        self.filters.append(lambda row: row.get(key) == value)
+        return self
+
+    def in_(self, key, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(key) in values)
+        return self
+
+    def order(self, key, **kwargs):
+        self.order_key = key
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def execute(self):
+        self.client.round_trip()
+        rows = [r for r in self.client.tables.get(self.table, []) if all(f(r) for f in self.filters)]
+        if self.order_key:
+            rows.sort(key=lambda r: r.get(self.order_key) or '')
+        if self.limit_n is not None:
+            rows = rows[:self.limit_n]
+        return SimpleNamespace(data=rows)
+
+
+class FakeSupabase:
+    """In-memory tables; every execute() costs one simulated round trip."""
+
+    def __init__(self, n_courses: int, rtt: float):
+        self.rtt = rtt
+        self.calls = 0
+        self.lock = threading.Lock()
+        codes = [f"CS{100 + i}" for i in range(n_courses)]
+        self.tables = {
+            'classes': [{'id': f"class-{c}", 'code': c, 'title': f"Course {c}"} for c in codes],
+            'rag_courses': [{'id': f"rag-{c}", 'code': c} for c in codes],
+            'deadlines': [
+                {'title': f"HW{j}", 'course_name': f"Course {c}", 'type': 'assignment',
+                 'due_date': f"2026-03-{j % 28 + 1:02d}", 'due_date_text': None, 'status': 'pending',
+                 'points_possible': 10}
+                for c in codes for j in range(DEADLINES_PER_COURSE)
+            ],
+        }
+        self.codes = codes
+
+    def round_trip(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.rtt)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Dict):
+        def execute():
+            self.round_trip()
+            if name != 'upcoming_deadlines_by_course':
+                return SimpleNamespace(data=[])
+            rows = []
+            for course in params['p_course_names']:
+                course_rows = [d for d in self.tables['deadlines'] if d['course_name'] == course]
+                rows += sorted(course_rows, key=lambda d: d['due_date'])[:params['p_per_course']]
+            return SimpleNamespace(data=rows)
+        return SimpleNamespace(execute=execute)
+
+
+def legacy_course_context(supabase, course_codes: List[str]) -> List[Dict]:
+    """The previous lookups: one classes query per code, one deadlines query per course."""
+    classes = []
+    if course_codes:
+        for code in course_codes:
+            result = supabase.table('classes').select('id, code, title').eq('code', code).execute()
+            if result.data:
+                classes.append(result.data[0])
+    else:
+        classes = supabase.table('classes').select('id, code, title').execute().data
+    if not classes:
+        return []
+    per_course = max(1, rag.RAG_MAX_DEADLINES // len(classes))
+    courses = []
+    for c in classes:
+        result = supabase.table('deadlines').select('*').eq('course_name', c['title']) \
+            .order('due_date').limit(per_course).execute()
+        courses.append(dict(c, deadlines=result.data or []))
+    return courses
+
+
+def time_request(app: Flask, supabase, codes: List[str], runs: int):
+    """Median request latency in ms and PostgREST calls per request (None when live)."""
+    rag.get_supabase = lambda: supabase
+    body = {'courseCodes': codes, 'question': 'When is the next homework due?'}
+    timings = []
+    calls_before = getattr(supabase, 'calls', None)
+    for _ in range(runs):
+        with app.test_request_context('/api/rag/ask', method='POST', json=body):
+            started = time.perf_counter()
+            rag.ask_question()
+            timings.append((time.perf_counter() - started) * 1000)
+    if calls_before is None:
+        return statistics.median(timings), None
+    return statistics.median(timings), (supabase.calls - calls_before) / runs
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--max-courses', type=int, default=8)
+    ap.add_argument('--rtt-ms', type=float, default=25, help="simulated PostgREST round trip")
+    ap.add_argument('--runs', type=int, default=5)
+    ap.add_argument('--live', action='store_true', help="query the configured Supabase project instead")
+    args = ap.parse_args()
+
+    app = Flask(__name__)
+    set_based = rag.load_course_context
+
+    if args.live:
+        supabase = rag.get_supabase()
+        codes = [c['code'] for c in supabase.table('classes').select('code').execute().data or []]
+        max_courses = min(args.max_courses, len(codes))
+        print(f"live Supabase, {len(codes)} classes, {args.runs} runs\n")
+    else:
+        max_courses = args.max_courses
+        print(f"simulated Supabase, {args.rtt_ms:g} ms per call, {args.runs} runs\n")
+
+    print(f"{'courses':>8}{'before ms':>12}{'calls':>8}{'after ms':>12}{'calls':>8}{'speedup':>10}")
+    for n in range(1, max_courses + 1):
+        if not args.live:
+            supabase = FakeSupabase(n, args.rtt_ms / 1000)
+            codes = supabase.codes
+        selected = codes[:n]
+
+        rag.load_course_context = legacy_course_context
+        before_ms, before_calls = time_request(app, supabase, selected, args.runs)
+        rag.load_course_context = set_based
+        after_ms, after_calls = time_request(app, supabase, selected, args.runs)
+
+        fmt_calls = lambda calls: '-' if calls is None else f"{calls:.0f}"
+        print(f"{n:>8}{before_ms:>12.1f}{fmt_calls(before_calls):>8}{after_ms:>12.1f}{fmt_calls(after_calls):>8}"
+              f"{before_ms / after_ms:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
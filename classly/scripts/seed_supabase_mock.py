@@ -10,17 +10,21 @@ Environment:
     SUPABASE_URL - Your Supabase project URL
     SUPABASE_SERVICE_ROLE_KEY - Service role key (not anon!)
     OPENAI_API_KEY - (Optional) For real embeddings
+    SEED_EMBED_BATCH_SIZE - (Optional) Chunks per embeddings request (default 100)
+    SEED_EMBED_CONCURRENCY - (Optional) Embedding batches in flight at once (default 4)
 """
 
 import os
 import sys
-import hashlib
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
 
 from dotenv import load_dotenv
 
@@ -30,14 +34,20 @@ load_dotenv(backend_env)
 
 from supabase import create_client, Client
 
+from services.local_embedder import embed_texts
+from services.embedding_cache import get_embedding_cache
+
 # Configuration
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
 EMBEDDING_DIM = 1536
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 100
+EMBED_BATCH_SIZE = int(os.getenv('SEED_EMBED_BATCH_SIZE', '100'))
+EMBED_CONCURRENCY = int(os.getenv('SEED_EMBED_CONCURRENCY', '4'))
 
 # ============================================
 # Mock Course Data
@@ -537,53 +547,30 @@ Study Tips:
 # Embedding Functions
 # ============================================
 
-def create_deterministic_embedding(text: str) -> List[float]:
-    """
-    Create a deterministic fake embedding based on text hash.
-    This allows vector search to work logically even without real embeddings.
-    Similar texts will have somewhat similar (but not identical) embeddings.
-    """
-    # Create a hash of the text
-    text_hash = hashlib.sha256(text.encode()).hexdigest()
-    
-    # Use the hash to seed a deterministic sequence
-    embedding = []
-    for i in range(EMBEDDING_DIM):
-        # Take 4 characters of hash, cycle through
-        hex_chunk = text_hash[(i * 4) % len(text_hash):((i * 4) % len(text_hash)) + 4]
-        if len(hex_chunk) < 4:
-            hex_chunk = text_hash[:4]
-        
-        # Convert to float between -1 and 1
-        val = (int(hex_chunk, 16) / 65535) * 2 - 1
-        embedding.append(val)
-    
-    # Normalize the embedding
-    magnitude = sum(x ** 2 for x in embedding) ** 0.5
-    if magnitude > 0:
-        embedding = [x / magnitude for x in embedding]
-    
-    return embedding
-
-
-def create_openai_embedding(text: str, client) -> List[float]:
-    """Create embedding using OpenAI API."""
+def create_openai_embeddings(texts: List[str], client) -> List[List[float]]:
+    """Embed many texts with one OpenAI API call."""
     response = client.embeddings.create(
-        model="text-embedding-ada-002",
-        input=text
+        model=OPENAI_EMBEDDING_MODEL,
+        input=texts
     )
-    return response.data[0].embedding
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
 
 
-def get_embedding(text: str, openai_client=None) -> List[float]:
-    """Get embedding for text, using OpenAI if available, otherwise deterministic."""
+def get_embeddings(texts: List[str], openai_client=None) -> List[List[float]]:
+    """
+    Get embeddings for a batch of texts, using OpenAI if available, otherwise the local embedder.
+    OpenAI embeddings go through the shared embedding cache, so re-seeding
+    unchanged chunks makes no API calls.
+    """
     if openai_client:
         try:
-            return create_openai_embedding(text, openai_client)
+            return get_embedding_cache().get_or_compute(
+                OPENAI_EMBEDDING_MODEL, texts,
+                lambda missing: create_openai_embeddings(missing, openai_client)
+            )
         except Exception as e:
-            print(f"  Warning: OpenAI embedding failed ({e}), using deterministic")
-            return create_deterministic_embedding(text)
-    return create_deterministic_embedding(text)
+            print(f"  Warning: OpenAI embedding failed ({e}), using local embedder")
+    return embed_texts(texts).tolist()
 
 
 # ============================================
@@ -673,6 +660,29 @@ def insert_chunks(supabase: Client, chunks_data: List[Dict[str, Any]]):
         supabase.table('course_chunks').insert(batch).execute()
 
 
+def embed_and_insert_chunks(supabase: Client, chunks_data: List[Dict[str, Any]], openai_client=None):
+    """
+    Embed chunks in batches of EMBED_BATCH_SIZE, at most EMBED_CONCURRENCY
+    batches at a time, and insert each batch as soon as it is embedded so
+    database writes overlap with the remaining embedding requests.
+    """
+    def embed_batch(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        embeddings = get_embeddings([chunk['content'] for chunk in batch], openai_client)
+        for chunk, embedding in zip(batch, embeddings):
+            chunk['embedding'] = embedding
+        return batch
+
+    batches = [chunks_data[i:i + EMBED_BATCH_SIZE] for i in range(0, len(chunks_data), EMBED_BATCH_SIZE)]
+    # One writer thread: the Supabase client is only used from there meanwhile
+    with ThreadPoolExecutor(max_workers=max(1, EMBED_CONCURRENCY)) as embed_pool, \
+            ThreadPoolExecutor(max_workers=1) as insert_pool:
+        embedded = [embed_pool.submit(embed_batch, batch) for batch in batches]
+        inserted = [insert_pool.submit(insert_chunks, supabase, future.result())
+                    for future in as_completed(embedded)]
+        for future in inserted:
+            future.result()
+
+
 # ============================================
 # Main Seeding Function
 # ============================================
@@ -701,16 +711,16 @@ def seed_database():
             openai_client = OpenAI(api_key=OPENAI_API_KEY)
             print("OpenAI client initialized - using real embeddings")
         except ImportError:
-            print("Warning: openai package not installed, using deterministic embeddings")
+            print("Warning: openai package not installed, using local hashing embeddings")
     else:
-        print("No OPENAI_API_KEY found - using deterministic embeddings")
+        print("No OPENAI_API_KEY found - using local hashing embeddings")
     
     # Clear existing data
     clear_rag_tables(supabase)
     
-    # Seed courses
+    # Seed courses and documents, collecting their chunks
     print("\nSeeding courses...")
-    total_chunks = 0
+    chunks_data = []
     
     for course_data in MOCK_COURSES:
         code = course_data['code']
@@ -735,17 +745,13 @@ def seed_database():
             chunks = chunk_text(content)
             print(f"      Chunks: {len(chunks)}")
             
-            # Create embeddings and prepare for insertion
-            chunks_data = []
+            # Prepare for embedding and insertion
             for idx, chunk_content in enumerate(chunks):
-                embedding = get_embedding(chunk_content, openai_client)
-                
                 chunks_data.append({
                     'course_id': course_id,
                     'doc_id': doc_id,
                     'chunk_index': idx,
                     'content': chunk_content,
-                    'embedding': embedding,
                     'metadata': {
                         'doc_title': title,
                         'source': source,
@@ -753,16 +759,26 @@ def seed_database():
                         'total_chunks': len(chunks)
                     }
                 })
-            
-            # Insert chunks
-            insert_chunks(supabase, chunks_data)
-            total_chunks += len(chunks)
+    
+    # Embed and insert all chunks, pipelined
+    print(f"\nEmbedding and inserting {len(chunks_data)} chunks "
+          f"(batches of {EMBED_BATCH_SIZE}, {EMBED_CONCURRENCY} in flight)...")
+    started = time.perf_counter()
+    embed_and_insert_chunks(supabase, chunks_data, openai_client)
+    elapsed = time.perf_counter() - started
+    total_chunks = len(chunks_data)
     
     print("\n" + "=" * 60)
     print("Seeding Complete!")
     print(f"  Courses: {len(MOCK_COURSES)}")
     print(f"  Documents: {sum(len(c['documents']) for c in MOCK_COURSES)}")
     print(f"  Chunks: {total_chunks}")
+    print(f"  Throughput: {total_chunks / elapsed if elapsed else 0:.1f} chunks/sec ({elapsed:.2f}s)")
+    if openai_client:
+        stats = get_embedding_cache().stats()
+        print(f"  Embedding cache: {stats['hit_rate']:.0%} hit rate "
+              f"({stats['memory_hits'] + stats['disk_hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} stored)")
     print("=" * 60)
 
 
@@ -234,6 +234,7 @@ CREATE POLICY "Users can insert own scrape jobs" ON scrape_jobs
 -- ============================================
 CREATE INDEX IF NOT EXISTS idx_deadlines_user_due ON deadlines(user_id, due_date);
 CREATE INDEX IF NOT EXISTS idx_deadlines_user_platform ON deadlines(user_id, platform);
+CREATE INDEX IF NOT EXISTS idx_deadlines_course_name_due ON deadlines(course_name, due_date);
 CREATE INDEX IF NOT EXISTS idx_courses_user ON courses(user_id);
 CREATE INDEX IF NOT EXISTS idx_schedule_user ON schedule_items(user_id);
 CREATE INDEX IF NOT EXISTS idx_course_sources_course ON course_sources(course_id);
@@ -377,3 +378,68 @@ BEGIN
   LIMIT p_match_count;
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Search a set of courses in one round trip (NULL = all courses)
+CREATE OR REPLACE FUNCTION match_course_chunks_multi(
+  p_course_ids UUID[],
+  p_query_embedding vector(1536),
+  p_match_count INT DEFAULT 8,
+  p_min_similarity FLOAT DEFAULT 0.5
+)
+RETURNS TABLE (
+  chunk_id UUID,
+  doc_id UUID,
+  course_id UUID,
+  course_code TEXT,
+  content TEXT,
+  metadata JSONB,
+  similarity FLOAT
+) AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    cc.id AS chunk_id,
+    cc.doc_id,
+    cc.course_id,
+    rc.code AS course_code,
+    cc.content,
+    cc.metadata,
+    1 - (cc.embedding <=> p_query_embedding) AS similarity
+  FROM course_chunks cc
+  JOIN rag_courses rc ON rc.id = cc.course_id
+  WHERE (p_course_ids IS NULL OR cc.course_id = ANY(p_course_ids))
+    AND 1 - (cc.embedding <=> p_query_embedding) >= p_min_similarity
+  ORDER BY cc.embedding <=> p_query_embedding
+  LIMIT p_match_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Next p_per_course upcoming deadlines for each of a set of courses, in one round trip
+CREATE OR REPLACE FUNCTION upcoming_deadlines_by_course(
+  p_course_names TEXT[],
+  p_per_course INT DEFAULT 5,
+  p_after TIMESTAMPTZ DEFAULT NOW()
+)
+RETURNS TABLE (
+  title TEXT,
+  course_name TEXT,
+  type TEXT,
+  due_date TIMESTAMPTZ,
+  due_date_text TEXT,
+  status TEXT,
+  points_possible NUMERIC
+) AS $$
+BEGIN
+  RETURN QUERY
+  SELECT ranked.title, ranked.course_name, ranked.type, ranked.due_date,
+         ranked.due_date_text, ranked.status, ranked.points_possible
+  FROM (
+    SELECT d.*, ROW_NUMBER() OVER (PARTITION BY d.course_name ORDER BY d.due_date) AS rn
+    FROM deadlines d
+    WHERE d.course_name = ANY(p_course_names)
+      AND d.due_date >= p_after
+  ) ranked
+  WHERE ranked.rn <= p_per_course
+  ORDER BY ranked.course_name, ranked.due_date;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
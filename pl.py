@@ -1,13 +1,35 @@
 #!/usr/bin/env python
 
+import abc
 import argparse
+import concurrent.futures
 import datetime
 import json
 import os
+import random
+import re
+import sqlite3
+import sys
+import threading
 import time
 import typing
+import zlib
 
 import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "classly", "backend"))
+from scrapers.prairielearn_access import latest_due_rule
+
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+STREAM_CHUNK_BYTES = 64 * 1024
+
+SQLITE_FILENAME = "pl_data.sqlite3"
+DEFAULT_PL_URL = "https://us.prairielearn.com/pl"
+
+log_lock = threading.Lock()
 
 
 def main():
@@ -41,6 +63,26 @@ def main():
         action="store_true",
         help="resume a previously interrupted execution of this script",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=8,
+        help="maximum number of requests in flight at once",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=30,
+        help="retries per request on 429/502/503/504 or connection errors",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["files", "sqlite"],
+        default="files",
+        help=f"one JSON file per endpoint, or a single indexed {SQLITE_FILENAME}",
+    )
     args = parser.parse_args()
 
     print(f"ensure that {args.output_dir} directory exists...")
@@ -48,153 +90,452 @@ def main():
     print("successfully ensured directory existence")
 
     with requests.Session() as session:
+        # One pooled connection per worker thread
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, args.jobs))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
         logfilename = os.path.join(args.output_dir, "download_log.txt")
         print(f"opening log file {logfilename} ...")
         with open(logfilename, "a" if args.resume else "w") as logfile:
             print("successfully opened log file")
-            download_course_instance(args, session, logfile)
+            store = open_store(args.output_dir, args.format)
+            try:
+                download_course_instance(args, session, logfile, store)
+            finally:
+                store.close()
 
 
 def download_course_instance(
-    args: argparse.Namespace, session: requests.Session, logfile: typing.TextIO
+    args: argparse.Namespace,
+    session: requests.Session,
+    logfile: typing.TextIO,
+    store: "Store" = None,
 ):
     log(logfile, f"starting download at {local_iso_time()} ...")
     start_time = time.time()
     course_instance_path = f"/course_instances/{args.course_instance_id}"
-    get_and_save_json(
-        session, course_instance_path, "course_instance_info", args, logfile
-    )
-    get_and_save_json(
-        session, f"{course_instance_path}/gradebook", "gradebook", args, logfile
-    )
-    get_and_save_json(
-        session,
-        f"{course_instance_path}/course_instance_access_rules",
-        "course_instance_access_rules",
-        args,
-        logfile,
-    )
-    assessments = get_and_save_json(
-        session, f"{course_instance_path}/assessments", "assessments", args, logfile
-    )
+    store = store or FileStore(args.output_dir)
 
-    for assessment in assessments:
-        assessment_instances = get_and_save_json(
-            session,
-            f"{course_instance_path}/assessments/{assessment['assessment_id']}/assessment_instances",
-            f"assessment_{assessment['assessment_id']}_instances",
-            args,
-            logfile,
-        )
-
-        get_and_save_json(
-            session,
-            f"{course_instance_path}/assessments/{assessment['assessment_id']}/assessment_access_rules",
-            f"assessment_{assessment['assessment_id']}_access_rules",
-            args,
-            logfile,
-        )
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        pending = set()
 
-        for assessment_instance in assessment_instances:
-            get_and_save_json(
+        def fetch(endpoint, filename, parse=False, assessment_id=None):
+            future = pool.submit(
+                get_and_save_json,
                 session,
-                f"{course_instance_path}/assessment_instances/{assessment_instance['assessment_instance_id']}/instance_questions",
-                f"assessment_instance_{assessment_instance['assessment_instance_id']}_instance_questions",
+                endpoint,
+                filename,
                 args,
                 logfile,
+                parse,
+                store,
+                assessment_id,
             )
+            pending.add(future)
+            return future
 
-            get_and_save_json(
-                session,
-                f"{course_instance_path}/assessment_instances/{assessment_instance['assessment_instance_id']}/submissions",
-                f"assessment_instance_{assessment_instance['assessment_instance_id']}_submissions",
-                args,
-                logfile,
-            )
+        fetch(course_instance_path, "course_instance_info")
+        fetch(f"{course_instance_path}/gradebook", "gradebook")
+        fetch(
+            f"{course_instance_path}/course_instance_access_rules",
+            "course_instance_access_rules",
+        )
+        assessments_future = fetch(
+            f"{course_instance_path}/assessments", "assessments", parse=True
+        )
 
-            get_and_save_json(
-                session,
-                f"{course_instance_path}/assessment_instances/{assessment_instance['assessment_instance_id']}/log",
-                f"assessment_instance_{assessment_instance['assessment_instance_id']}_log",
-                args,
-                logfile,
-            )
+        # Assessment and instance lists fan out into more requests as they
+        # arrive; leaf endpoints are only streamed to disk
+        instance_lists = {}
+        try:
+            for assessment in assessments_future.result():
+                assessment_id = assessment["assessment_id"]
+                future = fetch(
+                    f"{course_instance_path}/assessments/{assessment_id}/assessment_instances",
+                    f"assessment_{assessment_id}_instances",
+                    parse=True,
+                    assessment_id=assessment_id,
+                )
+                instance_lists[future] = assessment_id
+                fetch(
+                    f"{course_instance_path}/assessments/{assessment_id}/assessment_access_rules",
+                    f"assessment_{assessment_id}_access_rules",
+                    assessment_id=assessment_id,
+                )
+
+            for future in concurrent.futures.as_completed(list(instance_lists)):
+                assessment_id = instance_lists[future]
+                for assessment_instance in future.result():
+                    instance_id = assessment_instance["assessment_instance_id"]
+                    instance_path = (
+                        f"{course_instance_path}/assessment_instances/{instance_id}"
+                    )
+                    fetch(
+                        f"{instance_path}/instance_questions",
+                        f"assessment_instance_{instance_id}_instance_questions",
+                        assessment_id=assessment_id,
+                    )
+                    fetch(
+                        f"{instance_path}/submissions",
+                        f"assessment_instance_{instance_id}_submissions",
+                        assessment_id=assessment_id,
+                    )
+                    fetch(
+                        f"{instance_path}/log",
+                        f"assessment_instance_{instance_id}_log",
+                        assessment_id=assessment_id,
+                    )
+
+            for future in concurrent.futures.as_completed(list(pending)):
+                future.result()
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
 
     end_time = time.time()
     log(logfile, f"successfully completed download at {local_iso_time()}")
     log(logfile, f"total time elapsed: {end_time - start_time} seconds")
 
 
+def retry_delay(attempt: int, response: typing.Optional[requests.Response] = None):
+    """Jittered exponential backoff, honouring Retry-After on 429/503."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt)
+    return random.uniform(delay / 2, delay)
+
+
 def get_and_save_json(
     session: requests.Session,
     endpoint: str,
     filename: str,
     args: argparse.Namespace,
     logfile: typing.TextIO,
+    parse: bool = True,
+    store: "Store" = None,
+    assessment_id=None,
 ):
-    full_filename = os.path.join(args.output_dir, filename + ".json")
-    if args.resume and os.path.exists(full_filename):
-        log(logfile, f"reusing existing file {full_filename} ...")
-        with open(full_filename) as in_f:
-            try:
-                return json.load(in_f)
-            except json.JSONDecodeError:
-                log(
-                    logfile, f"error decoding JSON from {full_filename}, starting fresh"
-                )
-                # Continue without returning
+    """
+    Download `endpoint` into `filename` in `store` (default: `filename`.json),
+    streaming the body. Returns the parsed JSON if `parse` is set, otherwise None.
+    """
+    store = store or FileStore(args.output_dir)
+    full_filename = store.location(filename)
+    if args.resume and store.exists(filename):
+        log(logfile, f"reusing existing {full_filename} ...")
+        try:
+            data = store.load(filename)
+            return data if parse else None
+        except json.JSONDecodeError:
+            log(logfile, f"error decoding JSON from {full_filename}, starting fresh")
+            # Continue without returning
 
     url = args.server + endpoint
     headers = {"Private-Token": args.token}
     log(logfile, f"downloading {url} ...")
     start_time = time.time()
-    retry_502_max = 30
-    retry_502_i = 0
+    attempt = 0
     while True:
-        r = session.get(url, headers=headers)
-        if r.status_code == 200:
-            break
-        if r.status_code == 502:
-            retry_502_i += 1
-            if retry_502_i >= retry_502_max:
-                raise ValueError(
-                    f"Maximum number of retries reached on 502 Bad Gateway Error for {url}"
-                )
-            log(
-                logfile,
-                f"Bad Gateway Error encountered for {url}, retrying in 10 seconds",
-            )
-            time.sleep(10)
-            continue
-        # Enhanced error message for debugging
-        error_msg = f"Invalid status returned for {url}: {r.status_code}\n"
-        error_msg += f"Response: {r.text[:500]}"  # First 500 chars of response
-        log(logfile, error_msg)
-        raise ValueError(error_msg)
+        try:
+            r = session.get(url, headers=headers, stream=True)
+        except requests.ConnectionError as e:
+            r = None
+            reason = f"Connection error ({e})"
+        else:
+            if r.status_code == 200:
+                break
+            reason = f"HTTP {r.status_code}"
+            if r.status_code not in RETRY_STATUS_CODES:
+                # Enhanced error message for debugging
+                error_msg = f"Invalid status returned for {url}: {r.status_code}\n"
+                error_msg += f"Response: {r.text[:500]}"  # First 500 chars of response
+                log(logfile, error_msg)
+                raise ValueError(error_msg)
+            r.close()
+        attempt += 1
+        if attempt >= args.max_retries:
+            raise ValueError(f"Maximum number of retries reached ({reason}) for {url}")
+        delay = retry_delay(attempt - 1, r)
+        log(logfile, f"{reason} for {url}, retrying in {delay:.1f} seconds")
+        time.sleep(delay)
+
+    log(logfile, f"saving data to {full_filename} ...")
+    with r:
+        size = store.save(
+            filename,
+            endpoint,
+            r.iter_content(chunk_size=STREAM_CHUNK_BYTES),
+            assessment_id=assessment_id,
+        )
     end_time = time.time()
     log(
         logfile,
-        f"successfully downloaded {len(r.text)} bytes in {end_time - start_time} seconds",
+        f"successfully downloaded {size} bytes from {url} in {end_time - start_time} seconds",
     )
+    log(logfile, f"successfully wrote data to {full_filename}")
 
-    log(logfile, f"saving data to {full_filename} ...")
-
-    with open(full_filename, "w") as out_f:
-        out_f.write(r.text)
-
-    log(logfile, "successfully wrote data")
+    if not parse:
+        return None
 
-    log(logfile, "parsing data as JSON...")
-    data = r.json()
+    log(logfile, f"parsing {full_filename} as JSON...")
+    data = store.load(filename)
     log(logfile, "successfully parsed JSON")
 
     return data
 
 
+class Store(abc.ABC):
+    """Where downloaded endpoint responses are kept, keyed by their filename stem."""
+
+    @abc.abstractmethod
+    def location(self, name: str) -> str:
+        ...
+
+    @abc.abstractmethod
+    def exists(self, name: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def save(self, name: str, endpoint: str, chunks, assessment_id=None) -> int:
+        """Store a response body from an iterable of byte chunks; returns its size."""
+
+    @abc.abstractmethod
+    def load(self, name: str):
+        """Parsed JSON for `name`, or None if it was never downloaded."""
+
+    def load_assessment(self, assessment_id) -> dict:
+        """
+        Everything downloaded for one assessment:
+        {"instances", "access_rules", "instance_questions", "submissions", "log"},
+        the last three keyed by assessment_instance_id.
+        """
+        data = {
+            "instances": self.load(f"assessment_{assessment_id}_instances") or [],
+            "access_rules": self.load(f"assessment_{assessment_id}_access_rules") or [],
+            "instance_questions": {},
+            "submissions": {},
+            "log": {},
+        }
+        for instance in data["instances"]:
+            instance_id = instance["assessment_instance_id"]
+            for key in ("instance_questions", "submissions", "log"):
+                data[key][instance_id] = self.load(
+                    f"assessment_instance_{instance_id}_{key}"
+                )
+        return data
+
+    def close(self):
+        pass
+
+
+class FileStore(Store):
+    """One <name>.json file per endpoint (the original layout)."""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+
+    def location(self, name: str) -> str:
+        return os.path.join(self.output_dir, name + ".json")
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self.location(name))
+
+    def save(self, name: str, endpoint: str, chunks, assessment_id=None) -> int:
+        # Write to a temporary file first so --resume never sees a partial download
+        full_filename = self.location(name)
+        part_filename = full_filename + ".part"
+        size = 0
+        with open(part_filename, "wb") as out_f:
+            for chunk in chunks:
+                out_f.write(chunk)
+                size += len(chunk)
+        os.replace(part_filename, full_filename)
+        return size
+
+    def load(self, name: str):
+        if not self.exists(name):
+            return None
+        with open(self.location(name)) as in_f:
+            return json.load(in_f)
+
+
+class SqliteStore(Store):
+    """
+    All responses in one SQLite file, zlib-compressed, with the endpoint's
+    assessment and assessment instance ids indexed for selective reloads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " name TEXT PRIMARY KEY,"
+            " endpoint TEXT NOT NULL,"
+            " assessment_id TEXT,"
+            " assessment_instance_id TEXT,"
+            " size INTEGER NOT NULL,"
+            " body BLOB NOT NULL,"
+            " saved_at TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_assessment"
+            " ON responses(assessment_id)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_instance"
+            " ON responses(assessment_instance_id)"
+        )
+
+    def location(self, name: str) -> str:
+        return f"{self.path}:{name}"
+
+    def exists(self, name: str) -> bool:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM responses WHERE name = ?", (name,)
+            ).fetchone()
+        return row is not None
+
+    def save(self, name: str, endpoint: str, chunks, assessment_id=None) -> int:
+        compressor = zlib.compressobj()
+        parts = []
+        size = 0
+        for chunk in chunks:
+            parts.append(compressor.compress(chunk))
+            size += len(chunk)
+        parts.append(compressor.flush())
+        match = re.search(r"/assessment_instances/(\d+)", endpoint)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (name, endpoint, assessment_id, assessment_instance_id, size, body, saved_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    name,
+                    endpoint,
+                    str(assessment_id) if assessment_id is not None else None,
+                    match.group(1) if match else None,
+                    size,
+                    b"".join(parts),
+                    local_iso_time(),
+                ),
+            )
+        return size
+
+    def load(self, name: str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body FROM responses WHERE name = ?", (name,)
+            ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def load_assessment(self, assessment_id) -> dict:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT name, assessment_instance_id, body FROM responses"
+                " WHERE assessment_id = ?",
+                (str(assessment_id),),
+            ).fetchall()
+        data = {
+            "instances": [],
+            "access_rules": [],
+            "instance_questions": {},
+            "submissions": {},
+            "log": {},
+        }
+        for name, instance_id, body in rows:
+            value = json.loads(zlib.decompress(body))
+            if instance_id is None:
+                key = "instances" if name.endswith("_instances") else "access_rules"
+                data[key] = value
+            else:
+                key = name.split(f"assessment_instance_{instance_id}_", 1)[1]
+                data[key][int(instance_id)] = value
+        return data
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def open_store(output_dir: str, format: str = None) -> Store:
+    """
+    Open a download directory. `format` is "files" or "sqlite"; when omitted
+    it is detected from what the directory contains.
+    """
+    sqlite_path = os.path.join(output_dir, SQLITE_FILENAME)
+    if format is None:
+        format = "sqlite" if os.path.exists(sqlite_path) else "files"
+    if format == "sqlite":
+        return SqliteStore(sqlite_path)
+    return FileStore(output_dir)
+
+
+def due_from_access_rules(rules: typing.List[dict]):
+    """
+    (due ISO date, text) for an assessment, from the rule picked by
+    scrapers.prairielearn_access.latest_due_rule.
+    """
+    rule, due = latest_due_rule(rules)
+    if rule is None:
+        return None, None
+    due_date = due.isoformat() if due else rule["end_date"]
+    return due_date, f"{rule.get('credit') or 0}% until {due_date}"
+
+
+def to_sync_data(store: Store, pl_url: str = DEFAULT_PL_URL) -> dict:
+    """
+    Shape a downloaded course instance for ScraperService._process_prairielearn_data:
+    {"courses": [{"name", "course_id", "assessments": [{"id", "name", "type",
+    "due_date", "due_date_text", "url"}]}]}
+    """
+    info = store.load("course_instance_info") or {}
+    course_instance_id = info.get("course_instance_id")
+    name = info.get("course_instance_long_name") or info.get("course_title") or ""
+    if info.get("course_short_name"):
+        name = f"{info['course_short_name']}: {name}" if name else info["course_short_name"]
+
+    assessments = []
+    for assessment in store.load("assessments") or []:
+        assessment_id = assessment["assessment_id"]
+        due_date, due_text = due_from_access_rules(
+            store.load(f"assessment_{assessment_id}_access_rules") or []
+        )
+        label = assessment.get("assessment_label")
+        title = assessment.get("title") or assessment.get("assessment_name") or ""
+        assessments.append(
+            {
+                "id": str(assessment_id),
+                "name": f"{label}: {title}" if label else title,
+                "type": "exam" if assessment.get("type") == "Exam" else "assignment",
+                "due_date": due_date,
+                "due_date_text": due_text,
+                "url": f"{pl_url}/course_instance/{course_instance_id}/assessment/{assessment_id}/",
+            }
+        )
+
+    return {
+        "courses": [
+            {
+                "name": name or str(course_instance_id),
+                "course_id": str(course_instance_id),
+                "assessments": assessments,
+            }
+        ]
+    }
+
+
 def log(logfile: typing.TextIO, message: str):
-    logfile.write(message + "\n")
-    logfile.flush()
-    print(message)
+    with log_lock:
+        logfile.write(message + "\n")
+        logfile.flush()
+        print(message)
 
 
 def local_iso_time():
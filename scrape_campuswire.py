@@ -4,11 +4,19 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import time
+import os
+import sys
 import json
 import getpass
 from datetime import datetime
 
+# Shared condition-based waits live in the backend's scrapers package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'classly', 'backend'))
+from scrapers.waits import (
+    wait_for_page_settled, wait_for_platform_ready, wait_for_scroll_growth, wait_until, url_excludes,
+    wait_timings,
+)
+
 def login_to_campuswire(driver, email, password):
     """
     Log into Campuswire with email/password
@@ -16,7 +24,7 @@ def login_to_campuswire(driver, email, password):
     print("🌐 Navigating to Campuswire login...")
     driver.get("https://campuswire.com/signin")
     
-    time.sleep(3)
+    wait_for_page_settled(driver, timeout=10, name='campuswire.signin_page')
     
     try:
         # Find email input - using placeholder text
@@ -27,22 +35,18 @@ def login_to_campuswire(driver, email, password):
         email_field.clear()
         email_field.send_keys(email)
         
-        time.sleep(1)
-        
         # Find password input
         print("🔑 Entering password...")
         password_field = driver.find_element(By.XPATH, "//input[@placeholder='Password' or @type='password']")
         password_field.clear()
         password_field.send_keys(password)
         
-        time.sleep(1)
-        
         # Click Sign in button
         print("🚀 Clicking Sign in...")
         sign_in_btn = driver.find_element(By.XPATH, "//button[contains(text(), 'Sign in')]")
         sign_in_btn.click()
         
-        time.sleep(5)
+        wait_until(driver, url_excludes('signin'), timeout=15, name='campuswire.login_redirect')
         
         # Check if login was successful
         if "signin" not in driver.current_url.lower():
@@ -57,6 +61,56 @@ def login_to_campuswire(driver, email, password):
         print("   Please complete login manually in the browser...")
         input("   Press Enter once you've logged in...")
 
+# Selectors tried in order to find post elements in the feed
+POST_SELECTORS = [
+    "[class*='post-item']",
+    "[class*='thread-item']",
+    "[class*='feed-item']",
+    "[class*='FeedItem']",
+    "article",
+    "[data-testid*='post']",
+    ".post",
+    ".thread"
+]
+
+# Runs in the browser and returns every post record in one round trip.
+# Field selectors match what was previously queried per element.
+EXTRACT_POSTS_JS = """
+const selectors = arguments[0];
+const maxPosts = arguments[1];
+let elements = [];
+let used = null;
+for (const selector of selectors) {
+    elements = Array.from(document.querySelectorAll(selector));
+    if (elements.length) { used = selector; break; }
+}
+if (!elements.length) {
+    const result = document.evaluate(
+        "//div[contains(@class, 'feed')]//div[contains(@class, 'item') or contains(@class, 'post')]",
+        document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (let i = 0; i < result.snapshotLength; i++) elements.push(result.snapshotItem(i));
+}
+const textOf = (el, selector) => {
+    const found = el.querySelector(selector);
+    return found ? found.innerText.trim() : null;
+};
+return {
+    selector: used,
+    found: elements.length,
+    posts: elements.slice(0, maxPosts).map(el => ({
+        text: (el.innerText || '').trim(),
+        html: (el.innerHTML || '').slice(0, 500),
+        title: textOf(el, "h1, h2, h3, h4, [class*='title'], [class*='subject']"),
+        author: textOf(el, "[class*='author'], [class*='user'], [class*='name']"),
+        date: textOf(el, "[class*='date'], [class*='time'], [class*='ago']"),
+        category: textOf(el, "[class*='category'], [class*='tag'], [class*='label']"),
+        links: Array.from(el.querySelectorAll('a'))
+            .filter(a => a.href)
+            .map(a => ({text: a.innerText, href: a.href}))
+    }))
+};
+"""
+
 def scrape_feed(driver, feed_url, max_posts=50):
     """
     Scrape posts from a Campuswire feed
@@ -64,7 +118,7 @@ def scrape_feed(driver, feed_url, max_posts=50):
     print(f"\n📰 Navigating to feed: {feed_url}")
     driver.get(feed_url)
     
-    time.sleep(3)
+    wait_for_platform_ready(driver, 'campuswire', timeout=15)
     
     posts = []
     
@@ -85,15 +139,14 @@ def scrape_feed(driver, feed_url, max_posts=50):
         while scroll_attempts < max_scrolls and len(posts) < max_posts:
             # Scroll down
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
             
-            # Check for new content
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
+            # Check for new content (returns as soon as the page grows)
+            new_height = wait_for_scroll_growth(driver, last_height, timeout=2, name='campuswire.scroll')
+            if new_height is None:
                 scroll_attempts += 1
             else:
                 scroll_attempts = 0
-            last_height = new_height
+                last_height = new_height
             
             # Count posts
             current_posts = driver.find_elements(By.CSS_SELECTOR, "[class*='post-item'], [class*='thread-item'], [class*='feed-item'], article")
@@ -105,75 +158,23 @@ def scrape_feed(driver, feed_url, max_posts=50):
         # Now scrape the posts
         print("\n📊 Extracting post data...")
         
-        # Get page source for parsing
-        page_source = driver.page_source
-        
-        # Try different selectors to find posts
-        post_elements = []
-        selectors_to_try = [
-            "[class*='post-item']",
-            "[class*='thread-item']",
-            "[class*='feed-item']",
-            "[class*='FeedItem']",
-            "article",
-            "[data-testid*='post']",
-            ".post",
-            ".thread"
-        ]
+        # One script call extracts every post, instead of ~10 WebDriver round
+        # trips (find_element/get_attribute) per post
+        extracted = driver.execute_script(EXTRACT_POSTS_JS, POST_SELECTORS, max_posts)
         
-        for selector in selectors_to_try:
-            post_elements = driver.find_elements(By.CSS_SELECTOR, selector)
-            if post_elements:
-                print(f"   Found {len(post_elements)} posts using selector: {selector}")
-                break
-        
-        if not post_elements:
-            # Fallback: try to extract from any list-like structure
+        if extracted['selector']:
+            print(f"   Found {extracted['found']} posts using selector: {extracted['selector']}")
+        else:
             print("   Using fallback extraction method...")
-            post_elements = driver.find_elements(By.XPATH, "//div[contains(@class, 'feed')]//div[contains(@class, 'item') or contains(@class, 'post')]")
         
-        for i, post_el in enumerate(post_elements[:max_posts], 1):
-            try:
-                post_data = {
-                    'index': i,
-                    'text': post_el.text.strip(),
-                    'html': post_el.get_attribute('innerHTML')[:500] if post_el.get_attribute('innerHTML') else ''
-                }
-                
-                # Try to extract specific fields
-                try:
-                    title_el = post_el.find_element(By.CSS_SELECTOR, "h1, h2, h3, h4, [class*='title'], [class*='subject']")
-                    post_data['title'] = title_el.text.strip()
-                except:
-                    pass
-                
-                try:
-                    author_el = post_el.find_element(By.CSS_SELECTOR, "[class*='author'], [class*='user'], [class*='name']")
-                    post_data['author'] = author_el.text.strip()
-                except:
-                    pass
-                
-                try:
-                    date_el = post_el.find_element(By.CSS_SELECTOR, "[class*='date'], [class*='time'], [class*='ago']")
-                    post_data['date'] = date_el.text.strip()
-                except:
-                    pass
-                
-                try:
-                    category_el = post_el.find_element(By.CSS_SELECTOR, "[class*='category'], [class*='tag'], [class*='label']")
-                    post_data['category'] = category_el.text.strip()
-                except:
-                    pass
-                
-                # Get links
-                links = post_el.find_elements(By.TAG_NAME, 'a')
-                post_data['links'] = [{'text': l.text, 'href': l.get_attribute('href')} for l in links if l.get_attribute('href')]
-                
-                posts.append(post_data)
-                print(f"   Post {i}: {post_data.get('title', post_data['text'][:50])}...")
-                
-            except Exception as e:
-                print(f"   ⚠️  Error extracting post {i}: {e}")
+        for i, post_data in enumerate(extracted['posts'], 1):
+            post_data = {'index': i, **post_data}
+            # Only keep the optional fields that were found
+            for field in ('title', 'author', 'date', 'category'):
+                if post_data.get(field) is None:
+                    post_data.pop(field, None)
+            posts.append(post_data)
+            print(f"   Post {i}: {post_data.get('title', post_data['text'][:50])}...")
         
         return {
             'feed_url': feed_url,
@@ -192,7 +193,7 @@ def scrape_post_details(driver, post_url):
     """
     print(f"\n📄 Scraping post: {post_url}")
     driver.get(post_url)
-    time.sleep(2)
+    wait_for_page_settled(driver, timeout=10, name='campuswire.post')
     
     try:
         post_data = {
@@ -278,7 +279,7 @@ def main():
         # Navigate directly to the feed (might already be logged in via SSO)
         print(f"\n📰 Going to feed URL: {feed_url}")
         driver.get(feed_url)
-        time.sleep(3)
+        wait_for_platform_ready(driver, 'campuswire', timeout=15)
         
         # Check if we need to login
         if "login" in driver.current_url.lower() or "signin" in driver.current_url.lower():
@@ -298,6 +299,8 @@ def main():
         else:
             print("\n❌ No data scraped")
         
+        print(f"\n⏱️  Wait timings:\n{wait_timings.report()}")
+        
         # Keep browser open for inspection
         print("\n🎉 Scraping complete!")
         print("🔍 Browser will stay open. Check the data and close manually.")
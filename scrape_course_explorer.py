@@ -8,11 +8,32 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
+from bs4 import BeautifulSoup
+from urllib.parse import urljoin
+import os
+import sys
 import time
 import json
 import getpass
 from datetime import datetime
 
+# Shared condition-based waits live in the backend's scrapers package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'classly', 'backend'))
+from scrapers.waits import (
+    any_selector, url_contains, wait_for_platform_ready, wait_until, wait_timings,
+)
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# Enrollments rarely change mid-term, so parsed schedules are reused for a week
+CACHE_FILE = os.getenv("COURSE_EXPLORER_CACHE_FILE",
+                       os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "course_explorer.json"))
+CACHE_TTL_HOURS = float(os.getenv("COURSE_EXPLORER_CACHE_TTL_HOURS", "168"))
+
 
 def login_illinois_sso(driver, email, password):
     """
@@ -30,7 +51,7 @@ def login_illinois_sso(driver, email, password):
         email_field.send_keys(email)
         email_field.send_keys(Keys.RETURN)
         
-        time.sleep(2)
+        wait_until(driver, EC.element_to_be_clickable((By.NAME, "passwd")), timeout=10, name='sso.password_field')
         
         # Enter password
         print("   Entering password...")
@@ -40,7 +61,8 @@ def login_illinois_sso(driver, email, password):
         password_field.send_keys(password)
         password_field.send_keys(Keys.RETURN)
         
-        time.sleep(3)
+        wait_until(driver, lambda d: url_contains('courses.illinois.edu')(d) or any_selector('#idBtn_Back')(d),
+                   timeout=15, name='sso.after_password')
         
         # Handle "Stay signed in?" prompt
         try:
@@ -52,7 +74,7 @@ def login_illinois_sso(driver, email, password):
         except:
             print("   (No prompt found, continuing...)")
         
-        time.sleep(3)
+        wait_until(driver, url_contains('courses.illinois.edu'), timeout=30, name='course_explorer.login_redirect')
         print("✅ SSO login completed!")
         
     except Exception as e:
@@ -69,7 +91,7 @@ def scrape_enrolled_courses(driver, term="2026", semester="spring"):
     print(f"\n📚 Navigating to Course Explorer: {url}")
     driver.get(url)
     
-    time.sleep(3)
+    wait_for_platform_ready(driver, 'course_explorer', timeout=15)
     
     # Check if we need to login
     if "login.microsoftonline.com" in driver.current_url or "shibboleth" in driver.current_url.lower():
@@ -87,55 +109,160 @@ def scrape_enrolled_courses(driver, term="2026", semester="spring"):
         print(f"❌ Could not find course table: {e}")
         return None
     
-    # Extract course data
-    courses = []
-    
+    # Parse the whole table from one page_source snapshot instead of a
+    # WebDriver round trip per row and cell
     try:
-        # Find all rows in the table body
-        rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
-        print(f"\n📊 Found {len(rows)} courses")
+        courses = parse_course_table(driver.page_source, base_url=driver.current_url)
+    except Exception as e:
+        print(f"❌ Error extracting courses: {e}")
+        return None
+    
+    print(f"\n📊 Found {len(courses)} courses")
+    for course_data in courses:
+        print(f"   ✓ {course_data['course']}: {course_data['type']} - {course_data['days']} {course_data['time']}")
+    
+    return courses
+
+
+def _cell_text(cell):
+    return " ".join(cell.get_text(" ").split())
+
+
+def parse_course_table(html, base_url="https://courses.illinois.edu/"):
+    """
+    Parse enrolled sections out of a Course Explorer courselist page
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    table = soup.find("table")
+    if table is None:
+        return []
+    
+    courses = []
+    for row in table.select("tbody tr"):
+        cells = row.find_all("td")
+        if len(cells) < 8:
+            continue
         
-        for row in rows:
-            try:
-                cells = row.find_elements(By.TAG_NAME, "td")
-                
-                if len(cells) >= 8:
-                    # Extract course link and name
-                    course_link = cells[0].find_element(By.TAG_NAME, "a") if cells[0].find_elements(By.TAG_NAME, "a") else None
-                    course_name = course_link.text.strip() if course_link else cells[0].text.strip()
-                    course_url = course_link.get_attribute("href") if course_link else None
-                    
-                    # Parse course name into department and number
-                    course_parts = course_name.split()
-                    department = course_parts[0] if course_parts else ""
-                    number = course_parts[1] if len(course_parts) > 1 else ""
-                    
-                    course_data = {
-                        "course": course_name,
-                        "department": department,
-                        "number": number,
-                        "crn": cells[1].text.strip(),
-                        "type": cells[2].text.strip(),
-                        "section": cells[3].text.strip(),
-                        "time": cells[4].text.strip(),
-                        "days": cells[5].text.strip(),
-                        "location": cells[6].text.strip(),
-                        "instructor": cells[7].text.strip(),
-                        "url": course_url
-                    }
-                    
-                    courses.append(course_data)
-                    print(f"   ✓ {course_name}: {course_data['type']} - {course_data['days']} {course_data['time']}")
-                    
-            except Exception as e:
-                print(f"   ⚠️  Error parsing row: {e}")
-                continue
+        # Extract course link and name
+        course_link = cells[0].find("a")
+        course_name = _cell_text(course_link) if course_link else _cell_text(cells[0])
+        course_url = urljoin(base_url, course_link["href"]) if course_link and course_link.get("href") else None
         
-        return courses
+        # Parse course name into department and number
+        course_parts = course_name.split()
+        department = course_parts[0] if course_parts else ""
+        number = course_parts[1] if len(course_parts) > 1 else ""
         
-    except Exception as e:
-        print(f"❌ Error extracting courses: {e}")
+        courses.append({
+            "course": course_name,
+            "department": department,
+            "number": number,
+            "crn": _cell_text(cells[1]),
+            "type": _cell_text(cells[2]),
+            "section": _cell_text(cells[3]),
+            "time": _cell_text(cells[4]),
+            "days": _cell_text(cells[5]),
+            "location": _cell_text(cells[6]),
+            "instructor": _cell_text(cells[7]),
+            "url": course_url
+        })
+    
+    return courses
+
+
+def _cache_key(user, term, semester):
+    return f"{user.strip().lower()}|{term}|{semester.strip().lower()}"
+
+
+def _load_cache():
+    try:
+        with open(CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get_cached_enrollment(user, term, semester, max_age_hours=CACHE_TTL_HOURS):
+    """
+    Return cached courses for (user, term, semester) if younger than max_age_hours
+    """
+    entry = _load_cache().get(_cache_key(user, term, semester))
+    if not entry:
+        return None
+    age_hours = (time.time() - entry["cached_at"]) / 3600
+    if age_hours > max_age_hours:
+        return None
+    return entry["courses"]
+
+
+def cache_enrollment(user, term, semester, courses):
+    cache = _load_cache()
+    cache[_cache_key(user, term, semester)] = {"cached_at": time.time(), "courses": courses}
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    tmp_file = f"{CACHE_FILE}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_file, CACHE_FILE)
+
+
+def get_enrolled_courses(user, term="2026", semester="spring", driver=None, max_age_hours=CACHE_TTL_HOURS):
+    """
+    Get enrolled courses, scraping with `driver` only when the cache is stale.
+    Returns None if nothing is cached and no logged-in driver was given.
+    """
+    courses = get_cached_enrollment(user, term, semester, max_age_hours)
+    if courses is not None:
+        return courses
+    if driver is None:
         return None
+    
+    courses = scrape_enrolled_courses(driver, term, semester)
+    if courses:
+        cache_enrollment(user, term, semester, courses)
+    return courses
+
+
+def enrollment_to_class_rows(user_id, courses, term="2026", semester="spring"):
+    """
+    Group enrolled sections into one `classes` row per course
+    """
+    term_label = f"{semester.title()} {term}"
+    rows = {}
+    for course in courses:
+        meeting = " ".join(part for part in (course.get("days"), course.get("time")) if part and part != "n.a")
+        row = rows.setdefault(course["course"], {
+            "user_id": user_id,
+            "term": term_label,
+            "code": course["course"],
+            "title": course["course"],
+            "location": None,
+            "meeting_times": None,
+        })
+        if not row["location"] and course.get("location") not in (None, "", "n.a"):
+            row["location"] = course["location"]
+        if meeting:
+            row["meeting_times"] = f"{row['meeting_times']}; {meeting}" if row["meeting_times"] else meeting
+    return list(rows.values())
+
+
+def seed_classes(supabase_client, user_id, user, term="2026", semester="spring", driver=None):
+    """
+    Create `classes` rows for a user's enrolled courses that don't exist yet.
+    Uses the cached enrollment, so no interactive session is needed while it is fresh.
+    Returns the inserted rows, or None if there is no enrollment to seed from.
+    """
+    courses = get_enrolled_courses(user, term, semester, driver=driver)
+    if courses is None:
+        return None
+    
+    rows = enrollment_to_class_rows(user_id, courses, term, semester)
+    existing = supabase_client.table("classes").select("code").eq("user_id", user_id).execute()
+    existing_codes = {row["code"] for row in existing.data or []}
+    new_rows = [row for row in rows if row["code"] not in existing_codes]
+    if not new_rows:
+        return []
+    result = supabase_client.table("classes").insert(new_rows).execute()
+    return result.data or []
 
 
 def main():
@@ -173,17 +300,18 @@ def main():
         print(f"\n📚 Navigating to: {url}")
         driver.get(url)
         
-        time.sleep(2)
+        wait_for_platform_ready(driver, 'course_explorer', timeout=15)
         
         # Login if needed
         if "login.microsoftonline.com" in driver.current_url or "shibboleth" in driver.current_url.lower():
             login_illinois_sso(driver, email, password)
-            time.sleep(3)
         
         # Scrape courses
         courses = scrape_enrolled_courses(driver, term, semester)
         
         if courses:
+            cache_enrollment(email, term, semester, courses)
+            
             # Save to JSON
             output = {
                 "user_email": email,
@@ -212,6 +340,7 @@ def main():
         else:
             print("\n❌ No courses found or scraping failed")
         
+        print(f"\n⏱️  Wait timings:\n{wait_timings.report()}")
         print("\n🎉 Scraping complete!")
         input("⏸️  Press Enter to close the browser...")
         
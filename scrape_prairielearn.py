@@ -3,11 +3,19 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
-import time
+import os
+import sys
 import json
 import getpass
 from datetime import datetime
 
+# Shared condition-based waits live in the backend's scrapers package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'classly', 'backend'))
+from scrapers.waits import (
+    any_selector, url_contains, wait_for_document_ready, wait_for_page_settled, wait_until,
+    wait_timings,
+)
+
 def login_to_prairielearn(driver, email, password):
     """
     Log into PrairieLearn using Illinois SAML SSO
@@ -15,7 +23,7 @@ def login_to_prairielearn(driver, email, password):
     print("🌐 Navigating to PrairieLearn...")
     driver.get("https://us.prairielearn.com")
     
-    time.sleep(2)
+    wait_for_page_settled(driver, timeout=10, name='prairielearn.home')
     
     try:
         # Step 1: Click on University of Illinois Urbana-Champaign (UIUC) button
@@ -28,7 +36,7 @@ def login_to_prairielearn(driver, email, password):
         print("   ✓ Found UIUC button, clicking...")
         uiuc_button.click()
         
-        time.sleep(3)
+        wait_until(driver, EC.element_to_be_clickable((By.NAME, "loginfmt")), timeout=15, name='sso.email_field')
         
         # Step 2: Illinois SSO - Enter email (NetID@illinois.edu)
         print(f"✍️  Entering email: {email}")
@@ -38,7 +46,7 @@ def login_to_prairielearn(driver, email, password):
         email_field.send_keys(email)
         email_field.send_keys(Keys.RETURN)
         
-        time.sleep(2)
+        wait_until(driver, EC.element_to_be_clickable((By.NAME, "passwd")), timeout=10, name='sso.password_field')
         
         # Step 3: Enter password
         print("🔑 Entering password...")
@@ -48,7 +56,8 @@ def login_to_prairielearn(driver, email, password):
         password_field.send_keys(password)
         password_field.send_keys(Keys.RETURN)
         
-        time.sleep(3)
+        wait_until(driver, lambda d: url_contains('prairielearn')(d) or any_selector('#idBtn_Back')(d),
+                   timeout=15, name='sso.after_password')
         
         # Step 4: Handle "Stay signed in?" prompt if it appears
         try:
@@ -62,7 +71,7 @@ def login_to_prairielearn(driver, email, password):
         
         # Wait for redirect back to PrairieLearn
         print("⏳ Waiting for login to complete...")
-        time.sleep(5)
+        wait_until(driver, url_contains('prairielearn'), timeout=30, name='prairielearn.login_redirect')
         
         # Check if we're logged in
         if "prairielearn" in driver.current_url.lower():
@@ -86,7 +95,7 @@ def scrape_courses(driver):
     
     # Navigate to homepage
     driver.get("https://us.prairielearn.com/pl")
-    time.sleep(3)
+    wait_for_document_ready(driver, timeout=15, name='prairielearn.courses')
     
     courses = []
     
@@ -303,6 +312,7 @@ def main():
             print("\n❌ No data scraped")
         
         # Keep browser open for inspection
+        print(f"\n⏱️  Wait timings:\n{wait_timings.report()}")
         print("\n🎉 Scraping complete!")
         print("🔍 Browser will stay open. Check the data and close manually.")
         input("\n⏸️  Press Enter to close the browser...")